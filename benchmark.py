@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+可复现的性能基准：生成合成的SEC公司数据与带名称噪声的13F输入，
+在多个规模下测量启动耗时、单次查找延迟、批量吞吐量与峰值内存，
+结果以JSON输出，便于在不同提交之间对比。只使用本地数据，不访问网络。
+
+--ann 模式只比较近似匹配（MinHash-LSH候选 + 精确重排）与逐个比较的召回率和速度。
+
+用法:
+    python benchmark.py --scales 1000,5000,10000 --output bench.json
+    python benchmark.py --scales 1000 --compare bench.json --fail-over 1.25
+    python benchmark.py --ann --scales 10000,50000,200000 --lookups 50
+退出码: 0 正常；指定--fail-over且存在超过阈值的退化时为1
+"""
+
+import argparse
+import contextlib
+import csv
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import pandas as pd
+
+from company_name_to_ticker import (BINARY_FORMATS, OUTPUT_FORMATS, EnhancedTest3TickerConverter,
+                                    atomic_write, configure_logging, import_optional, output_table,
+                                    percentile, write_table)
+
+NAME_WORDS = [
+    'ALPHA', 'APEX', 'ATLAS', 'BEACON', 'BLUE', 'CEDAR', 'CENTURY', 'CITIZENS', 'COASTAL', 'CONTINENTAL',
+    'CROWN', 'DELTA', 'DOMINION', 'EAGLE', 'EMPIRE', 'FIRST', 'FRONTIER', 'GENERAL', 'GLOBAL', 'GOLDEN',
+    'GRANITE', 'HARBOR', 'HERITAGE', 'HORIZON', 'LIBERTY', 'MERIDIAN', 'METRO', 'NATIONAL', 'NORTHERN',
+    'OCEAN', 'PACIFIC', 'PEAK', 'PINNACLE', 'PIONEER', 'PRIME', 'QUANTUM', 'RIVER', 'SUMMIT', 'SUN',
+    'UNITED', 'VALLEY', 'VANGUARD', 'VECTOR', 'WESTERN', 'ZENITH'
+]
+INDUSTRY_WORDS = [
+    'BANCORP', 'BIOSCIENCES', 'BRANDS', 'CAPITAL', 'CHEMICAL', 'COMMUNICATIONS', 'ENERGY', 'FINANCIAL',
+    'FOODS', 'HEALTHCARE', 'INDUSTRIES', 'INSURANCE', 'MATERIALS', 'MEDICAL', 'MINING', 'MOTORS',
+    'NETWORKS', 'OIL', 'PHARMACEUTICALS', 'PROPERTIES', 'REALTY', 'RESOURCES', 'SEMICONDUCTOR',
+    'SOFTWARE', 'STEEL', 'THERAPEUTICS', 'TRUST', 'UTILITIES'
+]
+SEC_SUFFIXES = ['Inc.', 'Inc', 'Corp', 'Corp.', 'Corporation', 'Co', 'Ltd', 'Holdings, Inc.',
+                'Group, Inc.', 'PLC', 'LP', 'N.V.', 'Technologies Inc', 'International Corp']
+EXCHANGES = ['NYSE', 'Nasdaq', 'Nasdaq', 'OTC', 'CBOE']
+ABBREVIATIONS = {'INTERNATIONAL': 'INTL', 'HOLDINGS': 'HLDGS', 'CORPORATION': 'CORP',
+                 'FINANCIAL': 'FINL', 'PHARMACEUTICALS': 'PHARMA', 'COMMUNICATIONS': 'COMMUNICATNS'}
+FILING_SUFFIXES = ['NEW', 'COM', 'CL A', 'MASS', 'DEL', '/DE/']
+SYLLABLES = ['AR', 'BE', 'CO', 'DA', 'EX', 'FI', 'GEN', 'HAL', 'IN', 'KO', 'LU', 'MAR', 'NO', 'OR',
+             'PRA', 'QUI', 'RO', 'SAN', 'TEK', 'UL', 'VER', 'WA', 'XA', 'ZO']
+
+# 下游读取输出文件的常用方式
+READERS = {
+    'csv': lambda path: pd.read_csv(path),
+    'tsv': lambda path: pd.read_csv(path, sep='\t'),
+    'jsonl': lambda path: pd.read_json(path, lines=True),
+    'parquet': lambda path: pd.read_parquet(path),
+}
+
+# 对比时数值越大越好的指标，其余数值指标越小越好
+HIGHER_IS_BETTER = {'batch_names_per_sec', 'pipeline_rows_per_sec', 'similarity_per_sec', 'accuracy', 'match_rate',
+                    'ann_recall', 'ann_speedup'}
+
+
+def generate_universe(size: int, seed: int) -> list:
+    """生成合成SEC公司列表，每个公司含cik、name、ticker、exchange，名称与代码均唯一"""
+    rng = random.Random(seed)
+    companies = []
+    names = set()
+    tickers = set()
+    while len(companies) < size:
+        style = rng.random()
+        if style < 0.15:
+            # 缩写型名称，如 "EMC Corp"，13F中常写成 "E M C CORP"
+            base = ''.join(rng.choice('ABCDEFGHIJKLMNOPRSTUVWXYZ') for _ in range(rng.randint(2, 4)))
+        else:
+            # 品牌词由音节拼成，再搭配常见名称词与行业词，使名称分布接近真实数据
+            brand = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3)))
+            words = [brand]
+            if rng.random() < 0.4:
+                words.insert(rng.randrange(2), rng.choice(NAME_WORDS))
+            if rng.random() < 0.6:
+                words.append(rng.choice(INDUSTRY_WORDS))
+            base = ' '.join(words)
+            if rng.random() < 0.5:
+                base = base.title()
+        name = f"{base} {rng.choice(SEC_SUFFIXES)}"
+        if name.upper() in names:
+            continue
+
+        initials = ''.join(word[0] for word in base.split()).upper()
+        ticker = initials[:4]
+        while ticker in tickers or len(ticker) < 2:
+            ticker = (initials[:2] + ''.join(rng.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ')
+                                             for _ in range(rng.randint(1, 3))))[:5]
+        names.add(name.upper())
+        tickers.add(ticker)
+        companies.append({'cik': 1000000 + len(companies) * 7, 'name': name,
+                          'ticker': ticker, 'exchange': rng.choice(EXCHANGES)})
+    return companies
+
+
+def write_universe(companies: list, directory: Path) -> tuple:
+    """写出两个SEC格式文件（与company_tickers*.json结构相同），返回两个路径"""
+    tickers_file = directory / 'company_tickers.json'
+    exchange_file = directory / 'company_tickers_exchange.json'
+    with open(tickers_file, 'w', encoding='utf-8') as f:
+        json.dump({str(i): {'cik_str': c['cik'], 'ticker': c['ticker'], 'title': c['name']}
+                   for i, c in enumerate(companies)}, f)
+    with open(exchange_file, 'w', encoding='utf-8') as f:
+        json.dump({'fields': ['cik', 'name', 'ticker', 'exchange'],
+                   'data': [[c['cik'], c['name'], c['ticker'], c['exchange']] for c in companies]}, f)
+    return tickers_file, exchange_file
+
+
+def add_name_noise(name: str, rng: random.Random) -> str:
+    """模拟13F申报中的名称写法：大写、去标点、缩写、拆开首字母、附加申报后缀"""
+    noisy = name.upper().replace(',', '').replace('.', '')
+    words = noisy.split()
+    if len(words[0]) <= 4 and words[0].isalpha() and len(words) > 1 and rng.random() < 0.6:
+        words[0] = ' '.join(words[0])
+    words = [ABBREVIATIONS.get(word, word) if rng.random() < 0.7 else word for word in words]
+    roll = rng.random()
+    if roll < 0.25:
+        words.append(rng.choice(FILING_SUFFIXES))
+    elif roll < 0.35 and len(words) > 2:
+        # 去掉末尾后缀
+        words = words[:-1]
+    return ' '.join(words)
+
+
+def generate_filing_rows(companies: list, rows: int, seed: int, unknown_ratio: float = 0.1) -> list:
+    """
+    生成13F风格的输入行 (nameOfIssuer, cusip, expected_ticker)
+    持仓名称按热门程度重复出现；unknown_ratio比例的名称不在公司列表中，期望代码为None
+    """
+    rng = random.Random(seed)
+    popular = rng.sample(companies, min(len(companies), max(1, rows // 4)))
+    result = []
+    for i in range(rows):
+        if rng.random() < unknown_ratio:
+            words = rng.sample(INDUSTRY_WORDS, 2)
+            name = f"ZZ{rng.randint(100, 999)} {' '.join(words)} FUND"
+            result.append((name, f"X{i:08d}", None))
+            continue
+        company = rng.choice(popular) if rng.random() < 0.7 else rng.choice(companies)
+        result.append((add_name_noise(company['name'], rng), f"{company['cik']:09d}", company['ticker']))
+    return result
+
+
+def write_filing_csv(rows: list, path: Path):
+    """写出convert_csv_files可读取的输入CSV"""
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['nameOfIssuer', 'cusip'])
+        writer.writerows((name, cusip) for name, cusip, _ in rows)
+
+
+def best_of(repeat: int, func):
+    """重复执行func，返回(最短耗时, 最后一次的返回值)"""
+    best = None
+    value = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        value = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, value
+
+
+@contextlib.contextmanager
+def working_directory(path: Path):
+    """临时切换工作目录（convert_csv_files在当前目录查找输入并写出结果）"""
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def bench_scale(size: int, rows: int, lookups: int, repeat: int, seed: int, workdir: Path,
+                memory_rows: int = 500) -> dict:
+    """在一个规模下运行全部测量"""
+    directory = workdir / f"scale_{size}"
+    directory.mkdir(parents=True, exist_ok=True)
+    companies = generate_universe(size, seed)
+    tickers_file, exchange_file = write_universe(companies, directory)
+    filing_rows = generate_filing_rows(companies, rows, seed + 1)
+    write_filing_csv(filing_rows, directory / 'bench_all_quarters_merged.csv')
+    names = [name for name, _, _ in filing_rows]
+
+    # 启动：加载数据并建立索引
+    # 不加载工作目录中的别名表，结果只取决于生成的数据
+    startup_sec, converter = best_of(repeat, lambda: EnhancedTest3TickerConverter(str(tickers_file),
+                                                                                  str(exchange_file),
+                                                                                  alias_file=None))
+
+    # 单次查找：逐个名称计时，不经过结果缓存
+    sample = random.Random(seed + 2).sample(filing_rows, min(lookups, len(filing_rows)))
+    latencies = []
+    correct = 0
+    for name, _, expected in sample:
+        started = time.perf_counter()
+        result = converter.find_ticker(name, use_online=False)
+        latencies.append(time.perf_counter() - started)
+        if (result['ticker'] if result else None) == expected:
+            correct += 1
+    latencies.sort()
+
+    # 相似度计算吞吐量
+    pairs = [(name, random.Random(seed + 3 + i).choice(companies)['name']) for i, name in enumerate(names[:2000])]
+    similarity_sec, _ = best_of(repeat, lambda: [converter.calculate_company_similarity(a, b) for a, b in pairs])
+
+    # 批量查找：每次清空结果缓存
+    def run_batch():
+        converter.resolved_names.clear()
+        return converter.find_tickers(names, use_online=False)
+
+    batch_sec, batch = best_of(repeat, run_batch)
+    matched = int(batch['ticker'].notna().sum())
+
+    # 完整CSV流水线（离线）
+    def run_pipeline():
+        converter.resolved_names.clear()
+        with working_directory(directory):
+            converter.convert_csv_files("bench_all_quarters_merged.csv", checkpoint_file=None,
+                                        progress_interval=3600, use_online=False)
+
+    pipeline_sec, _ = best_of(repeat, run_pipeline)
+
+    # 各输出格式的文件大小与下游读取耗时（Parquet需要pyarrow）
+    output_metrics = {}
+    for output_format, extension in OUTPUT_FORMATS.items():
+        if output_format == 'parquet' and import_optional('pyarrow') is None:
+            continue
+        table = output_table(names, batch, output_format)
+        output_file = directory / f"bench_output{extension}"
+        atomic_write(output_file, lambda f: write_table(table, f, output_format),
+                     binary=output_format in BINARY_FORMATS)
+        read_sec, _ = best_of(repeat, lambda: READERS[output_format](output_file))
+        output_metrics[f'output_{output_format}_bytes'] = output_file.stat().st_size
+        output_metrics[f'output_{output_format}_read_sec'] = round(read_sec, 4)
+
+    # 峰值内存单独测量，避免tracemalloc的开销影响计时；批量部分只取前memory_rows行
+    tracemalloc.start()
+    converter = EnhancedTest3TickerConverter(str(tickers_file), str(exchange_file), alias_file=None)
+    startup_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.reset_peak()
+    converter.find_tickers(names[:memory_rows], use_online=False)
+    batch_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        'scale': size,
+        'rows': rows,
+        'companies_loaded': len(converter.companies_data),
+        'startup_sec': round(startup_sec, 4),
+        'lookup_p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'lookup_p90_ms': round(percentile(latencies, 90) * 1000, 3),
+        'lookup_max_ms': round(latencies[-1] * 1000, 3) if latencies else 0.0,
+        'accuracy': round(correct / len(sample), 4) if sample else 0.0,
+        'similarity_per_sec': round(len(pairs) / similarity_sec, 1) if similarity_sec else 0.0,
+        'batch_sec': round(batch_sec, 4),
+        'batch_names_per_sec': round(len(names) / batch_sec, 1) if batch_sec else 0.0,
+        'match_rate': round(matched / len(names), 4) if names else 0.0,
+        'pipeline_sec': round(pipeline_sec, 4),
+        'pipeline_rows_per_sec': round(rows / pipeline_sec, 1) if pipeline_sec else 0.0,
+        'startup_peak_mb': round(startup_peak / 1024 / 1024, 2),
+        'batch_peak_mb': round(batch_peak / 1024 / 1024, 2),
+        **output_metrics,
+    }
+
+
+def bench_ann(size: int, lookups: int, seed: int, workdir: Path) -> dict:
+    """
+    在一个规模下比较近似匹配与逐个比较的search_local最佳匹配
+    召回率 = 逐个比较找到匹配的名称中，近似匹配给出同一公司的比例
+    """
+    directory = workdir / f"scale_{size}"
+    directory.mkdir(parents=True, exist_ok=True)
+    companies = generate_universe(size, seed)
+    tickers_file, exchange_file = write_universe(companies, directory)
+    converter = EnhancedTest3TickerConverter(str(tickers_file), str(exchange_file), alias_file=None)
+    build_sec = converter.enable_ann()
+    filing_rows = generate_filing_rows(companies, lookups, seed + 1)
+
+    brute_latencies = []
+    ann_latencies = []
+    candidate_counts = []
+    found = agreed = extra = 0
+    for name, _, _ in filing_rows:
+        started = time.perf_counter()
+        brute = converter.search_local(name, k=1)
+        brute_latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        candidates = converter.ann_candidates(name)
+        approximate = converter.search_local(name, companies=candidates, k=1)
+        ann_latencies.append(time.perf_counter() - started)
+        candidate_counts.append(len(candidates))
+
+        if brute:
+            found += 1
+            agreed += bool(approximate) and approximate[0][0] is brute[0][0]
+        elif approximate:
+            # 逐个比较的最佳匹配未通过验证、而近似匹配的较差候选通过了
+            extra += 1
+    brute_latencies.sort()
+    ann_latencies.sort()
+
+    return {
+        'scale': size,
+        'lookups': len(filing_rows),
+        'ann_build_sec': round(build_sec, 4),
+        'ann_index_mb': round(converter.ann_index.nbytes() / 1024 / 1024, 2),
+        'ann_candidates_mean': round(sum(candidate_counts) / len(candidate_counts), 1) if candidate_counts else 0.0,
+        'brute_p50_ms': round(percentile(brute_latencies, 50) * 1000, 3),
+        'ann_p50_ms': round(percentile(ann_latencies, 50) * 1000, 3),
+        'ann_p90_ms': round(percentile(ann_latencies, 90) * 1000, 3),
+        'ann_speedup': round(sum(brute_latencies) / sum(ann_latencies), 1) if sum(ann_latencies) else 0.0,
+        'ann_recall': round(agreed / found, 4) if found else 1.0,
+        'ann_extra_matches': extra,
+    }
+
+
+def git_commit() -> str:
+    """当前提交的hash，不在git仓库中时返回空字符串"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=Path(__file__).resolve().parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def compare(baseline: dict, current: dict, fail_over: float = None) -> bool:
+    """逐规模对比两次结果，打印比值；返回是否存在超过fail_over倍的退化"""
+    previous = {entry['scale']: entry for entry in baseline.get('results', [])}
+    regressed = False
+    print(f"对比基线 {baseline.get('meta', {}).get('commit') or '?'} → "
+          f"{current.get('meta', {}).get('commit') or '?'}")
+    for entry in current['results']:
+        old = previous.get(entry['scale'])
+        if old is None:
+            print(f"  规模 {entry['scale']}: 基线中没有该规模，跳过")
+            continue
+        print(f"  规模 {entry['scale']}:")
+        for metric, value in entry.items():
+            if metric in ('scale', 'rows', 'lookups', 'companies_loaded') or not isinstance(value, (int, float)):
+                continue
+            before = old.get(metric)
+            if not before or not value:
+                continue
+            # 统一为"变差倍数"：>1 表示退化
+            worse = before / value if metric in HIGHER_IS_BETTER else value / before
+            flag = ''
+            if fail_over and worse > fail_over:
+                flag = '  ❌ 退化'
+                regressed = True
+            print(f"    {metric:<22} {before:>12} → {value:<12} ×{worse:.2f}{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地匹配与CSV流水线的可复现性能基准")
+    parser.add_argument('--scales', default='1000,5000,10000', help="公司数量规模，逗号分隔")
+    parser.add_argument('--rows', type=int, default=1000, help="合成13F输入的行数")
+    parser.add_argument('--lookups', type=int, default=200, help="单次查找计时的样本数")
+    parser.add_argument('--memory-rows', type=int, default=500, help="测量批量峰值内存时使用的行数")
+    parser.add_argument('--repeat', type=int, default=1, help="每项计时重复次数，取最短")
+    parser.add_argument('--seed', type=int, default=42, help="随机种子")
+    parser.add_argument('--workdir', help="合成数据目录（默认使用临时目录）")
+    parser.add_argument('--output', help="结果JSON写入路径（默认打印到标准输出）")
+    parser.add_argument('--compare', help="与之对比的基线结果JSON")
+    parser.add_argument('--fail-over', type=float, help="任一指标变差超过该倍数时以退出码1结束")
+    parser.add_argument('--ann', action='store_true', help="只测量近似匹配相对逐个比较的召回率与速度")
+    args = parser.parse_args()
+
+    configure_logging(quiet=True)
+    scales = [int(scale) for scale in args.scales.split(',') if scale.strip()]
+
+    with contextlib.ExitStack() as stack:
+        workdir = Path(args.workdir) if args.workdir else Path(stack.enter_context(tempfile.TemporaryDirectory()))
+        results = []
+        for size in scales:
+            print(f"规模 {size}: 运行中...", file=sys.stderr)
+            if args.ann:
+                results.append(bench_ann(size, args.lookups, args.seed, workdir))
+            else:
+                results.append(bench_scale(size, args.rows, args.lookups, args.repeat, args.seed, workdir,
+                                           args.memory_rows))
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            'args': {'scales': scales, 'rows': args.rows, 'lookups': args.lookups,
+                     'memory_rows': args.memory_rows, 'repeat': args.repeat, 'seed': args.seed,
+                     'ann': args.ann},
+        },
+        'results': results,
+    }
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare(baseline, report, args.fail_over):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,37 +5,1056 @@ Enhanced Company Name to Ticker Converter - FIXED to match test3.py logic exactl
 修复版本，完全匹配test3.py的逻辑
 """
 
+from __future__ import annotations
+
+import argparse
+import asyncio
+import cProfile
+import functools
+import hashlib
+import heapq
+import importlib
+import itertools
 import json
-import pandas as pd
+import logging
+import operator
 import os
+import pstats
+import random
 import re
-import requests
+import sys
+import tempfile
+import threading
 import time
+import tracemalloc
 import urllib.parse
+import zlib
 from pathlib import Path
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, as_completed, wait
 from difflib import SequenceMatcher
-from typing import Optional, Dict, List, Tuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Dict, Iterable, Iterator, List, Tuple
+
+
+class LazyModule:
+    """模块代理：首次访问属性时才真正导入，单个名称查找或只读缓存的场景不必加载pandas/requests"""
+
+    def __init__(self, module_name: str):
+        self.module_name = module_name
+        self.module = None
+
+    def __getattr__(self, attr):
+        if self.module is None:
+            self.module = importlib.import_module(self.module_name)
+        return getattr(self.module, attr)
+
+
+pd = LazyModule('pandas')
+np = LazyModule('numpy')
+requests = LazyModule('requests')
+
+
+def import_optional(module_name: str):
+    """导入可选依赖，未安装时返回None"""
+    try:
+        return importlib.import_module(module_name)
+    except ImportError:
+        return None
+
+
+def is_missing(value) -> bool:
+    """None和NaN（含numpy浮点NaN）视为缺失值；pandas的NA/NaT只在pandas已导入时检查"""
+    if value is None:
+        return True
+    if isinstance(value, float):
+        return bool(value != value)
+    pandas = sys.modules.get('pandas')
+    if pandas is None or isinstance(value, str) or not pandas.api.types.is_scalar(value):
+        return False
+    return bool(pandas.isna(value))
+
+
+def atomic_write(path, write_func, binary: bool = False):
+    """
+    原子写入文件：先写入同目录的临时文件并fsync，再用os.replace替换目标文件，
+    进程中途崩溃时不会留下被截断的输出
+    binary: 以二进制模式打开临时文件（如Parquet）
+    """
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(prefix=f'.{path.name}.', suffix='.tmp',
+                                    dir=str(path.parent))
+    try:
+        with (os.fdopen(fd, 'wb') if binary else os.fdopen(fd, 'w', encoding='utf-8', newline='')) as f:
+            write_func(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+logger = logging.getLogger('company_name_to_ticker')
+logger.addHandler(logging.NullHandler())
+
+
+def configure_logging(verbose: bool = False, quiet: bool = False):
+    """
+    配置控制台日志输出
+    默认INFO（进度与统计）；verbose输出每次查找的DEBUG细节；
+    quiet只输出警告和错误，低于该级别的日志调用直接返回，不做任何字符串格式化
+    """
+    level = logging.WARNING if quiet else logging.DEBUG if verbose else logging.INFO
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.handlers[:] = [handler]
+    logger.setLevel(level)
+    logger.propagate = False
+
+
+# SEC数据文件的下载地址；SEC要求请求带有可识别的User-Agent
+SEC_FILE_URLS = {
+    'company_tickers.json': 'https://www.sec.gov/files/company_tickers.json',
+    'company_tickers_exchange.json': 'https://www.sec.gov/files/company_tickers_exchange.json'
+}
+SEC_USER_AGENT = 'Mozilla/5.0 (compatible; StockFinder/1.0; research-purpose)'
+
+# 结果缓存未命中的标记（None表示已确认查不到）
+CACHE_MISS = object()
+
+# Company suffixes from test3.py
+COMPANY_SUFFIXES = (
+    'INC', 'CORP', 'CORPORATION', 'LTD', 'LIMITED', 'LLC', 'LP', 'LLP',
+    'CO', 'COMPANY', 'HOLDINGS', 'GROUP', 'ENTERPRISES', 'SYSTEMS',
+    'TECHNOLOGIES', 'TECH', 'SOLUTIONS', 'SERVICES', 'INTERNATIONAL',
+    'PLC', 'SA', 'NV', 'AG', 'GMBH', 'SPA', 'BV', 'NEW'  # Added NEW from test3.py
+)
+
+
+def normalize_name(name: str, suffixes: Iterable[str] = COMPANY_SUFFIXES) -> str:
+    """标准化公司名称（采用test3.py的逻辑）：大写、标点换空格、去除后缀单词"""
+    name = name.upper().strip()
+    name = re.sub(r'[.,&\-/]', ' ', name)
+    name = re.sub(r'\s+', ' ', name)
+
+    words = name.split()
+    filtered_words = []
+    for word in words:
+        if word not in suffixes:
+            filtered_words.append(word)
+
+    return ' '.join(filtered_words).strip()
+
+# 批量/流式查找接口的输出列
+RESULT_COLUMNS = ['name', 'ticker', 'matched_name', 'similarity', 'source', 'status', 'cik']
+
+# 别名表（company_aliases.csv）的列：别名、代码、类型（former_name/merger/manual/online）、状态、CIK
+ALIAS_COLUMNS = ['alias', 'ticker', 'kind', 'status', 'cik']
+
+# 默认别名表的文件名，位于SEC数据文件（company_tickers_file）所在目录，而不是当前工作目录
+ALIAS_FILE_NAME = 'company_aliases.csv'
+
+# alias_file参数的默认值（哨兵）：使用SEC数据文件旁边的ALIAS_FILE_NAME
+DEFAULT_ALIAS_FILE = object()
+
+# 在线搜索结果的来源；这些结果不稳定，不记入CUSIP索引
+ONLINE_SOURCES = ('yahoo_historical', 'sec_edgar_enhanced', 'sec_edgar_pattern', 'web_search_enhanced')
+
+# 相似度相同的候选先按证券类别（普通股优先）、再按交易所优先级排序（数值小的优先），其余按数据顺序
+EXCHANGE_PRIORITY = {'NYSE': 0, 'Nasdaq': 0, 'CBOE': 1, 'OTC': 2}
+
+# 第5个字母表示衍生证券的代码后缀：U 单位、W 认股权证、R 权利（如 PACHU、CELUW）
+DERIVATIVE_TICKER_LETTERS = ('U', 'W', 'R')
+
+
+def exchange_rank(company: Dict) -> int:
+    """公司所在交易所的优先级，未知交易所排在最后"""
+    return EXCHANGE_PRIORITY.get(company.get('exchange'), len(EXCHANGE_PRIORITY))
+
+
+def share_class_rank(company: Dict) -> int:
+    """普通股为0；单位、认股权证、权利以及带后缀的优先股/类别股（如 EVEX-WT、BAC-PE）为1"""
+    ticker = company.get('ticker') or ''
+    if '-' in ticker or '.' in ticker:
+        return 1
+    return 1 if len(ticker) == 5 and ticker[-1] in DERIVATIVE_TICKER_LETTERS else 0
+
+
+def listing_rank(company: Dict) -> Tuple[int, int]:
+    """
+    同名候选的排序键：普通股优先，其次按交易所优先级
+    SEC文件中交易所为空的普通股（如 PACH）因此排在已上市的单位/认股权证（PACHU）之前
+    """
+    return share_class_rank(company), exchange_rank(company)
+
+# 输出格式 -> 输出文件扩展名
+OUTPUT_FORMATS = {'csv': '.csv', 'tsv': '.tsv', 'jsonl': '.jsonl', 'parquet': '.parquet'}
+
+# 二进制输出格式，写入时需要以二进制模式打开文件
+BINARY_FORMATS = {'parquet'}
+
+
+def require_format(output_format: str):
+    """检查输出格式可用：未知格式抛出ValueError，Parquet在未安装pyarrow时抛出ImportError"""
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"不支持的输出格式: {output_format}")
+    if output_format == 'parquet' and import_optional('pyarrow') is None:
+        raise ImportError("输出Parquet需要安装pyarrow: pip install pyarrow")
+
+
+def result_table(rows) -> pd.DataFrame:
+    """按RESULT_COLUMNS构造结果表，cik为可空整数列（Int64），不会变成320193.0这样的浮点数"""
+    table = pd.DataFrame(rows, columns=RESULT_COLUMNS)
+    table['cik'] = pd.to_numeric(table['cik'], errors='coerce').astype('Int64')
+    return table
+
+
+def output_table(names, results: pd.DataFrame, output_format: str = 'csv') -> pd.DataFrame:
+    """
+    整理输出表：nameOfIssuer, Symbol, Source
+    Parquet额外包含MatchedName, Similarity, Status, CIK，Symbol/Source为分类（字典编码）列
+    results: 与names逐行对齐、列为RESULT_COLUMNS的结果表
+    """
+    table = pd.DataFrame({
+        'nameOfIssuer': list(names),
+        'Symbol': results['ticker'].to_numpy(),
+        'Source': results['source'].to_numpy()
+    })
+    if output_format == 'parquet':
+        table['MatchedName'] = results['matched_name'].to_numpy()
+        table['Similarity'] = pd.to_numeric(results['similarity'], errors='coerce').to_numpy()
+        table['Status'] = results['status'].to_numpy()
+        table['CIK'] = pd.to_numeric(results['cik'], errors='coerce').astype('Int64').array
+        table = table.astype({'Symbol': 'category', 'Source': 'category', 'Status': 'category'})
+    return table
+
+
+def write_table(df: pd.DataFrame, f, output_format: str = 'csv'):
+    """按输出格式将DataFrame写入已打开的文件（Parquet为二进制文件）"""
+    if output_format == 'parquet':
+        pyarrow = import_optional('pyarrow')
+        parquet = import_optional('pyarrow.parquet')
+        if pyarrow is None or parquet is None:
+            raise ImportError("输出Parquet需要安装pyarrow: pip install pyarrow")
+        # 分类列写为Arrow字典类型，读回pandas时仍是分类列
+        parquet.write_table(pyarrow.Table.from_pandas(df, preserve_index=False), f, compression='zstd')
+    elif output_format == 'csv':
+        df.to_csv(f, index=False)
+    elif output_format == 'tsv':
+        df.to_csv(f, index=False, sep='\t')
+    elif output_format == 'jsonl':
+        df.to_json(f, orient='records', lines=True, force_ascii=False)
+    else:
+        raise ValueError(f"不支持的输出格式: {output_format}")
+
+
+def read_table(path, output_format: str = 'csv') -> pd.DataFrame:
+    """读取write_table写出的文件，所有列按字符串读取，缺失值为空字符串"""
+    if output_format == 'parquet':
+        return pd.read_parquet(path).astype(object).fillna('').astype(str)
+    if output_format == 'jsonl':
+        return pd.read_json(path, lines=True, dtype=False).fillna('').astype(str)
+    sep = '\t' if output_format == 'tsv' else ','
+    return pd.read_csv(path, sep=sep, dtype=str, keep_default_na=False)
+
+
+def find_name_column(columns, name_column: Optional[str] = None) -> Optional[str]:
+    """返回公司名称列：指定了name_column时要求完全一致，否则查找包含nameOfIssuer的列"""
+    if name_column:
+        return name_column if name_column in columns else None
+    for col in columns:
+        if 'nameOfIssuer' in col or 'nameOfIssue' in col:
+            return col
+    return None
+
+
+def find_cusip_column(columns, cusip_column: Optional[str] = None) -> Optional[str]:
+    """返回CUSIP列：指定了cusip_column时要求完全一致，否则查找列名包含cusip（不区分大小写）的列"""
+    if cusip_column:
+        return cusip_column if cusip_column in columns else None
+    for col in columns:
+        if 'cusip' in str(col).lower():
+            return col
+    return None
+
+
+def normalize_cusip(value) -> Optional[str]:
+    """
+    标准化CUSIP（大写，去空格），无效时返回None
+    CUSIP列需按文本读取（见convert_csv_files），否则纯数字CUSIP会丢失前导零
+    """
+    if is_missing(value):
+        return None
+    cusip = str(value).strip().upper()
+    if len(cusip) not in (8, 9) or not cusip.isalnum():
+        return None
+    return cusip
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """最近秩法计算分位数（sorted_values已排序），供基准测试和压测工具使用"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def file_fingerprint(path, chunk_size: int = 1 << 20) -> str:
+    """计算文件内容的SHA-256指纹，用于判断输入是否变化"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class JsonStream:
+    """
+    JSON增量扫描器：按块读取文本文件，用JSONDecoder.raw_decode逐个解码值，
+    调用方可以逐元素遍历大数组而不必一次性构造整个对象树
+    """
+
+    WHITESPACE = ' \t\r\n'
+
+    # 数字之后直到缓冲区末尾都是数字字符：数字可能在块边界被截断（如 "3." 或 "1e"）
+    NUMBER_TAIL = re.compile(r'[0-9.eE+\-]*\Z')
+
+    def __init__(self, f, chunk_size: int = 1 << 16):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def fill(self) -> bool:
+        """读入下一块，丢弃已解析的部分；文件结束时返回False"""
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """跳过空白，返回下一个字符（文件结束时为空字符串）"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in self.WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                return ''
+
+    def expect(self, char: str):
+        """消费一个指定的结构字符"""
+        if self.peek() != char:
+            raise ValueError(f"JSON格式错误: 期望 '{char}'，位置附近内容: {self.buffer[self.pos:self.pos + 20]!r}")
+        self.pos += 1
+
+    def skip(self, char: str) -> bool:
+        """下一个字符是char时消费它并返回True"""
+        if self.peek() == char:
+            self.pos += 1
+            return True
+        return False
+
+    def value(self):
+        """解码下一个完整的JSON值，缓冲区内不完整时继续读入"""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            # 数字可能恰好在块边界被截断，读入更多内容后重新解码
+            if (not self.eof and isinstance(value, (int, float)) and not isinstance(value, bool)
+                    and self.NUMBER_TAIL.match(self.buffer, end) and self.fill()):
+                continue
+            self.pos = end
+            return value
+
+    def keys(self) -> Iterator[str]:
+        """逐个产出当前对象的键；调用方需在下一次迭代前用value()或elements()消费对应的值"""
+        self.expect('{')
+        if self.skip('}'):
+            return
+        while True:
+            key = self.value()
+            self.expect(':')
+            yield key
+            if not self.skip(','):
+                break
+        self.expect('}')
+
+    def elements(self) -> Iterator:
+        """逐个解码当前数组的元素"""
+        self.expect('[')
+        if self.skip(']'):
+            return
+        while True:
+            yield self.value()
+            if not self.skip(','):
+                break
+        self.expect(']')
+
+
+def field_getter(fields: List[str], wanted: Tuple[str, ...]):
+    """返回从一行中按wanted顺序取出字段元组的函数（wanted至少两个字段）"""
+    return operator.itemgetter(*[fields.index(field) for field in wanted])
+
+
+def iter_exchange_rows(f, wanted: Tuple[str, ...] = ('cik', 'name', 'ticker', 'exchange')) -> Iterator[tuple]:
+    """
+    流式读取company_tickers_exchange.json（{"fields": [...], "data": [[...], ...]}），
+    每行只保留wanted中的字段，以元组产出
+    """
+    stream = JsonStream(f)
+    getter = None
+    pending = []    # fields出现在data之后时先暂存的行
+    for key in stream.keys():
+        if key == 'fields':
+            getter = field_getter(stream.value(), wanted)
+            yield from map(getter, pending)
+            pending = []
+        elif key == 'data':
+            for row in stream.elements():
+                if getter is None:
+                    pending.append(row)
+                else:
+                    yield getter(row)
+        else:
+            stream.value()
+
+
+def iter_ticker_rows(f) -> Iterator[Tuple[str, str, Optional[int]]]:
+    """流式读取company_tickers.json（{"0": {"cik_str", "ticker", "title"}, ...}），产出 (title, ticker, cik)"""
+    stream = JsonStream(f)
+    for _ in stream.keys():
+        company = stream.value()
+        if isinstance(company, dict) and 'title' in company and 'ticker' in company:
+            yield company['title'], company['ticker'], company.get('cik_str')
+
+
+def read_exchange_rows(path, wanted: Tuple[str, ...] = ('cik', 'name', 'ticker', 'exchange')) -> List[tuple]:
+    """读取company_tickers_exchange.json的所需字段：安装了orjson时整体快速解析，否则流式解析"""
+    orjson = import_optional('orjson')
+    if orjson is None:
+        with open(path, 'r', encoding='utf-8') as f:
+            return list(iter_exchange_rows(f, wanted))
+
+    with open(path, 'rb') as f:
+        data = orjson.loads(f.read())
+    if 'data' not in data or 'fields' not in data:
+        return []
+    return list(map(field_getter(data['fields'], wanted), data['data']))
+
+
+def read_ticker_rows(path) -> List[Tuple[str, str, Optional[int]]]:
+    """读取company_tickers.json的 (title, ticker, cik)：安装了orjson时整体快速解析，否则流式解析"""
+    orjson = import_optional('orjson')
+    if orjson is None:
+        with open(path, 'r', encoding='utf-8') as f:
+            return list(iter_ticker_rows(f))
+
+    with open(path, 'rb') as f:
+        data = orjson.loads(f.read())
+    return [(company['title'], company['ticker'], company.get('cik_str')) for company in data.values()
+            if isinstance(company, dict) and 'title' in company and 'ticker' in company]
+
+
+class StageStats:
+    """
+    按阶段/数据源记录调用次数、累计与最大耗时、异常和空结果次数，以及通用计数器
+    多线程共享时在锁内更新
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.stages = {}
+        self.counters = {}
+
+    def record(self, stage: str, elapsed: float, error: bool = False, empty: bool = False):
+        with self.lock:
+            entry = self.stages.get(stage)
+            if entry is None:
+                entry = self.stages[stage] = {'calls': 0, 'total_sec': 0.0, 'max_sec': 0.0,
+                                              'errors': 0, 'empty': 0}
+            entry['calls'] += 1
+            entry['total_sec'] += elapsed
+            entry['max_sec'] = max(entry['max_sec'], elapsed)
+            entry['errors'] += error
+            entry['empty'] += empty
+
+    def count(self, name: str, n: int = 1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def snapshot(self) -> Dict:
+        with self.lock:
+            stages = {}
+            for stage, entry in sorted(self.stages.items()):
+                stages[stage] = {
+                    'calls': entry['calls'],
+                    'total_sec': round(entry['total_sec'], 6),
+                    'avg_ms': round(entry['total_sec'] / entry['calls'] * 1000, 3),
+                    'max_ms': round(entry['max_sec'] * 1000, 3),
+                    'errors': entry['errors'],
+                    'empty': entry['empty']
+                }
+            return {
+                'enabled': True,
+                'uptime_sec': round(time.time() - self.started, 3),
+                'stages': stages,
+                'counters': dict(sorted(self.counters.items()))
+            }
+
+
+class MetricsRegistry:
+    """
+    Prometheus文本格式（0.0.4）的指标注册表，支持counter/gauge/histogram和标签，线程安全
+    """
+
+    DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+
+    def register(self, name: str, kind: str, help_text: str, buckets: Optional[Tuple[float, ...]] = None):
+        """注册指标，kind为counter、gauge或histogram"""
+        with self.lock:
+            self.metrics.setdefault(name, {
+                'kind': kind,
+                'help': help_text,
+                'buckets': tuple(buckets or self.DEFAULT_BUCKETS) if kind == 'histogram' else None,
+                'samples': {}
+            })
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """counter/gauge增加value"""
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            samples = self.metrics[name]['samples']
+            samples[key] = samples.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        """设置gauge的值"""
+        with self.lock:
+            self.metrics[name]['samples'][tuple(sorted(labels.items()))] = value
+
+    def observe(self, name: str, value: float, **labels):
+        """histogram记录一个观测值"""
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            metric = self.metrics[name]
+            sample = metric['samples'].get(key)
+            if sample is None:
+                sample = metric['samples'][key] = {'buckets': [0] * len(metric['buckets']),
+                                                   'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(metric['buckets']):
+                if value <= bound:
+                    sample['buckets'][i] += 1
+                    break
+            sample['sum'] += value
+            sample['count'] += 1
+
+    @staticmethod
+    def format_labels(labels) -> str:
+        if not labels:
+            return ''
+        escaped = []
+        for key, value in labels:
+            value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+            escaped.append(f'{key}="{value}"')
+        return '{' + ','.join(escaped) + '}'
+
+    @staticmethod
+    def format_value(value: float) -> str:
+        if value == float('inf'):
+            return '+Inf'
+        return repr(float(value)) if isinstance(value, float) else str(value)
+
+    def render(self) -> str:
+        """生成Prometheus文本格式的指标输出"""
+        lines = []
+        with self.lock:
+            for name, metric in sorted(self.metrics.items()):
+                lines.append(f'# HELP {name} {metric["help"]}')
+                lines.append(f'# TYPE {name} {metric["kind"]}')
+                for labels, sample in sorted(metric['samples'].items()):
+                    if metric['kind'] != 'histogram':
+                        lines.append(f'{name}{self.format_labels(labels)} {self.format_value(sample)}')
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(metric['buckets'], sample['buckets']):
+                        cumulative += count
+                        bucket_labels = labels + (('le', self.format_value(bound)),)
+                        lines.append(f'{name}_bucket{self.format_labels(bucket_labels)} {cumulative}')
+                    lines.append(f'{name}_bucket{self.format_labels(labels + (("le", "+Inf"),))} {sample["count"]}')
+                    lines.append(f'{name}_sum{self.format_labels(labels)} {self.format_value(sample["sum"])}')
+                    lines.append(f'{name}_count{self.format_labels(labels)} {sample["count"]}')
+        return '\n'.join(lines) + '\n'
+
+
+def timed_stage(stage: str):
+    """
+    方法装饰器：统计或指标开启时记录该阶段的耗时、异常和空结果；
+    两者都关闭时只多两次属性判断
+    """
+    def decorator(method):
+        if asyncio.iscoroutinefunction(method):
+            @functools.wraps(method)
+            async def async_wrapper(self, *args, **kwargs):
+                if self.stage_stats is None and self.metrics is None:
+                    return await method(self, *args, **kwargs)
+                started = time.perf_counter()
+                try:
+                    result = await method(self, *args, **kwargs)
+                except BaseException:
+                    self.record_stage(stage, time.perf_counter() - started, error=True)
+                    raise
+                self.record_stage(stage, time.perf_counter() - started, empty=not result)
+                return result
+            return async_wrapper
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if self.stage_stats is None and self.metrics is None:
+                return method(self, *args, **kwargs)
+            started = time.perf_counter()
+            try:
+                result = method(self, *args, **kwargs)
+            except BaseException:
+                self.record_stage(stage, time.perf_counter() - started, error=True)
+                raise
+            self.record_stage(stage, time.perf_counter() - started, empty=not result)
+            return result
+        return wrapper
+    return decorator
+
+
+class LookupProfiler:
+    """
+    查找剖析：按比例抽样，或对超过延迟阈值的查找，记录cProfile与tracemalloc快照到目录，
+    以输入名称和实际走过的路径标记，供离线分析
+    cProfile与tracemalloc都是进程级的，同一时间只剖析一个查找，其余并发查找照常执行
+    """
+
+    # 在剖析数据中出现即说明查找走过该步骤
+    PATH_FUNCTIONS = ('search_exact', 'search_local', 'find_ticker_online')
+
+    def __init__(self, directory, sample_rate: float = 0.0, threshold: Optional[float] = None,
+                 seed: Optional[int] = None):
+        """
+        directory: 输出目录，不存在时创建
+        sample_rate: 抽样剖析的查找比例（0~1）
+        threshold: 延迟阈值（秒），设置后每个查找都在剖析下运行，只保存超过阈值的
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.sample_rate = sample_rate
+        self.threshold = threshold
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.captured = 0
+
+    def run(self, name, func):
+        """执行func()，需要时在剖析下运行并保存结果"""
+        sampled = self.sample_rate > 0 and self.random.random() < self.sample_rate
+        if not sampled and self.threshold is None:
+            return func()
+        if not self.lock.acquire(blocking=False):
+            return func()
+
+        # 只启动/停止自己开启的tracemalloc；外部调用方已在追踪时不重置它的峰值，
+        # 此时单个查找的峰值无法单独得到，记为None
+        started_tracing = not tracemalloc.is_tracing()
+        try:
+            if started_tracing:
+                tracemalloc.start()
+            profile = cProfile.Profile()
+            started = time.perf_counter()
+            profile.enable()
+            try:
+                result = func()
+            finally:
+                profile.disable()
+            elapsed = time.perf_counter() - started
+
+            slow = self.threshold is not None and elapsed >= self.threshold
+            if sampled or slow:
+                peak_bytes = tracemalloc.get_traced_memory()[1] if started_tracing else None
+                self.save(name, result, profile, tracemalloc.take_snapshot(),
+                          peak_bytes, elapsed, 'sampled' if sampled else 'slow')
+            return result
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+            self.lock.release()
+
+    def lookup_path(self, profile: cProfile.Profile, result) -> str:
+        """根据剖析数据中出现的查找步骤和最终结果来源，得到形如 search_exact>search_local>local 的路径"""
+        called = {funcname for _, _, funcname in pstats.Stats(profile).stats}
+        steps = [function for function in self.PATH_FUNCTIONS if function in called]
+        steps.append(result.get('source', 'unknown') if isinstance(result, dict) else 'not_found')
+        return '>'.join(steps)
+
+    def save(self, name, result, profile: cProfile.Profile, snapshot, peak_bytes: Optional[int],
+             elapsed: float, reason: str):
+        """写出 .prof（cProfile）、.tracemalloc（快照）和 .json（标签）三个文件"""
+        self.captured += 1
+        slug = re.sub(r'[^A-Za-z0-9]+', '_', str(name)).strip('_')[:40] or 'empty'
+        stem = self.directory / f"{time.strftime('%Y%m%d-%H%M%S')}_{self.captured:05d}_{slug}"
+        path = self.lookup_path(profile, result)
+
+        profile.dump_stats(f"{stem}.prof")
+        snapshot.dump(f"{stem}.tracemalloc")
+        meta = {
+            'name': name,
+            'path': path,
+            'reason': reason,
+            'elapsed_sec': round(elapsed, 6),
+            'peak_traced_bytes': peak_bytes,
+            'ticker': result.get('ticker') if isinstance(result, dict) else None,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        }
+        with open(f"{stem}.json", 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        logger.info("已保存查找剖析 (%s, %.3fs, %s): %s", reason, elapsed, path, stem)
+
+
+def profiled(method):
+    """方法装饰器：开启剖析时把调用交给LookupProfiler，第一个参数作为名称标签"""
+    @functools.wraps(method)
+    def wrapper(self, company_name, *args, **kwargs):
+        if self.profiler is None:
+            return method(self, company_name, *args, **kwargs)
+        return self.profiler.run(company_name, lambda: method(self, company_name, *args, **kwargs))
+    return wrapper
+
+
+class LookupCancelled(BaseException):
+    """
+    在线查找已被调用方取消（如超过find_tickers的deadline）
+    继承BaseException，不会被搜索方法里的except Exception吞掉
+    """
+
+
+class SingleFlight:
+    """
+    请求合并：同一个键的并发调用只真正执行一次，
+    其余调用者阻塞等待并共享同一个结果（或异常）
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    def do(self, key, func, *args, **kwargs):
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = Future()
+                self.calls[key] = call
+
+        if not leader:
+            try:
+                return call.result()
+            except LookupCancelled:
+                # 执行者被它自己的调用方取消，与本调用无关：重新执行
+                return self.do(key, func, *args, **kwargs)
+
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            with self.lock:
+                self.calls.pop(key, None)
+
+
+class AsyncSingleFlight:
+    """SingleFlight的asyncio版本，绑定到创建它的事件循环"""
+
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+        self.tasks = {}
+
+    async def do(self, key, coro_func, *args, **kwargs):
+        entry = self.tasks.get(key)
+        if entry is None:
+            entry = {'task': asyncio.ensure_future(coro_func(*args, **kwargs)), 'waiters': 0}
+            self.tasks[key] = entry
+            entry['task'].add_done_callback(lambda _: self.forget(key, entry))
+        task = entry['task']
+        entry['waiters'] += 1
+        try:
+            # shield: 某个等待者被取消时不影响其他共享该结果的调用者
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            # 最后一个等待者也被取消（如超过find_tickers_async的deadline）：取消查找本身，
+            # 不再在后台发出请求；之后的同名调用重新执行
+            if entry['waiters'] == 1:
+                self.forget(key, entry)
+                task.cancel()
+            raise
+        finally:
+            entry['waiters'] -= 1
+
+    def forget(self, key, entry):
+        """移除已完成或已取消的调用（键已被新的调用占用时不动）"""
+        if self.tasks.get(key) is entry:
+            del self.tasks[key]
+
+
+def coalesce(key_func):
+    """
+    方法装饰器：按key_func(self, *args)计算的键合并并发调用（见SingleFlight）
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            key = (method.__name__, key_func(self, *args, **kwargs))
+            return self.flight.do(key, method, self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def company_key(converter, company_name, *args, exchanges=None, **kwargs):
+    """以标准化名称作为请求合并的键（带交易所过滤时加上过滤条件）"""
+    if not isinstance(company_name, str):
+        return company_name
+    key = converter.normalize_company_name(company_name) or company_name.strip()
+    return (key, tuple(sorted(exchanges))) if exchanges else key
+
+
+def company_record_key(company: Dict) -> tuple:
+    """公司记录的比较键: (名称, 代码, CIK, 交易所, 来源)"""
+    return company['name'], company['ticker'], company.get('cik'), company.get('exchange'), company['source']
+
+
+def verification_key(converter, ticker, company_name, *args, **kwargs):
+    """股票代码验证请求的合并键: (代码, 标准化名称)"""
+    return str(ticker).upper(), company_key(converter, company_name)
+
+
+class MinHashLSH:
+    """
+    近似最近邻索引：标准化名称（去掉空格）的字符3-gram做MinHash签名，按LSH分成bands组、每组rows个哈希
+    任一组签名完全相同的记录成为候选；签名与分桶都存为NumPy数组，每组按桶键排序后用二分查找
+    """
+
+    # 小于2^32的最大素数，哈希值可以存为uint32
+    PRIME = 4294967291
+
+    def __init__(self, records: Iterable[Dict], bands: int = 24, rows: int = 3, shingle_size: int = 3,
+                 seed: int = 1, chunk_size: int = 4096):
+        self.records = tuple(records)
+        self.bands = bands
+        self.rows = rows
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        # 每个哈希函数为 (a*x + b) mod PRIME；a < 2^31 保证uint64乘法不溢出
+        self.a = rng.integers(1, 1 << 31, size=bands * rows, dtype=np.uint64)
+        self.b = rng.integers(0, 1 << 31, size=bands * rows, dtype=np.uint64)
+
+        band_keys = []
+        for start in range(0, len(self.records), chunk_size):
+            chunk = self.signatures([record['norm'] for record in self.records[start:start + chunk_size]])
+            band_keys.append(self.band_keys(chunk))
+        keys = np.concatenate(band_keys, axis=1) if band_keys else np.empty((bands, 0), dtype=np.uint64)
+
+        # 每组按桶键排序：order[j]是第j组中记录编号的排列，keys[j]是排序后的桶键
+        self.order = np.argsort(keys, axis=1, kind='stable').astype(np.uint32)
+        self.keys = np.take_along_axis(keys, self.order.astype(np.int64), axis=1)
+
+    def shingles(self, norm: str) -> List[int]:
+        """名称去掉空格后的字符n-gram的CRC32（两端加边界符，"E M C"与"EMC"的切片相同）"""
+        text = '^' + (norm or '').replace(' ', '') + '$'
+        size = min(self.shingle_size, len(text))
+        return list({zlib.crc32(text[i:i + size].encode('utf-8')) for i in range(len(text) - size + 1)})
+
+    def signatures(self, norms: List[str]):
+        """一批名称的MinHash签名，形状 (名称数, bands*rows)，uint32"""
+        hashes = []
+        starts = []
+        for norm in norms:
+            starts.append(len(hashes))
+            hashes.extend(self.shingles(norm))
+        values = np.array(hashes, dtype=np.uint64)
+        permuted = (self.a[:, None] * values[None, :] + self.b[:, None]) % np.uint64(self.PRIME)
+        return np.minimum.reduceat(permuted, np.array(starts, dtype=np.int64), axis=1).T.astype(np.uint32)
+
+    def band_keys(self, signatures):
+        """把每组rows个签名值合成一个64位桶键，形状 (bands, 名称数)"""
+        grouped = signatures.astype(np.uint64).reshape(len(signatures), self.bands, self.rows)
+        keys = grouped[:, :, 0].copy()
+        for column in range(1, self.rows):
+            keys = keys * np.uint64(1000003) ^ grouped[:, :, column]
+        return keys.T
+
+    def query(self, norm: str) -> List[Dict]:
+        """返回与norm至少有一组桶键相同的记录（按原数据顺序，保证并列时与逐个比较的结果一致）"""
+        if not self.records:
+            return []
+        keys = self.band_keys(self.signatures([norm]))[:, 0]
+        matches = []
+        for band, key in enumerate(keys):
+            low, high = np.searchsorted(self.keys[band], [key, key + np.uint64(1)])
+            if high > low:
+                matches.append(self.order[band, low:high])
+        if not matches:
+            return []
+        return [self.records[i] for i in np.unique(np.concatenate(matches))]
+
+    def nbytes(self) -> int:
+        """索引数组占用的字节数"""
+        return self.keys.nbytes + self.order.nbytes
+
+
+class AsyncHttpBackend:
+    """
+    异步HTTP后端：安装了aiohttp时使用aiohttp，否则在线程中执行requests.get
+    同一主机的请求按最小间隔排队（非阻塞sleep），总并发数由信号量限制
+    """
+
+    def __init__(self, max_concurrency: int = 100, per_host_interval: float = 0.2,
+                 recorder=None):
+        self.loop = asyncio.get_running_loop()
+        # recorder(stage, elapsed, error=...): 耗时统计回调，通常为converter.record_stage
+        self.recorder = recorder
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.per_host_interval = per_host_interval
+        self.next_slot = {}
+        self.session = None
+        # 可选依赖，未安装时在线程中使用requests
+        self.aiohttp = import_optional('aiohttp')
+
+    async def wait_for_host(self, host: str):
+        """为该主机预约下一个请求时间片，必要时非阻塞地等待"""
+        now = self.loop.time()
+        slot = max(now, self.next_slot.get(host, now))
+        self.next_slot[host] = slot + self.per_host_interval
+        if slot > now:
+            if self.recorder is not None:
+                self.recorder('rate_limit_wait', slot - now)
+            await asyncio.sleep(slot - now)
+
+    async def get(self, url: str, params: Optional[Dict] = None, headers: Optional[Dict] = None,
+                  timeout: float = 10) -> Tuple[int, str]:
+        """发送GET请求，返回(状态码, 响应文本)"""
+        host = urllib.parse.urlsplit(url).netloc
+        await self.wait_for_host(host)
+        async with self.semaphore:
+            started = time.perf_counter()
+            status = None
+            try:
+                if self.aiohttp is None:
+                    response = await asyncio.to_thread(requests.get, url, params=params,
+                                                       headers=headers, timeout=timeout)
+                    status = response.status_code
+                    return status, response.text
+
+                if self.session is None:
+                    self.session = self.aiohttp.ClientSession()
+                async with self.session.get(url, params=params, headers=headers,
+                                            timeout=self.aiohttp.ClientTimeout(total=timeout)) as response:
+                    status = response.status
+                    return status, await response.text(errors='replace')
+            finally:
+                if self.recorder is not None:
+                    self.recorder(f'http:{host}', time.perf_counter() - started,
+                                  error=status != 200)
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
 
 
 class EnhancedTest3TickerConverter:
     def __init__(self,
                  company_tickers_file="company_tickers.json",
-                 company_tickers_exchange_file="company_tickers_exchange.json"):
+                 company_tickers_exchange_file="company_tickers_exchange.json",
+                 collect_stats: bool = False,
+                 collect_metrics: bool = False,
+                 alias_file=DEFAULT_ALIAS_FILE):
         """
         Initialize the enhanced test3.py logic ticker converter
+        collect_stats: 是否记录各阶段耗时与计数（见stats()）
+        collect_metrics: 是否记录Prometheus指标（见metrics_text()）
+        alias_file: 别名表（曾用名、合并、人工指定），在线搜索验证过的结果自动追加到该文件；
+                    默认为SEC数据文件所在目录下的company_aliases.csv，None表示不使用
         """
-        self.companies_data = []
+        if alias_file is DEFAULT_ALIAS_FILE:
+            alias_file = str(Path(company_tickers_file).parent / ALIAS_FILE_NAME)
 
-        # Load local SEC data - 使用与test3.py完全相同的加载逻辑
-        self.load_local_data(company_tickers_exchange_file, company_tickers_file)
+        # 各阶段耗时统计与Prometheus指标，关闭时为None
+        self.stage_stats = StageStats() if collect_stats else None
+        self.metrics = None
+        if collect_metrics:
+            self.enable_metrics()
+
+        # 查找剖析，关闭时为None（见enable_profiling()）
+        self.profiler = None
+
+        # 加载完成后为只读元组，多线程共享时无需加锁
+        self.companies_data = ()
+
+        # 标准化名称 -> 第一个同名公司，用于完全匹配的快速路径（整体替换，不原地修改）
+        self.exact_index = {}
+
+        # 已解析公司名称的结果缓存（标准化名称 -> 结果或None），用于去重和断点续跑
+        # 读取依赖dict.get的原子性，写入和遍历在cache_lock下进行
+        self.resolved_names = {}
+        self.cache_lock = threading.RLock()
+
+        # CUSIP前8位（发行人+证券，不含校验位）-> 已知结果，在名称匹配之前查询
+        self.cusip_index = {}
+
+        # 近似匹配索引（MinHashLSH），开启后本地模糊匹配只对候选计算相似度（见enable_ann()）
+        self.ann_index = None
+        self.ann_options = {}
+
+        # 别名表：记录格式与公司表相同，整体替换；新增别名在alias_lock下进行
+        self.alias_file = alias_file
+        self.alias_data = ()
+        self.alias_index = {}
+        self.alias_lock = threading.Lock()
+
+        # 每个线程各自的requests.Session，复用连接
+        self.http_local = threading.local()
+
+        # 异步HTTP后端，在首次异步调用时按事件循环创建
+        self.async_http = None
+
+        # 并发请求合并：同一名称/同一代码验证同时只执行一次
+        self.flight = SingleFlight()
+        self.async_flight = None
 
         # Company suffixes from test3.py
-        self.company_suffixes = [
-            'INC', 'CORP', 'CORPORATION', 'LTD', 'LIMITED', 'LLC', 'LP', 'LLP',
-            'CO', 'COMPANY', 'HOLDINGS', 'GROUP', 'ENTERPRISES', 'SYSTEMS',
-            'TECHNOLOGIES', 'TECH', 'SOLUTIONS', 'SERVICES', 'INTERNATIONAL',
-            'PLC', 'SA', 'NV', 'AG', 'GMBH', 'SPA', 'BV', 'NEW'  # Added NEW from test3.py
-        ]
+        self.company_suffixes = list(COMPANY_SUFFIXES)
+
+        # Load local SEC data - 使用与test3.py完全相同的加载逻辑
+        self.company_tickers_file = company_tickers_file
+        self.company_tickers_exchange_file = company_tickers_exchange_file
+        self.load_local_data(company_tickers_exchange_file, company_tickers_file)
+        if alias_file:
+            self.load_aliases(alias_file)
 
     def load_local_data(self, json_file1: str, json_file2: str):
         """
@@ -43,44 +1062,500 @@ class EnhancedTest3TickerConverter:
         json_file1: company_tickers_exchange.json
         json_file2: company_tickers.json
         """
-        # 加载第一个文件 (company_tickers_exchange.json)
+        self.companies_data = tuple(self.read_companies(json_file1, json_file2))
+        logger.info("成功加载 %s 家公司的数据", len(self.companies_data))
+
+        self.build_exact_index()
+
+    def read_companies(self, json_file1: str, json_file2: str) -> List[Dict]:
+        """读取两个SEC文件，按test3.py的规则合并为公司列表（第二个文件中代码已存在的公司跳过）"""
+        companies_data = []
+
+        # 加载第一个文件 (company_tickers_exchange.json)，保留CIK、名称、代码和交易所
         try:
-            with open(json_file1, 'r', encoding='utf-8') as f:
-                data1 = json.load(f)
-                if 'data' in data1 and 'fields' in data1:
-                    fields = data1['fields']
-                    name_idx = fields.index('name')
-                    ticker_idx = fields.index('ticker')
-                    for row in data1['data']:
-                        self.companies_data.append({
-                            'name': row[name_idx],
-                            'ticker': row[ticker_idx],
-                            'source': 'file1'
-                        })
+            for cik, name, ticker, exchange in read_exchange_rows(json_file1):
+                companies_data.append({
+                    'name': name,
+                    'ticker': ticker,
+                    'source': 'file1',
+                    'cik': cik,
+                    'exchange': exchange
+                })
         except FileNotFoundError:
-            print(f"警告: 无法找到文件 {json_file1}")
+            logger.warning("警告: 无法找到文件 %s", json_file1)
         except Exception as e:
-            print(f"加载文件 {json_file1} 时出错: {e}")
+            logger.warning("加载文件 %s 时出错: %s", json_file1, e)
 
-        # 加载第二个文件 (company_tickers.json)
+        # 加载第二个文件 (company_tickers.json)，代码已存在的公司跳过（含本文件中重复的代码）
+        existing_tickers = {company['ticker'] for company in companies_data}
         try:
-            with open(json_file2, 'r', encoding='utf-8') as f:
-                data2 = json.load(f)
-                for key, company in data2.items():
-                    if isinstance(company, dict) and 'title' in company and 'ticker' in company:
-                        existing_tickers = [comp['ticker'] for comp in self.companies_data]
-                        if company['ticker'] not in existing_tickers:
-                            self.companies_data.append({
-                                'name': company['title'],
-                                'ticker': company['ticker'],
-                                'source': 'file2'
-                            })
+            for title, ticker, cik in read_ticker_rows(json_file2):
+                if ticker not in existing_tickers:
+                    existing_tickers.add(ticker)
+                    companies_data.append({
+                        'name': title,
+                        'ticker': ticker,
+                        'source': 'file2',
+                        'cik': cik,
+                        'exchange': None
+                    })
         except FileNotFoundError:
-            print(f"警告: 无法找到文件 {json_file2}")
+            logger.warning("警告: 无法找到文件 %s", json_file2)
         except Exception as e:
-            print(f"加载文件 {json_file2} 时出错: {e}")
+            logger.warning("加载文件 %s 时出错: %s", json_file2, e)
 
-        print(f"成功加载 {len(self.companies_data)} 家公司的数据")
+        return companies_data
+
+    def build_exact_index(self):
+        """
+        按标准化名称建立完全匹配索引（保留数据顺序中的第一个公司）
+        标准化名称同时记在每个公司的'norm'字段，增量刷新时只需标准化变化的名称
+        """
+        names = pd.Series([company['name'] for company in self.companies_data], dtype=object)
+        for company, norm in zip(self.companies_data, self.normalize_series(names)):
+            company['norm'] = norm if isinstance(norm, str) else ''
+        self.exact_index = self.index_by_norm(self.companies_data)
+
+    def index_by_norm(self, companies: Iterable[Dict]) -> Dict:
+        """
+        由公司的'norm'字段建立完全匹配索引
+        同名公司按listing_rank取第一个，与search_local的排序一致
+        """
+        exact_index = {}
+        for company in companies:
+            norm = company['norm']
+            if norm and (norm not in exact_index or listing_rank(company) < listing_rank(exact_index[norm])):
+                exact_index[norm] = company
+        return exact_index
+
+    def enable_ann(self, bands: int = 24, rows: int = 3, seed: int = 1) -> float:
+        """
+        开启近似匹配：为公司表建立MinHashLSH索引，search_local只对LSH候选用相同的相似度精确重排
+        适合几十万以上名称的参考数据；候选之外的公司不会被匹配，召回率见 benchmark.py --ann
+        返回建索引耗时（秒）
+        """
+        started = time.perf_counter()
+        self.ann_options = {'bands': bands, 'rows': rows, 'seed': seed}
+        self.ann_index = MinHashLSH(self.companies_data, **self.ann_options)
+        elapsed = time.perf_counter() - started
+        logger.info("近似匹配索引已建立: %s 家公司, %s×%s 个哈希, %.1f MB, 耗时 %.2fs",
+                    len(self.companies_data), bands, rows, self.ann_index.nbytes() / 1024 / 1024, elapsed)
+        return elapsed
+
+    def ann_candidates(self, company_name: str) -> Optional[List[Dict]]:
+        """近似匹配开启时返回LSH候选公司，未开启时返回None（表示搜索全部公司）"""
+        ann_index = self.ann_index
+        if ann_index is None:
+            return None
+        return ann_index.query(self.normalize_company_name(company_name))
+
+    def load_aliases(self, alias_file: str) -> int:
+        """加载别名表（CSV，列见ALIAS_COLUMNS，只有alias和ticker是必需的），返回别名数"""
+        try:
+            aliases = pd.read_csv(alias_file, dtype=str, keep_default_na=False)
+        except FileNotFoundError:
+            return 0
+        except Exception as e:
+            logger.warning("加载别名表 %s 时出错: %s", alias_file, e)
+            return 0
+
+        if not {'alias', 'ticker'}.issubset(aliases.columns):
+            logger.warning("别名表 %s 缺少alias或ticker列，可用列: %s", alias_file, list(aliases.columns))
+            return 0
+
+        alias_data = []
+        for row in aliases.to_dict('records'):
+            if row['alias'].strip() and row['ticker'].strip():
+                alias_data.append(self.alias_record(row['alias'].strip(), row['ticker'].strip(),
+                                                    row.get('kind', ''), row.get('status', ''), row.get('cik', '')))
+        self.alias_data = tuple(alias_data)
+        self.alias_index = self.index_by_norm(self.alias_data)
+        logger.info("成功加载 %s 个别名", len(self.alias_data))
+        return len(self.alias_data)
+
+    def alias_record(self, alias: str, ticker: str, kind=None, status=None, cik=None) -> Dict:
+        """别名记录（字段与公司表相同，另有kind和status）"""
+        cik = str(cik).strip() if not is_missing(cik) else ''
+        return {
+            'name': alias,
+            'ticker': ticker,
+            'source': 'alias',
+            'cik': int(cik) if cik.isdigit() else None,
+            'exchange': None,
+            'kind': kind or 'manual',
+            'status': status or 'unknown',
+            'norm': self.normalize_company_name(alias)
+        }
+
+    def add_alias(self, alias: str, result: Dict, kind: str = 'online') -> bool:
+        """
+        将在线搜索验证过的结果记为别名，追加到别名文件，之后同一名称在本地即可找到
+        已有相同标准化名称的别名时不重复添加，返回是否新增
+        """
+        record = self.alias_record(alias.strip(), result['ticker'], kind, result.get('status'), result.get('cik'))
+        if not record['norm']:
+            return False
+        with self.alias_lock:
+            if record['norm'] in self.alias_index:
+                return False
+            alias_index = dict(self.alias_index)
+            alias_index[record['norm']] = record
+            self.alias_data = self.alias_data + (record,)
+            self.alias_index = alias_index
+            if self.alias_file:
+                try:
+                    row = pd.DataFrame([[record['name'], record['ticker'], record['kind'], record['status'],
+                                         '' if record['cik'] is None else str(record['cik'])]],
+                                       columns=ALIAS_COLUMNS)
+                    header = None
+                    if os.path.exists(self.alias_file) and os.path.getsize(self.alias_file) > 0:
+                        header = list(pd.read_csv(self.alias_file, nrows=0).columns)
+                    if header is None or set(ALIAS_COLUMNS).issubset(header):
+                        # 按文件自己的列顺序追加，额外的列留空
+                        row.reindex(columns=header or ALIAS_COLUMNS).fillna('').to_csv(
+                            self.alias_file, mode='a', index=False, header=header is None)
+                    else:
+                        # 文件缺少部分列（如手写的alias,ticker）：按完整的列重写一次，保留原有的其他列
+                        existing = pd.read_csv(self.alias_file, dtype=str, keep_default_na=False)
+                        columns = ALIAS_COLUMNS + [col for col in existing.columns if col not in ALIAS_COLUMNS]
+                        table = pd.concat([existing, row], ignore_index=True).reindex(columns=columns).fillna('')
+                        atomic_write(self.alias_file, lambda f: table.to_csv(f, index=False))
+                except Exception as e:
+                    logger.warning("写入别名表 %s 时出错: %s", self.alias_file, e)
+        logger.debug("新增别名: %s -> %s", alias, result['ticker'])
+        return True
+
+    @timed_stage('alias')
+    def search_aliases(self, company_name: str) -> List[Tuple[Dict, float]]:
+        """在别名表中搜索，使用与SEC名称相同的完全匹配快速路径和search_local逻辑（只计入alias阶段）"""
+        if not self.alias_data:
+            return []
+        exact_match = self.match_exact(company_name, index=self.alias_index)
+        return [exact_match] if exact_match else self.match_local(company_name, companies=self.alias_data, k=1)
+
+    def download_if_changed(self, url: str, path: str, validators: Dict, timeout: float = 30) -> bool:
+        """
+        条件GET下载文件：带上次的ETag/Last-Modified，304时不修改本地文件
+        下载成功时原子替换本地文件并更新validators，返回文件是否变化
+        """
+        headers = {'User-Agent': SEC_USER_AGENT, 'Accept-Encoding': 'gzip, deflate'}
+        if os.path.exists(path):
+            if validators.get('etag'):
+                headers['If-None-Match'] = validators['etag']
+            if validators.get('last_modified'):
+                headers['If-Modified-Since'] = validators['last_modified']
+
+        response = self.http_get(url, headers=headers, timeout=timeout)
+        if response.status_code == 304:
+            logger.info("  %s 未变化 (304)", path)
+            return False
+        response.raise_for_status()
+
+        # 先确认是合法JSON再替换本地文件
+        json.loads(response.content)
+        atomic_write(path, lambda f: f.write(response.content), binary=True)
+        validators.update({
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'fetched': time.strftime('%Y-%m-%dT%H:%M:%S')
+        })
+        logger.info("  %s 已更新 (%s 字节)", path, len(response.content))
+        return True
+
+    def refresh(self, base_url: Optional[str] = None, state_file: str = "sec_refresh_state.json",
+                timeout: float = 30) -> Dict:
+        """
+        刷新两个SEC文件（条件GET），有变化时增量更新公司表、完全匹配索引和受影响的缓存结果
+        base_url: 代替 https://www.sec.gov 的地址（如本地测试服务器），文件路径为 /files/<文件名>
+        返回变化摘要
+        """
+        try:
+            with open(state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            state = {}
+        except Exception as e:
+            logger.warning("读取刷新状态 %s 时出错: %s", state_file, e)
+            state = {}
+
+        def save_state():
+            atomic_write(state_file, lambda f: json.dump(state, f, ensure_ascii=False, indent=2))
+
+        # 上次刷新替换了文件但没有应用变化（如中途崩溃）：本进程加载的可能已是新文件，
+        # 无法再与旧数据比较，应用时使全部缓存结果失效
+        recovering = bool(state.get('pending'))
+
+        for path in (self.company_tickers_exchange_file, self.company_tickers_file):
+            file_name = Path(path).name
+            url = f"{base_url.rstrip('/')}/files/{file_name}" if base_url else SEC_FILE_URLS.get(
+                file_name, f"https://www.sec.gov/files/{file_name}")
+            if self.download_if_changed(url, path, state.setdefault(str(path), {}), timeout):
+                # 每个文件替换后立即保存其ETag，后一个文件下载失败时状态仍与磁盘上的文件一致；
+                # pending标记保证下次刷新时即使两个文件都返回304也会应用这次的变化
+                state['pending'] = True
+                save_state()
+
+        if not state.get('pending'):
+            return {'changed': False}
+        summary = self.update_companies(self.read_companies(self.company_tickers_exchange_file,
+                                                            self.company_tickers_file))
+        if recovering:
+            summary['invalidated'] += self.cache_invalidate(list(self.cache_snapshot()))
+            logger.info("上次刷新未完成，已使全部缓存结果失效 (共 %s 个)", summary['invalidated'])
+        state.pop('pending', None)
+        save_state()
+        summary['changed'] = True
+        return summary
+
+    def update_companies(self, companies: List[Dict], threshold: float = 0.75) -> Dict:
+        """
+        用新的公司列表替换当前公司表：未变化的公司沿用原有对象和标准化名称，只标准化新名称；
+        只使受影响的缓存结果失效——匹配到被删除/改名公司的本地结果，
+        以及与新增/改名后名称相似度达到threshold（search_local的阈值）的任何缓存结果
+        """
+        old_companies = self.companies_data
+        old_by_key = {}
+        norm_by_name = {}
+        for company in old_companies:
+            old_by_key.setdefault(company_record_key(company), company)
+            norm_by_name.setdefault(company['name'], company['norm'])
+
+        new_companies = []
+        for company in companies:
+            existing = old_by_key.get(company_record_key(company))
+            if existing is None:
+                norm = norm_by_name.get(company['name'])
+                if norm is None:
+                    norm = self.normalize_company_name(company['name']) if isinstance(company['name'], str) else ''
+                existing = dict(company, norm=norm)
+            new_companies.append(existing)
+
+        # 按(名称, 代码, CIK, 交易所)比较新旧数据，同一代码既有删除又有新增的视为改名（含换交易所）
+        old_keys = {company_record_key(company)[:4] for company in old_companies}
+        new_keys = {company_record_key(company)[:4] for company in new_companies}
+        added = [company for company in new_companies if company_record_key(company)[:4] not in old_keys]
+        removed = [company for company in old_companies if company_record_key(company)[:4] not in new_keys]
+        removed_by_ticker = {}
+        for company in removed:
+            removed_by_ticker.setdefault(company['ticker'], company)
+        renamed = [(removed_by_ticker.pop(company['ticker']), company) for company in added
+                   if company['ticker'] in removed_by_ticker]
+        renamed_ids = {id(company) for pair in renamed for company in pair}
+        added = [company for company in added if id(company) not in renamed_ids]
+        removed = [company for company in removed if id(company) not in renamed_ids]
+
+        # 发布新的公司表和索引（整体替换，读取方无需加锁）
+        self.companies_data = tuple(new_companies)
+        self.exact_index = self.index_by_norm(self.companies_data)
+        if self.ann_index is not None:
+            self.ann_index = MinHashLSH(self.companies_data, **self.ann_options)
+
+        gone_tickers = {company['ticker'] for company in removed} | {old['ticker'] for old, _ in renamed}
+        gone_names = {company['name'] for company in removed} | {old['name'] for old, _ in renamed}
+        new_norms = [company['norm'] for company in added if company['norm']]
+        new_norms += [new['norm'] for _, new in renamed if new['norm']]
+
+        stale = []
+        for key, result in self.cache_snapshot().items():
+            if (isinstance(result, dict) and result.get('source') == 'local'
+                    and (result.get('ticker') in gone_tickers or result.get('company_name') in gone_names)):
+                stale.append(key)
+            elif any(self.may_match(key, norm, threshold) for norm in new_norms):
+                stale.append(key)
+        invalidated = self.cache_invalidate(stale)
+
+        summary = {
+            'companies': len(self.companies_data),
+            'added': len(added),
+            'removed': len(removed),
+            'renamed': len(renamed),
+            'invalidated': invalidated
+        }
+        logger.info("公司数据已更新: 新增 %s, 删除 %s, 改名 %s, 失效缓存 %s (共 %s 家公司)",
+                    summary['added'], summary['removed'], summary['renamed'], invalidated,
+                    summary['companies'])
+        return summary
+
+    def may_match(self, key: str, norm: str, threshold: float = 0.75) -> bool:
+        """
+        缓存键（标准化名称）与公司的标准化名称相似度是否可能达到threshold
+        先用长度上界（SequenceMatcher.real_quick_ratio）快速排除，再计算实际相似度
+        """
+        if not isinstance(key, str) or not key:
+            return False
+        if 2 * min(len(key), len(norm)) / (len(key) + len(norm)) < threshold:
+            return False
+        return self.norm_similarity(key, norm) >= threshold
+
+    def enable_stats(self, reset: bool = False):
+        """开启（或重置）各阶段耗时统计"""
+        if self.stage_stats is None or reset:
+            self.stage_stats = StageStats()
+
+    def enable_metrics(self):
+        """开启Prometheus指标记录"""
+        if self.metrics is not None:
+            return
+        metrics = MetricsRegistry()
+        metrics.register('ticker_lookups_total', 'counter', 'Lookups resolved, by result source (not_found when unresolved)')
+        metrics.register('ticker_cache_requests_total', 'counter', 'Result cache requests, by result (hit/miss)')
+        metrics.register('ticker_stage_duration_seconds', 'histogram', 'Wall time per lookup stage or online source')
+        metrics.register('ticker_stage_errors_total', 'counter', 'Stage calls that raised an exception')
+        metrics.register('ticker_http_requests_total', 'counter', 'Online HTTP requests, by host and outcome (ok/error)')
+        metrics.register('ticker_http_request_duration_seconds', 'histogram', 'Online HTTP request latency, by host')
+        metrics.register('ticker_throttle_seconds_total', 'counter', 'Time spent in request pacing sleeps and rate-limiter waits')
+        metrics.register('ticker_companies_loaded', 'gauge', 'Companies in the loaded reference index')
+        metrics.register('ticker_cached_names', 'gauge', 'Names in the result cache')
+        self.metrics = metrics
+
+    def enable_profiling(self, directory, sample_rate: float = 0.0, threshold: Optional[float] = None,
+                         seed: Optional[int] = None) -> LookupProfiler:
+        """
+        开启find_ticker的剖析：抽样sample_rate比例的查找，或保存耗时超过threshold秒的查找，
+        cProfile与tracemalloc快照写入directory
+        """
+        self.profiler = LookupProfiler(directory, sample_rate=sample_rate, threshold=threshold, seed=seed)
+        return self.profiler
+
+    def record_stage(self, stage: str, elapsed: float, error: bool = False, empty: bool = False):
+        """将一次阶段耗时同时记入StageStats和Prometheus指标（已开启的部分）"""
+        if self.stage_stats is not None:
+            self.stage_stats.record(stage, elapsed, error=error, empty=empty)
+
+        metrics = self.metrics
+        if metrics is None:
+            return
+        if stage.startswith('http:'):
+            host = stage[len('http:'):]
+            metrics.inc('ticker_http_requests_total', host=host, outcome='error' if error else 'ok')
+            metrics.observe('ticker_http_request_duration_seconds', elapsed, host=host)
+        elif stage in ('sleep', 'rate_limit_wait'):
+            metrics.inc('ticker_throttle_seconds_total', elapsed, kind=stage)
+        else:
+            metrics.observe('ticker_stage_duration_seconds', elapsed, stage=stage)
+            if error:
+                metrics.inc('ticker_stage_errors_total', stage=stage)
+
+    def record_lookup(self, result: Optional[Dict]):
+        """记录一次完成的查找（按结果来源计数）"""
+        if self.metrics is not None:
+            self.metrics.inc('ticker_lookups_total', source=result['source'] if result else 'not_found')
+
+    def metrics_text(self) -> str:
+        """Prometheus文本格式的指标（未开启时为空）"""
+        if self.metrics is None:
+            return ''
+        self.metrics.set('ticker_companies_loaded', len(self.companies_data))
+        self.metrics.set('ticker_cached_names', len(self.resolved_names))
+        return self.metrics.render()
+
+    def write_metrics(self, metrics_file: str):
+        """原子地写出指标文件（可供node_exporter textfile collector采集）"""
+        text = self.metrics_text()
+        atomic_write(metrics_file, lambda f: f.write(text))
+
+    def stats(self) -> Dict:
+        """各阶段耗时、调用次数、缓存命中和失败次数的快照"""
+        if self.stage_stats is None:
+            return {'enabled': False, 'stages': {}, 'counters': {}}
+        snapshot = self.stage_stats.snapshot()
+        counters = snapshot['counters']
+        lookups = counters.get('cache_hits', 0) + counters.get('cache_misses', 0)
+        snapshot['cache_hit_ratio'] = round(counters.get('cache_hits', 0) / lookups, 4) if lookups else None
+        return snapshot
+
+    def pause(self, seconds: float):
+        """请求之间的限速等待（计入sleep阶段），查找被取消时立即结束并抛出LookupCancelled"""
+        if self.stage_stats is not None or self.metrics is not None:
+            self.record_stage('sleep', seconds)
+        stop = getattr(self.http_local, 'stop', None)
+        if stop is None:
+            time.sleep(seconds)
+            return
+        stop.wait(seconds)
+        self.check_cancelled()
+
+    def check_cancelled(self):
+        """当前线程的查找已被取消时抛出LookupCancelled（见run_cancellable）"""
+        stop = getattr(self.http_local, 'stop', None)
+        if stop is not None and stop.is_set():
+            raise LookupCancelled()
+
+    def run_cancellable(self, stop: threading.Event, func, *args):
+        """
+        在工作线程中执行func；stop被设置后，本线程的下一次HTTP请求或限速等待抛出LookupCancelled，
+        已发出的请求最多再持续一个请求超时
+        """
+        self.http_local.stop = stop
+        try:
+            return func(*args)
+        finally:
+            self.http_local.stop = None
+
+    async def pause_async(self, seconds: float):
+        """pause的异步版本"""
+        if self.stage_stats is not None or self.metrics is not None:
+            self.record_stage('sleep', seconds)
+        await asyncio.sleep(seconds)
+
+    def cache_get(self, key: str):
+        """读取结果缓存，未命中时返回CACHE_MISS"""
+        result = self.resolved_names.get(key, CACHE_MISS)
+        if self.stage_stats is not None:
+            self.stage_stats.count('cache_misses' if result is CACHE_MISS else 'cache_hits')
+        if self.metrics is not None:
+            self.metrics.inc('ticker_cache_requests_total', result='miss' if result is CACHE_MISS else 'hit')
+        return result
+
+    def cache_put(self, key: str, result: Optional[Dict]):
+        """写入结果缓存"""
+        with self.cache_lock:
+            self.resolved_names[key] = result
+
+    def cache_update(self, entries: Dict, overwrite: bool = True) -> int:
+        """批量写入结果缓存，返回新写入的条目数"""
+        added = 0
+        with self.cache_lock:
+            for key, result in entries.items():
+                if overwrite or key not in self.resolved_names:
+                    added += key not in self.resolved_names
+                    self.resolved_names[key] = result
+        return added
+
+    def cache_invalidate(self, keys: Iterable[str]) -> int:
+        """从结果缓存中删除指定的键，返回删除的条目数"""
+        removed = 0
+        with self.cache_lock:
+            for key in keys:
+                if self.resolved_names.pop(key, CACHE_MISS) is not CACHE_MISS:
+                    removed += 1
+        return removed
+
+    def cache_snapshot(self) -> Dict:
+        """获取结果缓存的一致性副本（用于序列化）"""
+        with self.cache_lock:
+            return dict(self.resolved_names)
+
+    def http_get(self, url: str, **kwargs) -> requests.Response:
+        """使用当前线程的Session发送GET请求"""
+        self.check_cancelled()
+        session = getattr(self.http_local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            self.http_local.session = session
+        if self.stage_stats is None and self.metrics is None:
+            return session.get(url, **kwargs)
+
+        stage = f'http:{urllib.parse.urlsplit(url).netloc}'
+        started = time.perf_counter()
+        try:
+            response = session.get(url, **kwargs)
+        except Exception:
+            self.record_stage(stage, time.perf_counter() - started, error=True)
+            raise
+        self.record_stage(stage, time.perf_counter() - started, error=not response.ok)
+        return response
 
     def extract_core_keywords(self, company_name: str) -> List[str]:
         """提取公司名称中的核心关键词（简化版，用于在线搜索）"""
@@ -103,9 +1578,10 @@ class EnhancedTest3TickerConverter:
 
     def calculate_company_similarity(self, name1: str, name2: str) -> float:
         """计算公司名称的相似度（采用test3.py的逻辑）"""
-        norm1 = self.normalize_company_name(name1)
-        norm2 = self.normalize_company_name(name2)
+        return self.norm_similarity(self.normalize_company_name(name1), self.normalize_company_name(name2))
 
+    def norm_similarity(self, norm1: str, norm2: str) -> float:
+        """计算两个已标准化名称的相似度（calculate_company_similarity去掉标准化的部分）"""
         # 完全匹配
         if norm1 == norm2:
             return 1.0
@@ -137,32 +1613,108 @@ class EnhancedTest3TickerConverter:
 
     def normalize_company_name(self, name: str) -> str:
         """标准化公司名称（采用test3.py的逻辑）"""
-        name = name.upper().strip()
-        name = re.sub(r'[.,&\-/]', ' ', name)
-        name = re.sub(r'\s+', ' ', name)
+        return normalize_name(name, self.company_suffixes)
 
-        words = name.split()
-        filtered_words = []
-        for word in words:
-            if word not in self.company_suffixes:
-                filtered_words.append(word)
+    def normalize_series(self, names: pd.Series) -> pd.Series:
+        """
+        批量标准化公司名称（向量化字符串操作）
+        对字符串元素的结果与normalize_company_name逐字节一致，非字符串元素返回NaN
+        """
+        # 统一转为object类型，保证使用Python的正则和大小写语义
+        values = names.astype(object)
+        values = values.where(values.map(lambda value: isinstance(value, str)))
+        if not values.notna().any():
+            return values
+
+        suffix_pattern = '(?<= )(?:' + '|'.join(re.escape(suffix) for suffix in self.company_suffixes) + ')(?= )'
+
+        normalized = values.str.upper().str.strip()
+        normalized = normalized.str.replace(r'[.,&\-/]', ' ', regex=True)
+        normalized = normalized.str.replace(r'\s+', ' ', regex=True)
+        # 前后补空格，使每个单词两侧都是空格，再整体去除后缀单词
+        normalized = (' ' + normalized + ' ').str.replace(suffix_pattern, '', regex=True)
+        return normalized.str.replace(r'\s+', ' ', regex=True).str.strip()
+
+    @timed_stage('exact')
+    def search_exact(self, company_name: str, exchanges: Optional[Iterable[str]] = None,
+                     index: Optional[Dict] = None) -> Optional[Tuple[Dict, float]]:
+        """
+        完全匹配快速路径：标准化名称完全相同时，结果与search_local的最佳匹配一致
+        关键词无重叠、或索引中的公司不在exchanges内的情况交给search_local处理
+        index: 使用的完全匹配索引，默认SEC公司表的exact_index
+        """
+        return self.match_exact(company_name, exchanges, index)
+
+    def match_exact(self, company_name: str, exchanges: Optional[Iterable[str]] = None,
+                    index: Optional[Dict] = None) -> Optional[Tuple[Dict, float]]:
+        """search_exact的实现（不计入exact阶段，供别名表搜索等其他阶段复用）"""
+        index = self.exact_index if index is None else index
+        company = index.get(self.normalize_company_name(company_name))
+        if company is None or (exchanges is not None and company.get('exchange') not in exchanges):
+            return None
+
+        user_keywords = set(self.extract_core_keywords(company_name))
+        match_keywords = set(self.extract_core_keywords(company['name']))
+        if not user_keywords.intersection(match_keywords):
+            return None
 
-        return ' '.join(filtered_words).strip()
+        return company, 1.0
 
-    def search_local(self, company_name: str, threshold: float = 0.75) -> List[Tuple[Dict, float]]:
+    def scored_matches(self, company_name: str, companies: Iterable[Dict],
+                       threshold: float = 0.75) -> Iterator[Tuple[Dict, float]]:
         """
-        在本地数据中搜索 - 完全使用test3.py的逻辑
+        对公司表做一遍打分，产出相似度达到threshold的 (公司, 相似度)
+        与calculate_company_similarity结果相同，但公司名称使用记录中预先标准化的'norm'
         """
-        results = []
-
-        for company in self.companies_data:
-            similarity = self.calculate_company_similarity(company_name, company['name'])
+        norm = self.normalize_company_name(company_name)
+        norm_similarity = self.norm_similarity
+        for company in companies:
+            similarity = norm_similarity(norm, company['norm'])
             if similarity >= threshold:
-                results.append((company, similarity))
-
-        results.sort(key=lambda x: x[1], reverse=True)
+                yield company, similarity
 
-        # test3.py的额外验证：检查最佳匹配是否真的合理
+    def rank_matches(self, matches: Iterable[Tuple[Dict, float]], k: Optional[int] = None
+                     ) -> List[Tuple[Dict, float]]:
+        """
+        按相似度从高到低、相同时按listing_rank（普通股优先，其次交易所优先级）排列候选，再相同时保持数据顺序
+        k: 只保留前k个，用大小为k的堆选出，k=1时不排序；None表示全部排序
+        """
+        def rank(match):
+            return -match[1], listing_rank(match[0])
+
+        if k is None:
+            return sorted(matches, key=rank)
+        return heapq.nsmallest(k, matches, key=rank)
+
+    @timed_stage('search_local')
+    def search_local(self, company_name: str, threshold: float = 0.75,
+                     exchanges: Optional[Iterable[str]] = None,
+                     companies: Optional[Iterable[Dict]] = None,
+                     k: Optional[int] = None) -> List[Tuple[Dict, float]]:
+        """
+        在本地数据中搜索 - 完全使用test3.py的逻辑
+        相似度相同的候选按listing_rank排序；exchanges: 只在这些交易所的公司中搜索（如['NYSE', 'Nasdaq']）
+        companies: 搜索的公司表，默认SEC公司表
+        k: 只返回前k个候选（只需最佳匹配时用k=1），None表示返回全部
+        """
+        return self.match_local(company_name, threshold, exchanges, companies, k)
+
+    def match_local(self, company_name: str, threshold: float = 0.75,
+                    exchanges: Optional[Iterable[str]] = None,
+                    companies: Optional[Iterable[Dict]] = None,
+                    k: Optional[int] = None) -> List[Tuple[Dict, float]]:
+        """search_local的实现（不计入search_local阶段，供别名表搜索等其他阶段复用）"""
+        companies = self.companies_data if companies is None else companies
+        if exchanges is not None:
+            exchanges = set(exchanges)
+            companies = (company for company in companies if company.get('exchange') in exchanges)
+
+        results = self.rank_matches(self.scored_matches(company_name, companies, threshold), k)
+        return self.verify_best_match(company_name, results)
+
+    def verify_best_match(self, company_name: str, results: List[Tuple[Dict, float]]) -> List[Tuple[Dict, float]]:
+        """test3.py的额外验证：排好序的候选中最佳匹配可疑或相似度过低时返回[]，否则原样返回"""
+        # 检查最佳匹配是否真的合理
         if results:
             best_match = results[0]
             best_similarity = best_match[1]
@@ -177,10 +1729,10 @@ class EnhancedTest3TickerConverter:
 
             # 如果没有任何关键词重叠，但相似度很高，这可能是错误匹配
             if len(intersection) == 0 and best_similarity > 0.8:
-                print(f"警告：高相似度但无关键词重叠，可能是错误匹配")
-                print(f"用户关键词: {user_keywords}")
-                print(f"匹配关键词: {match_keywords}")
-                print(f"跳过可疑匹配: {best_company['name']} (相似度: {best_similarity:.2f})")
+                logger.debug("警告：高相似度但无关键词重叠，可能是错误匹配")
+                logger.debug("用户关键词: %s", user_keywords)
+                logger.debug("匹配关键词: %s", match_keywords)
+                logger.debug("跳过可疑匹配: %s (相似度: %.2f)", best_company['name'], best_similarity)
                 return []
 
             # 如果只有一个字符的重叠，也要谨慎
@@ -196,20 +1748,22 @@ class EnhancedTest3TickerConverter:
 
                 # 如果长度差异太大，也认为是可疑匹配
                 if len_similarity < 0.5 and best_similarity > 0.7:
-                    print(f"警告：长度差异过大的可疑匹配")
-                    print(f"'{norm1}' vs '{norm2}'")
-                    print(f"长度相似度: {len_similarity:.2f}, 总相似度: {best_similarity:.2f}")
+                    logger.debug("警告：长度差异过大的可疑匹配")
+                    logger.debug("'%s' vs '%s'", norm1, norm2)
+                    logger.debug("长度相似度: %.2f, 总相似度: %.2f", len_similarity, best_similarity)
                     return []
 
         # 额外检查：如果最佳匹配的相似度不够高，可能是错误匹配
         if results and results[0][1] < 0.85:
-            print(f"警告：最佳本地匹配相似度较低 ({results[0][1]:.2f})，可能不准确")
+            logger.debug("警告：最佳本地匹配相似度较低 (%.2f)，可能不准确", results[0][1])
             if results[0][1] < 0.80:
-                print("相似度过低，跳过本地匹配，直接进行在线搜索")
+                logger.debug("相似度过低，跳过本地匹配，直接进行在线搜索")
                 return []
 
         return results
 
+    @coalesce(verification_key)
+    @timed_stage('verification')
     def validate_ticker_with_company_verification(self, ticker: str, company_name: str) -> bool:
         """通过在线验证股票代码与公司的匹配性 - 加强版"""
         try:
@@ -220,7 +1774,7 @@ class EnhancedTest3TickerConverter:
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
             }
 
-            response = requests.get(yahoo_url, headers=headers, timeout=10)
+            response = self.http_get(yahoo_url, headers=headers, timeout=10)
             if response.status_code == 200:
                 data = response.json()
                 if 'chart' in data and data['chart']['result']:
@@ -230,32 +1784,33 @@ class EnhancedTest3TickerConverter:
 
                     if symbol_name:
                         similarity = self.calculate_company_similarity(company_name, symbol_name)
-                        print(f"Yahoo验证: {ticker} -> {symbol_name} (相似度: {similarity:.2f})")
+                        logger.debug("Yahoo验证: %s -> %s (相似度: %.2f)", ticker, symbol_name, similarity)
 
                         # 大幅提高验证阈值，避免错误匹配
                         if similarity > 0.75:  # 从0.6提高到0.75
                             return True
                         else:
-                            print(f"相似度过低({similarity:.2f})，Yahoo验证失败")
+                            logger.debug("相似度过低(%.2f)，Yahoo验证失败", similarity)
                             return False
 
                         # 对于退市股票，Yahoo可能返回不完整信息，进行额外检查
                         if not symbol_name or len(symbol_name) < 5:
-                            print(f"Yahoo返回信息不完整，尝试其他验证方法")
+                            logger.debug("Yahoo返回信息不完整，尝试其他验证方法")
                             return self.strict_fallback_verification(ticker, company_name)
                     else:
                         # 没有公司名称信息，可能是退市股票
-                        print(f"Yahoo无公司名称信息，可能是退市股票: {ticker}")
+                        logger.debug("Yahoo无公司名称信息，可能是退市股票: %s", ticker)
                         return self.strict_fallback_verification(ticker, company_name)
 
             # Yahoo验证失败，尝试备用验证
             return self.strict_fallback_verification(ticker, company_name)
 
         except Exception as e:
-            print(f"股票代码验证错误: {e}")
+            logger.warning("股票代码验证错误: %s", e)
             # 验证失败时，如果ticker格式正确且在合理上下文中，也可能是有效的
             return self.strict_fallback_verification(ticker, company_name)
 
+    @timed_stage('fallback_verification')
     def strict_fallback_verification(self, ticker: str, company_name: str) -> bool:
         """严格的备用验证方法"""
         try:
@@ -269,7 +1824,7 @@ class EnhancedTest3TickerConverter:
                     'NYSE', 'NASDAQ', 'NASDA', 'NASD', 'MKT', 'COM', 'ORG', 'NET'
                 }
                 if ticker in common_false_positives:
-                    print(f"ticker在错误列表中，备用验证失败: {ticker}")
+                    logger.debug("ticker在错误列表中，备用验证失败: %s", ticker)
                     return False
 
                 # 进行基本的字符匹配检查
@@ -279,20 +1834,21 @@ class EnhancedTest3TickerConverter:
                 # 检查ticker的字符是否大部分都能在公司名称中找到
                 matching_chars = ticker_chars.intersection(company_chars)
                 if len(matching_chars) >= len(ticker_chars) * 0.6:  # 至少60%的字符匹配
-                    print(f"字符匹配验证通过: {ticker} (匹配字符: {matching_chars})")
+                    logger.debug("字符匹配验证通过: %s (匹配字符: %s)", ticker, matching_chars)
                     return True
                 else:
-                    print(f"字符匹配验证失败: {ticker} (匹配字符: {matching_chars}, 需要: {ticker_chars})")
+                    logger.debug("字符匹配验证失败: %s (匹配字符: %s, 需要: %s)", ticker, matching_chars, ticker_chars)
                     return False
 
             # 方法2: 尝试Alpha Vantage验证（如果可用）
-            time.sleep(1)
+            self.pause(1)
             return self.verify_with_alpha_vantage(ticker, company_name)
 
         except Exception as e:
-            print(f"严格备用验证错误: {e}")
+            logger.warning("严格备用验证错误: %s", e)
             return False
 
+    @timed_stage('alpha_vantage')
     def verify_with_alpha_vantage(self, ticker: str, company_name: str) -> bool:
         """使用Alpha Vantage验证"""
         try:
@@ -304,23 +1860,23 @@ class EnhancedTest3TickerConverter:
                 'apikey': 'demo'
             }
 
-            response = requests.get(search_url, params=params, timeout=10)
+            response = self.http_get(search_url, params=params, timeout=10)
             if response.status_code == 200:
                 data = response.json()
                 if 'bestMatches' in data and data['bestMatches']:
                     for match in data['bestMatches']:
                         symbol = match.get('1. symbol', '')
                         if symbol.upper() == ticker.upper():
-                            print(f"Alpha Vantage验证成功: {ticker}")
+                            logger.debug("Alpha Vantage验证成功: %s", ticker)
                             return True
-        except:
+        except Exception:
             pass
 
         # 最后的宽松判断 - 但要更加谨慎
         if len(ticker) >= 2 and len(ticker) <= 5 and ticker.isalpha():
             # 额外检查：确保ticker不是明显的HTML/网页内容
             if not self.is_obviously_web_content(ticker):
-                print(f"基于格式的谨慎验证: {ticker}")
+                logger.debug("基于格式的谨慎验证: %s", ticker)
                 return True
 
         return False
@@ -342,7 +1898,7 @@ class EnhancedTest3TickerConverter:
 
     def search_delisted_stocks_online(self, company_name: str) -> Optional[Dict]:
         """专门搜索退市股票信息"""
-        print(f"正在网络搜索退市股票: {company_name}")
+        logger.debug("正在网络搜索退市股票: %s", company_name)
 
         try:
             # 方法1: 使用Yahoo Finance历史搜索
@@ -366,10 +1922,11 @@ class EnhancedTest3TickerConverter:
                 return result
 
         except Exception as e:
-            print(f"退市股票搜索错误: {e}")
+            logger.warning("退市股票搜索错误: %s", e)
 
         return None
 
+    @timed_stage('yahoo')
     def search_yahoo_historical(self, company_name: str) -> Optional[Dict]:
         """通过Yahoo Finance搜索历史股票"""
         try:
@@ -387,7 +1944,7 @@ class EnhancedTest3TickerConverter:
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
             }
 
-            response = requests.get(search_url, params=params, headers=headers, timeout=10)
+            response = self.http_get(search_url, params=params, headers=headers, timeout=10)
 
             if response.status_code == 200:
                 data = response.json()
@@ -400,7 +1957,7 @@ class EnhancedTest3TickerConverter:
                             # 验证相似度
                             similarity = self.calculate_company_similarity(company_name, quote_name)
                             if similarity > 0.75:  # 提高阈值
-                                print(f"Yahoo Finance历史搜索找到: {symbol} (相似度: {similarity:.2f})")
+                                logger.debug("Yahoo Finance历史搜索找到: %s (相似度: %.2f)", symbol, similarity)
                                 return {
                                     'ticker': symbol,
                                     'company_name': company_name,
@@ -410,13 +1967,14 @@ class EnhancedTest3TickerConverter:
                                     'similarity': similarity
                                 }
         except Exception as e:
-            print(f"Yahoo历史搜索错误: {e}")
+            logger.warning("Yahoo历史搜索错误: %s", e)
         return None
 
+    @timed_stage('sec_edgar')
     def search_sec_edgar_enhanced(self, company_name: str) -> Optional[Dict]:
         """增强的SEC EDGAR搜索"""
         try:
-            print(f"搜索SEC EDGAR: {company_name}")
+            logger.debug("搜索SEC EDGAR: %s", company_name)
 
             # SEC提供公司搜索API
             search_url = "https://www.sec.gov/cgi-bin/browse-edgar"
@@ -431,7 +1989,7 @@ class EnhancedTest3TickerConverter:
                 'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8'
             }
 
-            response = requests.get(search_url, params=params, headers=headers, timeout=15)
+            response = self.http_get(search_url, params=params, headers=headers, timeout=15)
 
             if response.status_code == 200:
                 content = response.text
@@ -446,7 +2004,7 @@ class EnhancedTest3TickerConverter:
                     ticker = match.group(1)
                     # 验证上下文
                     if self.validate_ticker_context(ticker, company_name, content):
-                        print(f"SEC EDGAR找到验证的股票代码: {ticker}")
+                        logger.debug("SEC EDGAR找到验证的股票代码: %s", ticker)
                         return {
                             'ticker': ticker,
                             'company_name': company_name,
@@ -480,7 +2038,7 @@ class EnhancedTest3TickerConverter:
                 # 验证候选股票代码
                 for candidate in candidates:
                     if self.validate_ticker_with_company_verification(candidate, company_name):
-                        print(f"SEC EDGAR验证成功: {candidate}")
+                        logger.debug("SEC EDGAR验证成功: %s", candidate)
                         return {
                             'ticker': candidate,
                             'company_name': company_name,
@@ -488,9 +2046,10 @@ class EnhancedTest3TickerConverter:
                         }
 
         except Exception as e:
-            print(f"SEC EDGAR搜索错误: {e}")
+            logger.warning("SEC EDGAR搜索错误: %s", e)
         return None
 
+    @timed_stage('marketwatch')
     def search_investment_sites(self, company_name: str) -> Optional[Dict]:
         """搜索投资网站"""
         sites = [
@@ -508,8 +2067,8 @@ class EnhancedTest3TickerConverter:
                     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
                 }
 
-                response = requests.get(site['url'], params=site['params'],
-                                        headers=headers, timeout=10)
+                response = self.http_get(site['url'], params=site['params'],
+                                         headers=headers, timeout=10)
 
                 if response.status_code == 200:
                     content = response.text
@@ -519,21 +2078,22 @@ class EnhancedTest3TickerConverter:
                         if len(match) <= 5:
                             # 验证股票代码
                             if self.validate_ticker_with_company_verification(match, company_name):
-                                print(f"{site['name']}找到验证的股票代码: {match}")
+                                logger.debug("%s找到验证的股票代码: %s", site['name'], match)
                                 return {
                                     'ticker': match,
                                     'company_name': company_name,
                                     'source': site['name'].lower()
                                 }
 
-                time.sleep(1)  # 避免请求过快
+                self.pause(1)  # 避免请求过快
 
             except Exception as e:
-                print(f"{site['name']}搜索错误: {e}")
+                logger.warning("%s搜索错误: %s", site['name'], e)
                 continue
 
         return None
 
+    @timed_stage('duckduckgo')
     def search_web_general_enhanced(self, company_name: str) -> Optional[Dict]:
         """增强的通用网络搜索"""
         try:
@@ -547,7 +2107,7 @@ class EnhancedTest3TickerConverter:
             ]
 
             for query in search_queries:
-                print(f"网络搜索: {query}")
+                logger.debug("网络搜索: %s", query)
 
                 # 使用DuckDuckGo搜索
                 search_url = "https://html.duckduckgo.com/html/"
@@ -558,7 +2118,7 @@ class EnhancedTest3TickerConverter:
                 }
 
                 try:
-                    response = requests.get(search_url, params=params, headers=headers, timeout=15)
+                    response = self.http_get(search_url, params=params, headers=headers, timeout=15)
                     if response.status_code == 200:
                         content = response.text
 
@@ -567,7 +2127,7 @@ class EnhancedTest3TickerConverter:
 
                         # 验证每个候选 - 使用更严格的验证
                         for candidate in candidates:
-                            print(f"正在验证候选股票代码: {candidate}")
+                            logger.debug("正在验证候选股票代码: %s", candidate)
 
                             # 首先进行基本有效性检查
                             if not self.is_valid_ticker(candidate):
@@ -575,13 +2135,13 @@ class EnhancedTest3TickerConverter:
 
                             # 进行上下文验证
                             if self.validate_ticker_context(candidate, company_name, content):
-                                print(f"上下文验证通过: {candidate}")
+                                logger.debug("上下文验证通过: %s", candidate)
 
                                 # 尝试在线验证，要求更严格
                                 verification_result = self.validate_ticker_with_company_verification(candidate,
                                                                                                      company_name)
                                 if verification_result:
-                                    print(f"在线验证通过: {candidate}")
+                                    logger.debug("在线验证通过: %s", candidate)
                                     return {
                                         'ticker': candidate,
                                         'company_name': company_name,
@@ -590,17 +2150,17 @@ class EnhancedTest3TickerConverter:
                                         'verification': 'full'
                                     }
                                 else:
-                                    print(f"在线验证失败: {candidate}")
+                                    logger.debug("在线验证失败: %s", candidate)
                                     # 不再接受仅通过上下文验证的结果
 
-                    time.sleep(2)  # 避免被封IP
+                    self.pause(2)  # 避免被封IP
 
                 except Exception as e:
-                    print(f"搜索查询错误: {e}")
+                    logger.warning("搜索查询错误: %s", e)
                     continue
 
         except Exception as e:
-            print(f"增强网络搜索错误: {e}")
+            logger.warning("增强网络搜索错误: %s", e)
 
         return None
 
@@ -626,9 +2186,9 @@ class EnhancedTest3TickerConverter:
                 for match in matches:
                     if self.is_valid_ticker_strict(match, company_name, content):
                         candidates.add(match.upper())
-                        print(f"精确匹配找到: {match}")
+                        logger.debug("精确匹配找到: %s", match)
             except Exception as e:
-                print(f"精确模式匹配错误: {e}")
+                logger.warning("精确模式匹配错误: %s", e)
                 continue
 
         # 如果精确匹配没找到，尝试上下文匹配
@@ -647,7 +2207,7 @@ class EnhancedTest3TickerConverter:
         sorted_candidates = sorted(filtered_candidates,
                                    key=lambda x: self.get_candidate_priority(x, company_name))
 
-        print(f"过滤后的候选股票代码: {sorted_candidates}")
+        logger.debug("过滤后的候选股票代码: %s", sorted_candidates)
         return sorted_candidates
 
     def extract_contextual_candidates(self, content: str, company_name: str) -> set:
@@ -678,7 +2238,7 @@ class EnhancedTest3TickerConverter:
                     for match in matches:
                         if self.is_valid_ticker_strict(match, company_name, context):
                             candidates.add(match.upper())
-                            print(f"上下文匹配找到: {match}")
+                            logger.debug("上下文匹配找到: %s", match)
 
         return candidates
 
@@ -832,7 +2392,7 @@ class EnhancedTest3TickerConverter:
         else:
             required_matches = max(1, len(company_keywords) // 2)  # 至少1/2的关键词匹配
 
-        print(f"关键词匹配情况: {keyword_matches}/{len(company_keywords)} (需要: {required_matches})")
+        logger.debug("关键词匹配情况: %s/%s (需要: %s)", keyword_matches, len(company_keywords), required_matches)
 
         if keyword_matches >= required_matches:
             # 额外验证：确保不是巧合匹配
@@ -846,7 +2406,7 @@ class EnhancedTest3TickerConverter:
                 paragraph_matches = sum(1 for keyword in company_keywords
                                         if keyword.lower() in paragraph.lower())
                 if paragraph_matches > 0:
-                    print(f"段落级匹配成功: {paragraph_matches} 个关键词")
+                    logger.debug("段落级匹配成功: %s 个关键词", paragraph_matches)
                     return self.validate_contextual_relationship(ticker, company_name, paragraph)
 
         return False
@@ -863,7 +2423,7 @@ class EnhancedTest3TickerConverter:
         content_lower = content.lower()
         for pattern in misleading_patterns:
             if re.search(pattern, content_lower):
-                print(f"发现误导性模式，上下文验证失败: {pattern}")
+                logger.debug("发现误导性模式，上下文验证失败: %s", pattern)
                 return False
 
         # 如果没有发现问题，则通过验证
@@ -932,172 +2492,1402 @@ class EnhancedTest3TickerConverter:
 
         return False
 
-    def find_ticker(self, company_name: str, use_online: bool = True) -> Optional[Dict]:
+    @timed_stage('candidates')
+    def candidates(self, company_name: str, k: int = 5, threshold: float = 0.5,
+                   exchanges: Optional[Iterable[str]] = None) -> List[Dict]:
+        """
+        供人工复核的候选列表：对SEC公司表和别名表做一遍打分，返回相似度最高的k个候选
+        不做search_local对最佳匹配的额外验证；selected标记find_ticker_local会选择的候选，
+        由同一遍打分的结果按find_ticker_local的顺序（完全匹配、SEC公司表、别名表）得出
+        """
+        if is_missing(company_name) or not str(company_name).strip():
+            return []
+        company_name = str(company_name)
+        companies = self.ann_candidates(company_name)
+        if companies is None:
+            companies = self.companies_data
+        if exchanges is not None:
+            exchanges = set(exchanges)
+            companies = (company for company in companies if company.get('exchange') in exchanges)
+        else:
+            companies = itertools.chain(companies, self.alias_data)
+
+        # 阈值取候选阈值和search_local阈值（0.75）中较低的，一遍打分同时满足两者
+        local_threshold = 0.75
+        matches = list(self.scored_matches(company_name, companies, min(threshold, local_threshold)))
+
+        chosen = self.search_exact(company_name, exchanges=exchanges)
+        if chosen is None:
+            local = [match for match in matches if match[0]['source'] != 'alias' and match[1] >= local_threshold]
+            chosen = next(iter(self.verify_best_match(company_name, self.rank_matches(local, 1))), None)
+        if chosen is None and exchanges is None:
+            aliases = [match for match in matches if match[0]['source'] == 'alias' and match[1] >= local_threshold]
+            chosen = self.match_exact(company_name, index=self.alias_index) or next(
+                iter(self.verify_best_match(company_name, self.rank_matches(aliases, 1))), None)
+        chosen_company = chosen[0] if chosen else None
+
+        ranked = []
+        for company, similarity in self.rank_matches((match for match in matches if match[1] >= threshold), k):
+            ranked.append({
+                'ticker': company['ticker'],
+                'name': company['name'],
+                'similarity': round(similarity, 4),
+                'source': 'alias' if company['source'] == 'alias' else 'local',
+                'cik': company.get('cik'),
+                'exchange': company.get('exchange'),
+                'selected': company is chosen_company
+            })
+        return ranked
+
+    @coalesce(company_key)
+    @timed_stage('local')
+    def find_ticker_local(self, company_name: str, exchanges: Optional[Iterable[str]] = None,
+                          skip_exact: bool = False) -> Optional[Dict]:
+        """
+        只在本地数据中查找（完全匹配快速路径 + search_local，未找到时再查别名表）
+        exchanges限定交易所，此时不查别名表（别名没有交易所信息）
+        skip_exact: 调用方已经查过完全匹配索引且未命中
+        """
+        exact_match = None if skip_exact else self.search_exact(company_name, exchanges=exchanges)
+        local_results = [exact_match] if exact_match else self.search_local(
+            company_name, exchanges=exchanges, companies=self.ann_candidates(company_name), k=1)
+        if not local_results and exchanges is None:
+            alias_results = self.search_aliases(company_name)
+            if alias_results:
+                alias, similarity = alias_results[0]
+                logger.debug("别名匹配找到: %s -> %s", alias['name'], alias['ticker'])
+                return {
+                    'ticker': alias['ticker'],
+                    'company_name': alias['name'],
+                    'matched_name': alias['name'],
+                    'similarity': similarity,
+                    'source': 'alias',
+                    'status': alias['status'],
+                    'cik': alias['cik'],
+                    'alias_kind': alias['kind']
+                }
+        if local_results:
+            return self.local_result(*local_results[0])
+        return None
+
+    def local_result(self, company_info: Dict, similarity: float) -> Dict:
+        """SEC公司表中匹配到的公司整理为查找结果"""
+        logger.debug("本地匹配找到: %s -> %s", company_info['name'], company_info['ticker'])
+        return {
+            'ticker': company_info['ticker'],
+            'company_name': company_info['name'],
+            'similarity': similarity,
+            'source': 'local',
+            'status': 'active',
+            'cik': company_info.get('cik'),
+            'exchange': company_info.get('exchange')
+        }
+
+    @coalesce(company_key)
+    @timed_stage('online')
+    def find_ticker_online(self, company_name: str) -> Optional[Dict]:
+        """只进行在线搜索（退市/历史股票）"""
+        logger.debug("开始在线搜索...")
+        delisted_result = self.search_delisted_stocks_online(company_name)
+        if delisted_result:
+            ticker = delisted_result['ticker']
+            logger.debug("在线搜索找到: %s -> %s", company_name, ticker)
+
+            result = {
+                'ticker': ticker,
+                'company_name': company_name,
+                'source': delisted_result['source'],
+                'status': delisted_result.get('status', 'unknown'),
+                'search_method': delisted_result.get('query', 'multiple_methods'),
+                'similarity': delisted_result.get('similarity'),
+                'matched_name': delisted_result.get('matched_name')
+            }
+            # 记为别名，同一历史名称只在线搜索一次
+            self.add_alias(company_name, result)
+            return result
+
+        logger.debug("标准在线搜索未找到结果")
+        return None
+
+    @profiled
+    @timed_stage('find_ticker')
+    def find_ticker(self, company_name: str, use_online: bool = True,
+                    exchanges: Optional[Iterable[str]] = None) -> Optional[Dict]:
         """
         查找公司的股票代码 - 完全使用test3.py的逻辑
+        exchanges: 本地匹配只考虑这些交易所的公司（如['NYSE', 'Nasdaq']）
         """
-        if not company_name or pd.isna(company_name):
+        if is_missing(company_name) or not company_name:
             return None
+        if not isinstance(company_name, str):
+            company_name = str(company_name)
 
-        print(f"\n正在搜索: {company_name}")
+        logger.debug("正在搜索: %s", company_name)
 
         # 1. 首先在本地数据中搜索 - 完全使用test3.py的逻辑
-        local_results = self.search_local(company_name)
-        if local_results:
-            best_match = local_results[0]
-            company_info = best_match[0]
-            similarity = best_match[1]
+        result = self.find_ticker_local(company_name, exchanges=exchanges)
 
-            print(f"本地匹配找到: {company_info['name']} -> {company_info['ticker']}")
-            return {
-                'ticker': company_info['ticker'],
-                'company_name': company_info['name'],
-                'similarity': similarity,
-                'source': 'local',
-                'status': 'active'
+        # 2. 在线搜索
+        if result is None and use_online:
+            result = self.find_ticker_online(company_name)
+
+        if result is None:
+            logger.debug("未找到匹配的股票代码")
+        self.record_lookup(result)
+        return result
+
+    def find_tickers(self, names, use_online: bool = True, workers: int = 4,
+                     deadline: Optional[float] = None,
+                     exchanges: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """
+        批量查找股票代码，返回与输入逐行对齐的DataFrame
+
+        names: 公司名称序列（list、pd.Series等）
+        use_online: 本地未找到时是否在线搜索
+        workers: 在线搜索的并发线程数
+        deadline: 整批查找的时间预算（秒），超时未完成的名称状态为timeout
+        exchanges: 本地匹配只考虑这些交易所的公司；指定时不读写全局缓存
+
+        输出列: name, ticker, matched_name, similarity, source, status, cik
+        """
+        started = time.monotonic()
+
+        def time_left() -> Optional[float]:
+            if deadline is None:
+                return None
+            return max(0.0, deadline - (time.monotonic() - started))
+
+        names = pd.Series(list(names), dtype=object)
+        norms = self.normalize_series(names)
+
+        # 去重：标准化名称为空的行以去空格后的原名为键，且不进入全局缓存
+        row_keys = []
+        pending = {}
+        resolved = {}
+        cacheable = set()
+        for name, norm in zip(names, norms):
+            if not isinstance(name, str) or not name.strip():
+                row_keys.append(None)
+                continue
+            key = norm if norm else name.strip()
+            row_keys.append(key)
+            if key in resolved or key in pending:
+                continue
+            if norm and exchanges is None:
+                cacheable.add(key)
+            cached = self.cache_get(norm) if key in cacheable else CACHE_MISS
+            if cached is not CACHE_MISS:
+                resolved[key] = cached
+            else:
+                pending[key] = name
+
+        def store(key, result):
+            resolved[key] = result
+            self.record_lookup(result)
+            if key in cacheable:
+                self.cache_put(key, result)
+
+        # 1. 本地匹配（CPU密集，串行执行）
+        online_todo = []
+        for key, name in pending.items():
+            if time_left() == 0:
+                break
+            result = self.find_ticker_local(name, exchanges=exchanges)
+            if result:
+                store(key, result)
+            elif use_online:
+                online_todo.append(key)
+            else:
+                # 离线未命中不写入全局缓存，以便之后的在线查找重试
+                resolved[key] = None
+                self.record_lookup(None)
+
+        # 2. 本地未命中的名称并发在线搜索；超过deadline时取消仍在进行的查找，不留下后台请求
+        if online_todo and time_left() != 0:
+            executor = ThreadPoolExecutor(max_workers=max(1, workers))
+            stop = threading.Event()
+            futures = {executor.submit(self.run_cancellable, stop, self.find_ticker_online, pending[key]): key
+                       for key in online_todo}
+            done, _ = wait(futures, timeout=time_left())
+            stop.set()
+            for future in done:
+                try:
+                    store(futures[future], future.result())
+                except (Exception, LookupCancelled) as e:
+                    logger.warning("在线搜索出错 %s: %r", pending[futures[future]], e)
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        rows = []
+        for name, key in zip(names, row_keys):
+            if key is None:
+                rows.append(self.result_row(name, None, 'invalid'))
+            elif key not in resolved:
+                rows.append(self.result_row(name, None, 'timeout'))
+            else:
+                rows.append(self.result_row(name, resolved[key]))
+
+        return result_table(rows)
+
+    def result_row(self, name, result: Optional[Dict], status: Optional[str] = None) -> Dict:
+        """将查找结果整理为批量/流式接口统一的输出行"""
+        if not result:
+            return {'name': name, 'ticker': None, 'matched_name': None, 'similarity': None,
+                    'source': 'not_found', 'status': status or 'not_found', 'cik': None}
+        return {
+            'name': name,
+            'ticker': result['ticker'],
+            'matched_name': result.get('matched_name') or (
+                result.get('company_name') if result.get('source') == 'local' else None),
+            'similarity': result.get('similarity'),
+            'source': result['source'],
+            'status': status or result.get('status', 'unknown'),
+            'cik': result.get('cik')
+        }
+
+    def iter_tickers(self, names: Iterable, use_online: bool = True, workers: int = 4,
+                     ordered: bool = True, max_pending: int = 64,
+                     use_cache: bool = True) -> Iterator[Dict]:
+        """
+        流式查找股票代码的生成器，适用于无界输入流（stdin、消息队列等）
+
+        缓存命中和本地匹配的结果立即产出，在线搜索在后台线程中进行。
+        ordered: True时按输入顺序产出；False时谁先完成先产出
+        max_pending: 同时等待在线搜索结果的最大名称数，超过时阻塞读取输入，使内存占用有界
+        use_cache: 是否使用并写入全局结果缓存；名称种类无限增长的流可关闭以保持内存恒定
+
+        每个产出的字典包含: name, ticker, matched_name, similarity, source, status, cik（即RESULT_COLUMNS）
+        """
+        executor = ThreadPoolExecutor(max_workers=max(1, workers)) if use_online else None
+        stop = threading.Event()
+        inflight = {}       # 标准化名称 -> 在线搜索future（流内同名请求共享）
+        queue = deque()     # ordered模式: (name, key, 结果行或future)
+        waiting = {}        # 非ordered模式: future -> [(name, key), ...]
+        waiting_count = 0
+
+        def finish(name, key, future) -> Dict:
+            inflight.pop(key, None)
+            try:
+                result = future.result()
+            except (Exception, LookupCancelled) as e:
+                logger.warning("在线搜索出错 %s: %r", name, e)
+                return self.result_row(name, None, 'error')
+            self.record_lookup(result)
+            if use_cache and key:
+                self.cache_put(key, result)
+            return self.result_row(name, result)
+
+        def resolve(name):
+            """返回(标准化名称, 结果行或future)；future表示需等待在线搜索"""
+            if not isinstance(name, str) or not name.strip():
+                return None, self.result_row(name, None, 'invalid')
+            key = self.normalize_company_name(name)
+            cached = self.cache_get(key) if use_cache and key else CACHE_MISS
+            if cached is not CACHE_MISS:
+                return key, self.result_row(name, cached)
+            if key and key in inflight:
+                return key, inflight[key]
+            result = self.find_ticker_local(name)
+            if result or not use_online:
+                self.record_lookup(result)
+                if use_cache and key and result:
+                    self.cache_put(key, result)
+                return key, self.result_row(name, result)
+            future = executor.submit(self.run_cancellable, stop, self.find_ticker_online, name)
+            if key:
+                inflight[key] = future
+            return key, future
+
+        try:
+            for name in names:
+                key, item = resolve(name)
+
+                if ordered:
+                    queue.append((name, key, item))
+                    while queue:
+                        head_name, head_key, head = queue[0]
+                        if isinstance(head, Future):
+                            if not head.done() and len(queue) < max_pending:
+                                break
+                            head = finish(head_name, head_key, head)
+                        queue.popleft()
+                        yield head
+                    continue
+
+                if not isinstance(item, Future):
+                    yield item
+                    continue
+                waiting.setdefault(item, []).append((name, key))
+                waiting_count += 1
+                if waiting_count >= max_pending:
+                    done, _ = wait(waiting, return_when=FIRST_COMPLETED)
+                else:
+                    done = [future for future in waiting if future.done()]
+                for future in done:
+                    for waiting_name, waiting_key in waiting.pop(future):
+                        waiting_count -= 1
+                        yield finish(waiting_name, waiting_key, future)
+
+            # 输入结束，产出剩余结果
+            while queue:
+                head_name, head_key, head = queue.popleft()
+                if isinstance(head, Future):
+                    head = finish(head_name, head_key, head)
+                yield head
+            while waiting:
+                done, _ = wait(waiting, return_when=FIRST_COMPLETED)
+                for future in done:
+                    for waiting_name, waiting_key in waiting.pop(future):
+                        yield finish(waiting_name, waiting_key, future)
+        finally:
+            # 消费方提前关闭生成器时，取消仍在进行的在线查找
+            stop.set()
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+    # ------------------------------------------------------------------
+    # asyncio版本的在线搜索流水线
+    # ------------------------------------------------------------------
+
+    def get_async_http(self) -> 'AsyncHttpBackend':
+        """获取绑定到当前事件循环的异步HTTP后端"""
+        loop = asyncio.get_running_loop()
+        if self.async_http is None or self.async_http.loop is not loop:
+            self.async_http = AsyncHttpBackend(recorder=self.record_stage)
+        return self.async_http
+
+    def get_async_flight(self) -> AsyncSingleFlight:
+        """获取绑定到当前事件循环的异步请求合并器"""
+        loop = asyncio.get_running_loop()
+        if self.async_flight is None or self.async_flight.loop is not loop:
+            self.async_flight = AsyncSingleFlight()
+        return self.async_flight
+
+    async def aclose(self):
+        """关闭异步HTTP后端的连接"""
+        if self.async_http is not None:
+            await self.async_http.close()
+            self.async_http = None
+
+    async def validate_ticker_with_company_verification_async(self, ticker: str, company_name: str) -> bool:
+        """validate_ticker_with_company_verification的异步版本（同一验证请求合并执行）"""
+        return await self.get_async_flight().do(
+            ('verify', verification_key(self, ticker, company_name)),
+            self.run_ticker_verification_async, ticker, company_name)
+
+    @timed_stage('verification')
+    async def run_ticker_verification_async(self, ticker: str, company_name: str) -> bool:
+        """实际执行异步的股票代码验证"""
+        try:
+            yahoo_url = f"https://query1.finance.yahoo.com/v8/finance/chart/{ticker}"
+            headers = {
+                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
             }
 
-        # 2. 在线搜索
-        if use_online:
-            print("开始在线搜索...")
-            delisted_result = self.search_delisted_stocks_online(company_name)
-            if delisted_result:
-                ticker = delisted_result['ticker']
-                print(f"在线搜索找到: {company_name} -> {ticker}")
+            status, text = await self.get_async_http().get(yahoo_url, headers=headers, timeout=10)
+            if status == 200:
+                data = json.loads(text)
+                if 'chart' in data and data['chart']['result']:
+                    meta = data['chart']['result'][0].get('meta', {})
+                    symbol_name = meta.get('longName', '') or meta.get('shortName', '')
 
-                return {
-                    'ticker': ticker,
-                    'company_name': company_name,
-                    'source': delisted_result['source'],
-                    'status': delisted_result.get('status', 'unknown'),
-                    'search_method': delisted_result.get('query', 'multiple_methods'),
-                    'similarity': delisted_result.get('similarity')
+                    if symbol_name:
+                        similarity = self.calculate_company_similarity(company_name, symbol_name)
+                        logger.debug("Yahoo验证: %s -> %s (相似度: %.2f)", ticker, symbol_name, similarity)
+                        if similarity > 0.75:
+                            return True
+                        logger.debug("相似度过低(%.2f)，Yahoo验证失败", similarity)
+                        return False
+
+                    logger.debug("Yahoo无公司名称信息，可能是退市股票: %s", ticker)
+                    return await self.strict_fallback_verification_async(ticker, company_name)
+
+            return await self.strict_fallback_verification_async(ticker, company_name)
+
+        except Exception as e:
+            logger.warning("股票代码验证错误: %s", e)
+            return await self.strict_fallback_verification_async(ticker, company_name)
+
+    @timed_stage('fallback_verification')
+    async def strict_fallback_verification_async(self, ticker: str, company_name: str) -> bool:
+        """strict_fallback_verification的异步版本"""
+        try:
+            # 字符匹配检查不涉及网络，直接复用同步逻辑
+            if len(ticker) >= 2 and ticker.isalpha() and ticker.isupper():
+                return self.strict_fallback_verification(ticker, company_name)
+
+            await self.pause_async(1)
+            return await self.verify_with_alpha_vantage_async(ticker, company_name)
+
+        except Exception as e:
+            logger.warning("严格备用验证错误: %s", e)
+            return False
+
+    @timed_stage('alpha_vantage')
+    async def verify_with_alpha_vantage_async(self, ticker: str, company_name: str) -> bool:
+        """verify_with_alpha_vantage的异步版本"""
+        try:
+            params = {
+                'function': 'SYMBOL_SEARCH',
+                'keywords': ticker,
+                'apikey': 'demo'
+            }
+            status, text = await self.get_async_http().get("https://www.alphavantage.co/query",
+                                                           params=params, timeout=10)
+            if status == 200:
+                data = json.loads(text)
+                for match in data.get('bestMatches') or []:
+                    if match.get('1. symbol', '').upper() == ticker.upper():
+                        logger.debug("Alpha Vantage验证成功: %s", ticker)
+                        return True
+        except Exception:
+            pass
+
+        if 2 <= len(ticker) <= 5 and ticker.isalpha():
+            if not self.is_obviously_web_content(ticker):
+                logger.debug("基于格式的谨慎验证: %s", ticker)
+                return True
+
+        return False
+
+    @timed_stage('yahoo')
+    async def search_yahoo_historical_async(self, company_name: str) -> Optional[Dict]:
+        """search_yahoo_historical的异步版本"""
+        try:
+            params = {
+                'q': company_name,
+                'lang': 'en-US',
+                'region': 'US',
+                'quotesCount': 10,
+                'newsCount': 0
+            }
+            headers = {
+                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+            }
+
+            status, text = await self.get_async_http().get(
+                "https://query1.finance.yahoo.com/v1/finance/search",
+                params=params, headers=headers, timeout=10)
+
+            if status == 200:
+                data = json.loads(text)
+                for quote in data.get('quotes') or []:
+                    symbol = quote.get('symbol', '')
+                    quote_name = quote.get('longname', '') or quote.get('shortname', '')
+
+                    if symbol and len(symbol) <= 5 and quote_name:
+                        similarity = self.calculate_company_similarity(company_name, quote_name)
+                        if similarity > 0.75:
+                            logger.debug("Yahoo Finance历史搜索找到: %s (相似度: %.2f)", symbol, similarity)
+                            return {
+                                'ticker': symbol,
+                                'company_name': company_name,
+                                'source': 'yahoo_historical',
+                                'quote_type': quote.get('typeDisp', 'Unknown'),
+                                'matched_name': quote_name,
+                                'similarity': similarity
+                            }
+        except Exception as e:
+            logger.warning("Yahoo历史搜索错误: %s", e)
+        return None
+
+    @timed_stage('sec_edgar')
+    async def search_sec_edgar_enhanced_async(self, company_name: str) -> Optional[Dict]:
+        """search_sec_edgar_enhanced的异步版本"""
+        try:
+            logger.debug("搜索SEC EDGAR: %s", company_name)
+
+            params = {
+                'company': company_name,
+                'match': 'contains',
+                'action': 'getcompany'
+            }
+            headers = {
+                'User-Agent': 'Mozilla/5.0 (compatible; StockFinder/1.0; research-purpose)',
+                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8'
+            }
+
+            status, content = await self.get_async_http().get(
+                "https://www.sec.gov/cgi-bin/browse-edgar", params=params, headers=headers, timeout=15)
+
+            if status == 200:
+                company_keywords = self.extract_core_keywords(company_name)
+
+                match = re.search(r'Trading Symbol[:\s]*([A-Z]{1,5})', content, re.IGNORECASE)
+                if match:
+                    ticker = match.group(1)
+                    if self.validate_ticker_context(ticker, company_name, content):
+                        logger.debug("SEC EDGAR找到验证的股票代码: %s", ticker)
+                        return {
+                            'ticker': ticker,
+                            'company_name': company_name,
+                            'source': 'sec_edgar_enhanced'
+                        }
+
+                ticker_patterns = [
+                    r'symbol[:\s]+([A-Z]{2,5})',
+                    r'ticker[:\s]+([A-Z]{2,5})',
+                    r'NYSE[:\s]*([A-Z]{2,5})',
+                    r'NASDAQ[:\s]*([A-Z]{2,5})'
+                ]
+
+                candidates = []
+                for pattern in ticker_patterns:
+                    for match in re.findall(pattern, content, re.IGNORECASE):
+                        if 2 <= len(match) <= 5:
+                            ticker_pos = content.upper().find(match)
+                            if ticker_pos > 0:
+                                context = content[max(0, ticker_pos - 200):ticker_pos + 200].upper()
+                                if any(keyword in context for keyword in company_keywords):
+                                    candidates.append(match)
+
+                for candidate in candidates:
+                    if await self.validate_ticker_with_company_verification_async(candidate, company_name):
+                        logger.debug("SEC EDGAR验证成功: %s", candidate)
+                        return {
+                            'ticker': candidate,
+                            'company_name': company_name,
+                            'source': 'sec_edgar_pattern'
+                        }
+
+        except Exception as e:
+            logger.warning("SEC EDGAR搜索错误: %s", e)
+        return None
+
+    @timed_stage('marketwatch')
+    async def search_investment_sites_async(self, company_name: str) -> Optional[Dict]:
+        """search_investment_sites的异步版本"""
+        sites = [
+            {
+                'name': 'MarketWatch',
+                'url': 'https://www.marketwatch.com/tools/quotes/lookup.asp',
+                'params': {'Lookup': company_name, 'Country': 'us'},
+                'pattern': r'symbol=([A-Z]{1,5})'
+            }
+        ]
+
+        for site in sites:
+            try:
+                headers = {
+                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
                 }
+                status, content = await self.get_async_http().get(site['url'], params=site['params'],
+                                                                  headers=headers, timeout=10)
 
-            print("标准在线搜索未找到结果")
+                if status == 200:
+                    for match in re.findall(site['pattern'], content, re.IGNORECASE):
+                        if len(match) <= 5:
+                            if await self.validate_ticker_with_company_verification_async(match, company_name):
+                                logger.debug("%s找到验证的股票代码: %s", site['name'], match)
+                                return {
+                                    'ticker': match,
+                                    'company_name': company_name,
+                                    'source': site['name'].lower()
+                                }
+
+                await self.pause_async(1)  # 避免请求过快
+
+            except Exception as e:
+                logger.warning("%s搜索错误: %s", site['name'], e)
+                continue
 
-        print("未找到匹配的股票代码")
         return None
 
-    def convert_csv_files(self, csv_pattern="*_all_quarters_merged.csv"):
+    @timed_stage('duckduckgo')
+    async def search_web_general_enhanced_async(self, company_name: str) -> Optional[Dict]:
+        """search_web_general_enhanced的异步版本"""
+        search_queries = [
+            f'"{company_name}" stock ticker symbol NYSE NASDAQ',
+            f'"{company_name}" stock symbol trading',
+            f'{company_name} ticker symbol exchange',
+            f'"{company_name}" delisted stock ticker',
+            f'{company_name} stock code symbol'
+        ]
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+        }
+
+        for query in search_queries:
+            logger.debug("网络搜索: %s", query)
+            try:
+                status, content = await self.get_async_http().get(
+                    "https://html.duckduckgo.com/html/", params={'q': query}, headers=headers, timeout=15)
+                if status == 200:
+                    for candidate in self.extract_ticker_candidates_enhanced(content, company_name):
+                        logger.debug("正在验证候选股票代码: %s", candidate)
+
+                        if not self.is_valid_ticker(candidate):
+                            continue
+
+                        if self.validate_ticker_context(candidate, company_name, content):
+                            logger.debug("上下文验证通过: %s", candidate)
+                            if await self.validate_ticker_with_company_verification_async(candidate, company_name):
+                                logger.debug("在线验证通过: %s", candidate)
+                                return {
+                                    'ticker': candidate,
+                                    'company_name': company_name,
+                                    'source': 'web_search_enhanced',
+                                    'query': query,
+                                    'verification': 'full'
+                                }
+                            logger.debug("在线验证失败: %s", candidate)
+
+                await self.pause_async(2)  # 避免被封IP
+
+            except Exception as e:
+                logger.warning("搜索查询错误: %s", e)
+                continue
+
+        return None
+
+    async def search_delisted_stocks_online_async(self, company_name: str) -> Optional[Dict]:
+        """search_delisted_stocks_online的异步版本"""
+        logger.debug("正在网络搜索退市股票: %s", company_name)
+
+        try:
+            for method in (self.search_yahoo_historical_async,
+                           self.search_sec_edgar_enhanced_async,
+                           self.search_investment_sites_async,
+                           self.search_web_general_enhanced_async):
+                result = await method(company_name)
+                if result:
+                    return result
+        except Exception as e:
+            logger.warning("退市股票搜索错误: %s", e)
+
+        return None
+
+    async def find_ticker_online_async(self, company_name: str) -> Optional[Dict]:
+        """find_ticker_online的异步版本"""
+        logger.debug("开始在线搜索...")
+        delisted_result = await self.search_delisted_stocks_online_async(company_name)
+        if delisted_result:
+            ticker = delisted_result['ticker']
+            logger.debug("在线搜索找到: %s -> %s", company_name, ticker)
+
+            result = {
+                'ticker': ticker,
+                'company_name': company_name,
+                'source': delisted_result['source'],
+                'status': delisted_result.get('status', 'unknown'),
+                'search_method': delisted_result.get('query', 'multiple_methods'),
+                'similarity': delisted_result.get('similarity'),
+                'matched_name': delisted_result.get('matched_name')
+            }
+            # 追加别名文件是阻塞的文件I/O，放到线程中执行
+            await asyncio.to_thread(self.add_alias, company_name, result)
+            return result
+
+        logger.debug("标准在线搜索未找到结果")
+        return None
+
+    async def find_ticker_async(self, company_name: str, use_online: bool = True) -> Optional[Dict]:
+        """
+        find_ticker的异步版本，结果写入共享的结果缓存
+        本地模糊匹配是CPU密集操作，放到线程中执行以免阻塞事件循环
+        """
+        if not isinstance(company_name, str) or not company_name.strip():
+            return None
+
+        key = self.normalize_company_name(company_name)
+        cached = self.cache_get(key) if key else CACHE_MISS
+        if cached is not CACHE_MISS:
+            return cached
+
+        # 同一事件循环上对同一名称的并发请求只执行一次
+        return await self.get_async_flight().do(
+            ('find_ticker', key or company_name.strip(), use_online),
+            self.resolve_ticker_async, company_name, key, use_online)
+
+    @timed_stage('find_ticker')
+    async def resolve_ticker_async(self, company_name: str, key: str, use_online: bool) -> Optional[Dict]:
+        """find_ticker_async的实际查找过程"""
+        logger.debug("正在搜索: %s", company_name)
+
+        # 完全匹配只是一次索引查找，直接在事件循环上执行；未命中时模糊匹配放到线程中，且不再重复完全匹配
+        exact_match = self.search_exact(company_name)
+        if exact_match:
+            result = self.local_result(*exact_match)
+        else:
+            result = await asyncio.to_thread(self.find_ticker_local, company_name, skip_exact=True)
+
+        if result is None and use_online:
+            result = await self.find_ticker_online_async(company_name)
+
+        if result is None:
+            logger.debug("未找到匹配的股票代码")
+        self.record_lookup(result)
+        if key and (result is not None or use_online):
+            self.cache_put(key, result)
+        return result
+
+    async def find_tickers_async(self, names, use_online: bool = True,
+                                 deadline: Optional[float] = None) -> pd.DataFrame:
+        """
+        find_tickers的异步版本：所有不同的名称同时在事件循环上查找，
+        并发量由AsyncHttpBackend的连接数和单主机限速控制
+
+        输出列与find_tickers相同，超过deadline（秒）未完成的名称状态为timeout
+        """
+        names = list(names)
+        tasks = {}
+        for name in names:
+            if isinstance(name, str) and name.strip():
+                key = self.normalize_company_name(name) or name.strip()
+                if key not in tasks:
+                    tasks[key] = asyncio.ensure_future(self.find_ticker_async(name, use_online=use_online))
+
+        if tasks:
+            await asyncio.wait(tasks.values(), timeout=deadline)
+
+        rows = []
+        for name in names:
+            if not isinstance(name, str) or not name.strip():
+                rows.append(self.result_row(name, None, 'invalid'))
+                continue
+            task = tasks[self.normalize_company_name(name) or name.strip()]
+            if not task.done():
+                rows.append(self.result_row(name, None, 'timeout'))
+            elif task.exception() is not None:
+                rows.append(self.result_row(name, None, 'error'))
+            else:
+                rows.append(self.result_row(name, task.result()))
+
+        for task in tasks.values():
+            task.cancel()
+
+        return result_table(rows)
+
+    def lookup_cached(self, company_name, use_online: bool = True,
+                      key: Optional[str] = None) -> Optional[Dict]:
+        """
+        查找股票代码，标准化名称相同的公司在本次运行中只解析一次
+        key: 预先计算好的标准化名称（如normalize_series的结果）
+        """
+        if not isinstance(company_name, str) or not company_name.strip():
+            return self.find_ticker(company_name, use_online=use_online)
+
+        if key is None:
+            key = self.normalize_company_name(company_name)
+        if not key:
+            return self.find_ticker(company_name, use_online=use_online)
+
+        cached = self.cache_get(key)
+        if cached is not CACHE_MISS:
+            return cached
+
+        def resolve():
+            # 等待期间其他调用者可能已写入缓存（不重复计入命中统计）
+            cached = self.resolved_names.get(key, CACHE_MISS)
+            if cached is not CACHE_MISS:
+                return cached
+            result = self.find_ticker(company_name, use_online=use_online)
+            # 离线未命中不写入缓存，以便之后的在线查找重试
+            if result is not None or use_online:
+                self.cache_put(key, result)
+            return result
+
+        return self.flight.do(('lookup_cached', key, use_online), resolve)
+
+    def load_checkpoint(self, checkpoint_file: str) -> Dict:
+        """加载检查点文件，并将其中已解析的名称载入缓存"""
+        try:
+            with open(checkpoint_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return {'resolved': {}, 'files': {}}
+        except Exception as e:
+            logger.warning("加载检查点 %s 时出错: %s", checkpoint_file, e)
+            return {'resolved': {}, 'files': {}}
+
+        state.setdefault('resolved', {})
+        state.setdefault('files', {})
+        self.cache_update(state['resolved'])
+        logger.info("已从检查点恢复 %s 个已解析名称", len(state['resolved']))
+        return state
+
+    def save_checkpoint(self, checkpoint_file: str, state: Dict):
+        """原子地写入检查点（已解析名称 + 各文件进度）"""
+        state['resolved'] = self.cache_snapshot()
+        atomic_write(checkpoint_file,
+                     lambda f: json.dump(state, f, ensure_ascii=False))
+
+    def load_cusip_index(self, cusip_file: str) -> int:
+        """
+        加载CUSIP映射文件（CSV，列: cusip, ticker，可选 name, cik, source），返回新增的条目数
+        没有source列的条目视为人工提供的映射（source=cusip_map）；
+        旧版本从在线搜索结果学习到的条目被丢弃，之后由本地解析重新学习
+        """
+        try:
+            mapping = pd.read_csv(cusip_file, dtype=str, keep_default_na=False)
+        except FileNotFoundError:
+            return 0
+        except Exception as e:
+            logger.warning("加载CUSIP映射 %s 时出错: %s", cusip_file, e)
+            return 0
+
+        mapping.columns = [str(col).strip().lower() for col in mapping.columns]
+        if not {'cusip', 'ticker'}.issubset(mapping.columns):
+            logger.warning("CUSIP映射 %s 缺少cusip或ticker列，可用列: %s", cusip_file, list(mapping.columns))
+            return 0
+
+        added = 0
+        dropped = 0
+        for row in mapping.to_dict('records'):
+            cusip = normalize_cusip(row['cusip'])
+            ticker = row['ticker'].strip()
+            if cusip is None or not ticker or cusip[:8] in self.cusip_index:
+                continue
+            if row.get('source', '').strip() in ONLINE_SOURCES:
+                dropped += 1
+                continue
+            cik = row.get('cik', '').strip()
+            self.cusip_index[cusip[:8]] = {
+                'cusip': cusip,
+                'ticker': ticker,
+                'company_name': row.get('name', '').strip() or None,
+                'cik': int(cik) if cik.isdigit() else None,
+                'source': row.get('source', '').strip() or 'cusip_map'
+            }
+            added += 1
+        if dropped:
+            logger.info("CUSIP映射 %s 中丢弃了 %s 个来自在线搜索的条目", cusip_file, dropped)
+        return added
+
+    def save_cusip_index(self, cusip_file: str):
+        """原子地写出CUSIP索引（包括人工提供的和从解析结果中学到的条目）"""
+        columns = ['cusip', 'ticker', 'name', 'cik', 'source']
+        rows = [[entry['cusip'], entry['ticker'], entry['company_name'], entry['cik'], entry['source']]
+                for _, entry in sorted(self.cusip_index.items())]
+        table = pd.DataFrame(rows, columns=columns).astype({'cik': 'Int64'})
+        atomic_write(cusip_file, lambda f: table.to_csv(f, index=False))
+
+    def lookup_cusip(self, cusip) -> Optional[Dict]:
+        """按CUSIP查找已知结果（O(1)），未知时返回None"""
+        cusip = normalize_cusip(cusip)
+        entry = self.cusip_index.get(cusip[:8]) if cusip else None
+        if entry is None:
+            return None
+        return {
+            'ticker': entry['ticker'],
+            'company_name': entry['company_name'],
+            'matched_name': entry['company_name'],
+            'similarity': None,
+            'source': 'cusip',
+            'status': 'active' if entry['source'] in ('cusip_map', 'local') else 'unknown',
+            'cik': entry['cik']
+        }
+
+    def learn_cusip(self, cusip, result: Optional[Dict]) -> bool:
+        """
+        将按名称在本地（公司表/别名表）解析的结果记入CUSIP索引（已有的条目不覆盖），返回是否新增
+        在线搜索的结果不稳定，不记入
+        """
+        cusip = normalize_cusip(cusip)
+        if (cusip is None or not result or result.get('source') not in ('local', 'alias')
+                or cusip[:8] in self.cusip_index):
+            return False
+        self.cusip_index[cusip[:8]] = {
+            'cusip': cusip,
+            'ticker': result['ticker'],
+            'company_name': result.get('matched_name') or result.get('company_name'),
+            'cik': result.get('cik'),
+            'source': result['source']
+        }
+        return True
+
+    def seed_from_output(self, output_file: str, output_format: str = 'csv', seed_misses: bool = False) -> int:
+        """
+        将上一次的输出文件作为种子缓存，返回新增的名称数
+        seed_misses: 是否把未匹配的名称也记为已解析（None）；只应在上一次运行做过在线搜索时开启，
+                     离线运行的未匹配不缓存，之后的在线运行仍会重试
+        """
+        try:
+            previous = read_table(output_file, output_format)
+        except Exception as e:
+            logger.warning("读取上次输出 %s 时出错: %s", output_file, e)
+            return 0
+
+        if not {'nameOfIssuer', 'Symbol', 'Source'}.issubset(previous.columns):
+            return 0
+
+        seeds = {}
+        keys = self.normalize_series(previous['nameOfIssuer'])
+        ciks = previous['CIK'] if 'CIK' in previous.columns else [''] * len(previous)
+        for name, key, symbol, source, cik in zip(previous['nameOfIssuer'], keys,
+                                                  previous['Symbol'], previous['Source'], ciks):
+            if not key or key in seeds:
+                continue
+            if symbol and source != 'not_found':
+                seeds[key] = {
+                    'ticker': symbol,
+                    'company_name': name.strip(),
+                    'source': source,
+                    'cik': int(cik) if cik.isdigit() else None
+                }
+            elif seed_misses:
+                seeds[key] = None
+        return self.cache_update(seeds, overwrite=False)
+
+    def load_manifest(self, manifest_file: str) -> Dict:
+        """加载增量转换的输入指纹清单"""
+        try:
+            with open(manifest_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning("加载指纹清单 %s 时出错: %s", manifest_file, e)
+            return {}
+
+    def prefetch(self, names: pd.Series, keys: pd.Series, use_online: bool, workers: int,
+                 checkpoint_file: Optional[str] = None, checkpoint_every: int = 50,
+                 state: Optional[Dict] = None) -> int:
+        """
+        用多个线程并发解析尚未缓存的名称（每个标准化名称一次），结果写入缓存，返回解析的名称数
+        每解析checkpoint_every个名称写一次检查点
+        """
+        pending = {}
+        for name, key in zip(names, keys):
+            if isinstance(key, str) and key and key not in self.resolved_names:
+                pending.setdefault(key, name)
+        if not pending:
+            return 0
+
+        logger.info("  并发解析 %s 个未缓存名称 (%s 个线程)...", len(pending), workers)
+        done = 0
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(self.lookup_cached, name, use_online, key)
+                       for key, name in pending.items()]
+            for future in as_completed(futures):
+                future.result()
+                done += 1
+                if checkpoint_file and state is not None and done % checkpoint_every == 0:
+                    self.save_checkpoint(checkpoint_file, state)
+        return done
+
+    def convert_csv_files(self, csv_pattern="*_all_quarters_merged.csv",
+                          checkpoint_file: Optional[str] = "convert_checkpoint.json",
+                          resume: bool = False, checkpoint_every: int = 50,
+                          incremental: bool = False,
+                          manifest_file: str = "convert_manifest.json",
+                          progress_interval: float = 5.0,
+                          stats_file: Optional[str] = None,
+                          metrics_file: Optional[str] = None,
+                          use_online: bool = True,
+                          profile_dir: Optional[str] = None,
+                          profile_sample: float = 0.0,
+                          profile_threshold: Optional[float] = None,
+                          csv_files: Optional[Iterable] = None,
+                          name_column: Optional[str] = None,
+                          output_format: str = 'csv',
+                          output_dir: Optional[str] = None,
+                          workers: int = 1,
+                          cusip_file: Optional[str] = None,
+                          cusip_column: Optional[str] = None):
         """
         转换所有匹配模式的CSV文件 - 使用完全匹配test3.py的逻辑
+
+        checkpoint_file: 检查点文件路径，为None时不写检查点
+        resume: 从检查点继续：跳过已完成的文件，未完成文件中已解析的名称直接从缓存取结果
+        checkpoint_every: 每新解析多少个名称写一次检查点
+        incremental: 增量模式，跳过输入指纹未变化的文件；变化的文件以上次输出为种子缓存，
+                     只解析新出现的名称
+        manifest_file: 增量模式使用的输入指纹清单
+        progress_interval: 进度日志的最小间隔（秒）
+        stats_file: 结束时写入各阶段耗时统计（JSON）的路径，指定时自动开启统计
+        metrics_file: 结束时写入Prometheus文本格式指标的路径，指定时自动开启指标
+        use_online: 本地未找到时是否在线搜索
+        profile_dir: 查找剖析输出目录，指定时按profile_sample比例抽样、
+                     或对超过profile_threshold秒的查找保存cProfile与tracemalloc快照
+        csv_files: 明确指定的输入文件列表，指定时忽略csv_pattern
+        name_column: 公司名称列名，为None时自动查找包含nameOfIssuer的列
+        output_format: 输出格式（见OUTPUT_FORMATS），输出文件为 <输入文件名>_with_tickers.<格式>
+        output_dir: 输出目录，默认当前目录
+        workers: 大于1时先用多个线程并发解析文件中未缓存的名称，再按行写出结果
+        cusip_file: CUSIP映射文件（见load_cusip_index），指定时在名称匹配之前先按CUSIP查找，
+                    按名称在本地解析成功的CUSIP记入索引，结束时写回该文件
+        cusip_column: CUSIP列名，为None时自动查找列名包含cusip的列
+        返回处理失败的输入文件列表
         """
-        print("=" * 60)
-        print("开始CSV文件转换 - 使用完全匹配test3.py的逻辑...")
+        require_format(output_format)
+        if profile_dir:
+            self.enable_profiling(profile_dir, sample_rate=profile_sample, threshold=profile_threshold)
+        if stats_file:
+            self.enable_stats()
+        if metrics_file:
+            self.enable_metrics()
+
+        logger.info("=" * 60)
+        logger.info("开始CSV文件转换 - 使用完全匹配test3.py的逻辑...")
 
         # 查找所有匹配的CSV文件
-        current_dir = Path('.')
-        csv_files = list(current_dir.glob(csv_pattern))
+        if csv_files is not None:
+            csv_files = [Path(csv_file) for csv_file in csv_files]
+        else:
+            current_dir = Path('.')
+            csv_files = sorted(current_dir.glob(csv_pattern))
 
         if not csv_files:
-            print(f"未找到匹配模式 '{csv_pattern}' 的CSV文件")
-            return
+            logger.info("未找到匹配模式 '%s' 的CSV文件", csv_pattern)
+            return []
+
+        logger.info("找到 %s 个CSV文件需要处理", len(csv_files))
+        if output_dir:
+            Path(output_dir).mkdir(parents=True, exist_ok=True)
 
-        print(f"找到 {len(csv_files)} 个CSV文件需要处理")
+        # 检查点状态
+        if resume and checkpoint_file:
+            state = self.load_checkpoint(checkpoint_file)
+        else:
+            state = {'resolved': {}, 'files': {}}
+
+        manifest = self.load_manifest(manifest_file) if incremental else {}
+
+        if cusip_file:
+            logger.info("加载CUSIP映射: %s 条", self.load_cusip_index(cusip_file))
+        learned_cusips = 0
 
         # 统计信息
         total_processed = 0
         total_matched = 0
         all_unmatched = set()
+        failed_files = []
 
         for csv_file in csv_files:
-            print(f"\n处理文件: {csv_file}")
+            logger.info("处理文件: %s", csv_file)
+
+            # 生成输出文件名
+            output_file = str(Path(output_dir or '.') / (csv_file.stem + '_with_tickers' +
+                                                         OUTPUT_FORMATS[output_format]))
+            file_key = str(csv_file)
+            file_state = state['files'].get(file_key, {})
+
+            if resume and file_state.get('completed') and os.path.exists(output_file):
+                logger.info("  ⏭️ 检查点显示已完成，跳过: %s", output_file)
+                total_processed += file_state.get('rows', 0)
+                total_matched += file_state.get('matched', 0)
+                continue
 
-            try:
-                # 读取CSV文件
-                df = pd.read_csv(csv_file)
-
-                # 查找nameOfIssuer列
-                name_column = None
-                for col in df.columns:
-                    if 'nameOfIssuer' in col or 'nameOfIssue' in col:
-                        name_column = col
-                        break
+            fingerprint = None
+            if incremental:
+                fingerprint = file_fingerprint(csv_file)
+                previous = manifest.get(file_key, {})
+                if os.path.exists(output_file):
+                    if previous.get('fingerprint') == fingerprint:
+                        logger.info("  ⏭️ 输入未变化，输出已是最新，跳过: %s", output_file)
+                        total_processed += previous.get('rows', 0)
+                        total_matched += previous.get('matched', 0)
+                        continue
+                    seeded = self.seed_from_output(output_file, output_format,
+                                                   seed_misses=previous.get('use_online', False))
+                    logger.info("  以上次输出为种子缓存: 新增 %s 个已解析名称", seeded)
 
-                if name_column is None:
-                    print(f"  警告: 文件中未找到 'nameOfIssuer' 或 'nameOfIssue' 列")
-                    print(f"  可用列: {list(df.columns)}")
+            try:
+                # 读取CSV文件；CUSIP列按文本读取，保留纯数字CUSIP的前导零
+                file_cusip_column = None
+                if cusip_file:
+                    file_cusip_column = find_cusip_column(pd.read_csv(csv_file, nrows=0).columns, cusip_column)
+                df = pd.read_csv(csv_file, dtype={file_cusip_column: str} if file_cusip_column else None)
+
+                # 查找nameOfIssuer列（或指定的名称列）
+                file_name_column = find_name_column(df.columns, name_column)
+                if file_name_column is None:
+                    logger.warning("  警告: 文件中未找到 '%s' 列", name_column or 'nameOfIssuer')
+                    logger.warning("  可用列: %s", list(df.columns))
+                    failed_files.append(str(csv_file))
                     continue
 
-                # 创建新的DataFrame，包含必需的列: nameOfIssuer, Symbol, Source
-                result_df = pd.DataFrame()
-
-                tickers = []
-                sources = []
+                # 逐行的查找结果（result_row格式），最后整理为输出表
+                rows = []
                 matched_count = 0
 
-                print(f"  处理 {len(df)} 家公司...")
+                logger.info("  处理 %s 家公司...", len(df))
 
-                for i, company_name in enumerate(df[name_column]):
-                    if i % 10 == 0 and i > 0:
-                        print(f"    进度: {i}/{len(df)} ({i / len(df) * 100:.1f}%)")
+                # 向量化计算整列的标准化名称，作为去重和缓存的键
+                keys = self.normalize_series(df[file_name_column])
 
-                    result = self.find_ticker(company_name, use_online=True)
+                # CUSIP列（未启用CUSIP索引或文件中没有该列时全部为None）
+                cusips = df[file_cusip_column] if file_cusip_column else pd.Series([None] * len(df), index=df.index)
+                cusip_hits = 0
 
-                    if result:
-                        tickers.append(result['ticker'])
-                        sources.append(result['source'])
-                        matched_count += 1
-                    else:
-                        tickers.append(None)
-                        sources.append('not_found')
-                        if pd.notna(company_name) and str(company_name).strip():
-                            all_unmatched.add(str(company_name).strip())
-
-                # 创建结果DataFrame: nameOfIssuer, Symbol, Source
-                result_df['nameOfIssuer'] = df[name_column].copy()
-                result_df['Symbol'] = tickers
-                result_df['Source'] = sources
+                if workers > 1:
+                    # CUSIP已知的行不需要按名称预先解析
+                    todo = cusips.map(lambda cusip: self.lookup_cusip(cusip) is None)
+                    self.prefetch(df[file_name_column][todo], keys[todo], use_online, workers,
+                                  checkpoint_file, checkpoint_every, state)
 
-                # 生成输出文件名
-                output_file = csv_file.stem + '_with_tickers.csv'
+                unsaved = 0
+                last_progress = time.monotonic()
+                for i, (company_name, key, cusip) in enumerate(zip(df[file_name_column], keys, cusips)):
+                    # 按时间间隔汇报进度，而不是每隔固定行数
+                    now = time.monotonic()
+                    if now - last_progress >= progress_interval:
+                        last_progress = now
+                        logger.info("    进度: %s/%s (%.1f%%)", i, len(df), i / len(df) * 100)
 
-                # 保存结果
-                result_df.to_csv(output_file, index=False)
+                    # 先按CUSIP查找，不受名称写法差异影响
+                    result = self.lookup_cusip(cusip) if file_cusip_column else None
+                    if result:
+                        cusip_hits += 1
+                        self.record_lookup(result)
+                    else:
+                        # 从检查点继续时，之前已解析的名称直接从缓存取结果
+                        resolved_before = len(self.resolved_names)
+                        result = self.lookup_cached(company_name, use_online=use_online,
+                                                    key=key if isinstance(key, str) else None)
+                        unsaved += len(self.resolved_names) - resolved_before
+                        if file_cusip_column and self.learn_cusip(cusip, result):
+                            learned_cusips += 1
+
+                    rows.append(self.result_row(company_name, result))
+                    if result:
+                        matched_count += 1
+                    elif pd.notna(company_name) and str(company_name).strip():
+                        all_unmatched.add(str(company_name).strip())
+
+                    if checkpoint_file and unsaved >= checkpoint_every:
+                        state['files'][file_key] = {'completed': False}
+                        self.save_checkpoint(checkpoint_file, state)
+                        unsaved = 0
+
+                # 创建结果DataFrame: nameOfIssuer, Symbol, Source（Parquet包含更多字段）
+                result_df = output_table(df[file_name_column], result_table(rows),
+                                         output_format)
+
+                # 原子地保存结果，崩溃时不会留下截断的文件
+                atomic_write(output_file, lambda f: write_table(result_df, f, output_format),
+                             binary=output_format in BINARY_FORMATS)
+
+                if checkpoint_file:
+                    state['files'][file_key] = {
+                        'completed': True,
+                        'rows': len(df),
+                        'matched': matched_count
+                    }
+                    self.save_checkpoint(checkpoint_file, state)
+
+                if incremental:
+                    manifest[file_key] = {
+                        'fingerprint': fingerprint,
+                        'output': output_file,
+                        'rows': len(df),
+                        'matched': matched_count,
+                        'use_online': use_online
+                    }
+                    atomic_write(manifest_file,
+                                 lambda f: json.dump(manifest, f, ensure_ascii=False, indent=2))
 
                 total_processed += len(df)
                 total_matched += matched_count
 
-                print(f"  ✅ 处理完成: {output_file}")
-                print(f"  📊 总计 {len(df)} 条记录，成功匹配 {matched_count} 个股票代码 ({matched_count / len(df) * 100:.1f}%)")
+                if file_cusip_column:
+                    logger.info("  CUSIP命中 %s 行 (列: %s)", cusip_hits, file_cusip_column)
+                elif cusip_file:
+                    logger.info("  文件中未找到CUSIP列，只按名称查找")
+
+                logger.info("  ✅ 处理完成: %s", output_file)
+                logger.info("  📊 总计 %s 条记录，成功匹配 %s 个股票代码 (%.1f%%)",
+                            len(df), matched_count, matched_count / len(df) * 100)
 
                 # 显示一些匹配示例
                 matched_examples = result_df[result_df['Symbol'].notna()].head(3)
                 if not matched_examples.empty:
-                    print(f"  🎯 匹配示例:")
+                    logger.info("  🎯 匹配示例:")
                     for _, row in matched_examples.iterrows():
-                        print(f"     '{row['nameOfIssuer']}' → {row['Symbol']} ({row['Source']})")
+                        logger.info("     '%s' → %s (%s)", row['nameOfIssuer'], row['Symbol'], row['Source'])
 
             except Exception as e:
-                print(f"  ❌ 处理文件时出错: {e}")
+                logger.error("  ❌ 处理文件时出错: %s", e)
+                failed_files.append(str(csv_file))
 
         # 显示总体统计
-        print(f"\n" + "=" * 60)
-        print(f"📈 处理完成统计:")
-        print(f"   总处理记录数: {total_processed:,}")
-        print(f"   成功匹配数: {total_matched:,}")
-        print(f"   总体匹配率: {total_matched / total_processed * 100:.1f}%")
+        logger.info("=" * 60)
+        logger.info("📈 处理完成统计:")
+        logger.info("   总处理记录数: %s", format(total_processed, ','))
+        logger.info("   成功匹配数: %s", format(total_matched, ','))
+        if total_processed:
+            logger.info("   总体匹配率: %.1f%%", total_matched / total_processed * 100)
+
+        if cusip_file:
+            self.save_cusip_index(cusip_file)
+            logger.info("CUSIP索引已写入: %s (共 %s 条，本次新增 %s 条)",
+                        cusip_file, len(self.cusip_index), learned_cusips)
 
         # 显示一些未匹配的公司
         if all_unmatched:
-            print(f"\n❓ 未匹配公司示例 (总计 {len(all_unmatched)} 家):")
+            logger.info("❓ 未匹配公司示例 (总计 %s 家):", len(all_unmatched))
             sorted_unmatched = sorted(all_unmatched)
             for i, name in enumerate(sorted_unmatched[:15]):
-                print(f"   {i + 1:2d}. {name}")
+                logger.info("   %2d. %s", i + 1, name)
             if len(all_unmatched) > 15:
-                print(f"   ... 还有 {len(all_unmatched) - 15} 家未显示")
+                logger.info("   ... 还有 %s 家未显示", len(all_unmatched) - 15)
+
+        logger.info("💡 注意: 使用完全匹配test3.py的逻辑")
+        logger.info("   - 相同的数据加载逻辑")
+        logger.info("   - 相同的相似度计算算法")
+        logger.info("   - 相同的验证机制和阈值")
+        logger.info("   - 相同的搜索和过滤逻辑")
+
+        if stats_file:
+            report = self.stats()
+            report['run'] = {
+                'files': len(csv_files),
+                'rows': total_processed,
+                'matched': total_matched,
+                'unmatched_names': len(all_unmatched),
+                'failed_files': failed_files
+            }
+            atomic_write(stats_file, lambda f: json.dump(report, f, ensure_ascii=False, indent=2))
+            logger.info("📊 阶段耗时统计已写入: %s", stats_file)
+
+        if metrics_file:
+            self.write_metrics(metrics_file)
+            logger.info("📊 Prometheus指标已写入: %s", metrics_file)
+
+        return failed_files
+
+
+class TickerRequestHandler(BaseHTTPRequestHandler):
+    """
+    查询服务的请求处理器
+    GET  /lookup?name=...&online=0|1    查询单个名称
+    GET  /candidates?name=...&k=5       按相似度排列的本地候选（人工复核用）
+    POST /batch  {"names": [...], "use_online": true, "workers": 4, "deadline": 30}
+    GET  /health                        服务状态
+    GET  /metrics                       Prometheus文本格式指标
+    """
+
+    server_version = "TickerService/1.0"
+
+    def send_json(self, status: int, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        query = urllib.parse.parse_qs(url.query)
+        converter = self.server.converter
+
+        if url.path == '/health':
+            self.send_json(200, {
+                'status': 'ok',
+                'companies': len(converter.companies_data),
+                'cached_names': len(converter.resolved_names)
+            })
+            return
 
-        print(f"\n💡 注意: 使用完全匹配test3.py的逻辑")
-        print(f"   - 相同的数据加载逻辑")
-        print(f"   - 相同的相似度计算算法")
-        print(f"   - 相同的验证机制和阈值")
-        print(f"   - 相同的搜索和过滤逻辑")
+        if url.path == '/metrics':
+            body = converter.metrics_text().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        if url.path not in ('/lookup', '/candidates'):
+            self.send_json(404, {'error': f'unknown path {url.path}'})
+            return
 
+        name = query.get('name', [''])[0]
+        if not name.strip():
+            self.send_json(400, {'error': 'missing name parameter'})
+            return
+
+        if url.path == '/candidates':
+            try:
+                k = int(query.get('k', ['5'])[0])
+                threshold = float(query.get('threshold', ['0.5'])[0])
+            except ValueError:
+                self.send_json(400, {'error': 'k and threshold must be numbers'})
+                return
+            self.send_json(200, {'name': name, 'candidates': converter.candidates(name, k=k, threshold=threshold)})
+            return
+
+        use_online = self.server.use_online and query.get('online', ['1'])[0].lower() not in ('0', 'false', 'no')
+        try:
+            result = converter.lookup_cached(name, use_online=use_online)
+        except Exception as e:
+            self.send_json(500, {'error': str(e)})
+            return
+        self.send_json(200, converter.result_row(name, result))
 
-def check_required_files():
+    def do_POST(self):
+        url = urllib.parse.urlsplit(self.path)
+        if url.path != '/batch':
+            self.send_json(404, {'error': f'unknown path {url.path}'})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length) or b'{}')
+            names = request['names']
+            if not isinstance(names, list):
+                raise ValueError('names must be a list')
+        except Exception as e:
+            self.send_json(400, {'error': f'invalid request: {e}'})
+            return
+
+        try:
+            df = self.server.converter.find_tickers(
+                names,
+                use_online=self.server.use_online and bool(request.get('use_online', True)),
+                workers=int(request.get('workers', 4)),
+                deadline=request.get('deadline')
+            )
+        except Exception as e:
+            self.send_json(500, {'error': str(e)})
+            return
+
+        rows = df.astype(object).where(df.notna(), None).to_dict('records')
+        self.send_json(200, {'results': rows})
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class TickerHTTPServer(ThreadingHTTPServer):
+    """常驻查询服务：SEC数据只加载一次，结果缓存在所有请求之间共享"""
+
+    daemon_threads = True
+
+    def __init__(self, server_address, converter: EnhancedTest3TickerConverter, verbose: bool = False,
+                 use_online: bool = True):
+        super().__init__(server_address, TickerRequestHandler)
+        self.converter = converter
+        self.verbose = verbose
+        # False时忽略请求中的online/use_online，只查本地数据
+        self.use_online = use_online
+
+
+def serve(host: str = '127.0.0.1', port: int = 8765, converter: Optional[EnhancedTest3TickerConverter] = None,
+          verbose: bool = False, use_online: bool = True):
+    """启动常驻HTTP查询服务；use_online=False时所有请求都只查本地数据"""
+    if converter is None:
+        converter = EnhancedTest3TickerConverter()
+    converter.enable_metrics()
+
+    server = TickerHTTPServer((host, port), converter, verbose=verbose, use_online=use_online)
+    logger.info("🚀 查询服务已启动: http://%s:%s%s", host, server.server_address[1],
+                '' if use_online else '（只查本地数据）')
+    logger.info("   GET  /lookup?name=...   POST /batch   GET /health   GET /metrics")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("服务已停止")
+    finally:
+        server.server_close()
+
+
+def check_required_files(required_files: Optional[List[str]] = None):
     """检查所需文件是否存在"""
-    required_files = ["company_tickers.json", "company_tickers_exchange.json"]
+    if required_files is None:
+        required_files = ["company_tickers.json", "company_tickers_exchange.json"]
     missing_files = []
 
     for file in required_files:
@@ -1105,47 +3895,262 @@ def check_required_files():
             missing_files.append(file)
 
     if missing_files:
-        print("❌ 缺少必需文件:")
+        logger.error("❌ 缺少必需文件:")
         for file in missing_files:
-            print(f"   - {file}")
-        print("\n📥 请从以下地址下载:")
-        print("   - company_tickers.json: https://www.sec.gov/files/company_tickers.json")
-        print("   - company_tickers_exchange.json: https://www.sec.gov/files/company_tickers_exchange.json")
+            logger.error("   - %s", file)
+        logger.error("📥 请运行 `python company_name_to_ticker.py refresh` 或从以下地址下载:")
+        for name, url in SEC_FILE_URLS.items():
+            logger.error("   - %s: %s", name, url)
         return False
 
-    print("✅ 检测到必需的SEC文件:")
+    logger.info("✅ 检测到必需的SEC文件:")
     for file in required_files:
-        print(f"   - {file}")
+        logger.info("   - %s", file)
 
     return True
 
 
-def main():
+def quick_lookup(names: Iterable[str], cache_file: Optional[str] = "convert_checkpoint.json",
+                 use_online: bool = True, company_tickers_file: str = "company_tickers.json",
+                 company_tickers_exchange_file: str = "company_tickers_exchange.json",
+                 alias_file=DEFAULT_ALIAS_FILE
+                 ) -> List[Tuple[str, Optional[Dict]]]:
+    """
+    快速查找：先只读检查点中的已解析名称（不导入pandas、不加载SEC数据），
+    只有缓存未命中的名称才创建转换器完整查找
+    """
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            resolved = json.load(f).get('resolved', {})
+    except (FileNotFoundError, TypeError):
+        resolved = {}
+    except Exception as e:
+        logger.warning("读取缓存 %s 时出错: %s", cache_file, e)
+        resolved = {}
+
+    results = []
+    converter = None
+    for name in names:
+        cached = resolved.get(normalize_name(name), CACHE_MISS) if name.strip() else None
+        if cached is CACHE_MISS:
+            if converter is None:
+                converter = EnhancedTest3TickerConverter(company_tickers_file, company_tickers_exchange_file,
+                                                         alias_file=alias_file)
+            cached = converter.find_ticker(name, use_online=use_online)
+        results.append((name, cached))
+    return results
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """命令行参数：convert（默认）、lookup、stream、serve、refresh 五个子命令"""
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('-v', '--verbose', action='store_true', help="输出每次查找的细节")
+    common.add_argument('-q', '--quiet', action='store_true', help="只输出警告和错误")
+    common.add_argument('--tickers-file', default='company_tickers.json', help="SEC company_tickers.json")
+    common.add_argument('--exchange-file', default='company_tickers_exchange.json',
+                        help="SEC company_tickers_exchange.json")
+    common.add_argument('--alias-file',
+                        help="别名表（曾用名/合并/人工指定），在线找到的结果自动追加；"
+                             "默认为SEC数据文件所在目录下的company_aliases.csv，空字符串表示不使用")
+    common.add_argument('--offline', action='store_true', help="只查本地数据，不进行在线搜索")
+    common.add_argument('--ann', action='store_true',
+                        help="近似匹配（MinHash-LSH候选 + 精确重排），用于很大的参考名称表")
+    common.add_argument('--cache', default='convert_checkpoint.json',
+                        help="结果缓存（检查点）文件，空字符串表示不使用")
+    common.add_argument('-j', '--workers', type=int, default=4, help="并发解析的线程数")
+
+    parser = argparse.ArgumentParser(prog='company_name_to_ticker.py',
+                                     description="公司名称 → 股票代码转换工具")
+    subparsers = parser.add_subparsers(dest='command', metavar='{convert,lookup,stream,serve,refresh}')
+
+    convert = subparsers.add_parser('convert', parents=[common],
+                                    help="转换CSV文件（不指定子命令时的默认行为）")
+    convert.add_argument('inputs', nargs='*',
+                         help="输入CSV文件；'-'表示从标准输入读取CSV并写到标准输出；省略时按--pattern查找")
+    convert.add_argument('--pattern', default="*_all_quarters_merged.csv", help="未指定输入文件时在当前目录匹配的模式")
+    convert.add_argument('--column', help="公司名称列名（默认自动查找nameOfIssuer）")
+    convert.add_argument('--format', choices=sorted(OUTPUT_FORMATS), default='csv', help="输出格式")
+    convert.add_argument('--output-dir', help="输出目录（默认当前目录）")
+    convert.add_argument('--resume', action='store_true', help="从检查点继续")
+    convert.add_argument('--incremental', action='store_true', help="跳过输入未变化的文件")
+    convert.add_argument('--stats-file', help="写入各阶段耗时统计（JSON）")
+    convert.add_argument('--metrics-file', help="写入Prometheus文本格式指标")
+    convert.add_argument('--cusip-file', help="CUSIP→代码映射CSV（cusip,ticker[,name,cik,source]），"
+                                              "名称匹配前先按CUSIP查找，并写回本地新解析的CUSIP")
+    convert.add_argument('--cusip-column', help="CUSIP列名（默认自动查找包含cusip的列）")
+    convert.add_argument('--profile-dir', help="查找剖析输出目录")
+    convert.add_argument('--profile-sample', type=float, default=0.0, help="抽样剖析的查找比例")
+    convert.add_argument('--profile-threshold', type=float, help="保存耗时超过该秒数的查找剖析")
+
+    lookup = subparsers.add_parser('lookup', parents=[common], help="查找单个或多个名称，优先使用缓存")
+    lookup.add_argument('names', nargs='+', help="公司名称")
+
+    stream = subparsers.add_parser('stream', parents=[common],
+                                   help="从标准输入逐行读取名称，结果以TSV写到标准输出")
+    stream.add_argument('--unordered', action='store_true', help="按完成顺序输出（默认按输入顺序）")
+    stream.add_argument('--header', action='store_true', help="输出表头")
+    stream.add_argument('--line-buffered', action='store_true', help="每行结果立即刷新（标准输出是终端时默认开启）")
+    stream.add_argument('--no-result-cache', action='store_true',
+                        help="不使用结果缓存，名称种类无限增长的流内存保持恒定（也不读写--cache文件）")
+
+    serve_parser = subparsers.add_parser('serve', parents=[common], help="启动HTTP查询服务")
+    serve_parser.add_argument('port', nargs='?', type=int, default=8765, help="端口")
+    serve_parser.add_argument('--host', default='127.0.0.1', help="监听地址")
+
+    refresh = subparsers.add_parser('refresh', parents=[common],
+                                    help="条件GET更新SEC文件，并增量更新缓存中受影响的结果")
+    refresh.add_argument('--base-url', help="代替 https://www.sec.gov 的地址（如本地镜像或测试服务器）")
+    refresh.add_argument('--state-file', default='sec_refresh_state.json', help="保存ETag/Last-Modified的文件")
+    refresh.add_argument('--timeout', type=float, default=30, help="下载超时（秒）")
+    return parser
+
+
+def cli_alias_file(value: Optional[str]):
+    """--alias-file的值转换为alias_file参数：未指定时用默认位置，空字符串表示不使用"""
+    if value is None:
+        return DEFAULT_ALIAS_FILE
+    return value or None
+
+
+def tsv_field(value) -> str:
+    """TSV字段：缺失值为空，去掉会破坏行列结构的制表符和换行"""
+    if is_missing(value):
+        return ''
+    return str(value).replace('\t', ' ').replace('\n', ' ').replace('\r', ' ')
+
+
+def run_stream(converter: EnhancedTest3TickerConverter, args) -> int:
+    """stream子命令：stdin每行一个名称，按RESULT_COLUMNS输出TSV"""
+    line_buffered = args.line_buffered or sys.stdout.isatty()
+    names = (line.rstrip('\r\n') for line in sys.stdin)
+    out = sys.stdout
+    try:
+        if args.header:
+            out.write('\t'.join(RESULT_COLUMNS) + '\n')
+        for row in converter.iter_tickers(names, use_online=not args.offline, workers=args.workers,
+                                          ordered=not args.unordered, use_cache=not args.no_result_cache):
+            out.write('\t'.join(tsv_field(row[column]) for column in RESULT_COLUMNS) + '\n')
+            if line_buffered:
+                out.flush()
+        out.flush()
+    except BrokenPipeError:
+        # 下游（如head）提前关闭管道：停止输出，避免解释器退出时再次报错
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    return 0
+
+
+def run_convert_stdin(converter: EnhancedTest3TickerConverter, args) -> int:
+    """convert -：从标准输入读取CSV，结果写到标准输出"""
+    df = pd.read_csv(sys.stdin)
+    name_column = find_name_column(df.columns, args.column)
+    if name_column is None:
+        logger.error("❌ 输入中未找到 '%s' 列，可用列: %s", args.column or 'nameOfIssuer', list(df.columns))
+        return 1
+
+    results = converter.find_tickers(df[name_column], use_online=not args.offline, workers=args.workers)
+    result_df = output_table(df[name_column], results, args.format)
+    write_table(result_df, sys.stdout.buffer if args.format in BINARY_FORMATS else sys.stdout, args.format)
+    sys.stdout.flush()
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
     """主函数"""
-    print("🔍 Enhanced Company Name to Ticker Tool (FIXED - 完全匹配test3.py逻辑)")
-    print("=" * 60)
+    argv = list(sys.argv[1:] if argv is None else argv)
+    # 兼容旧用法：不带子命令时执行convert
+    if argv[:1] not in (['convert'], ['lookup'], ['stream'], ['serve'], ['refresh'], ['-h'], ['--help']):
+        argv.insert(0, 'convert')
+    args = build_parser().parse_args(argv)
+    configure_logging(verbose=args.verbose, quiet=args.quiet)
+    cache_file = args.cache or None
+
+    if args.command == 'lookup':
+        for name, result in quick_lookup(args.names, cache_file=cache_file, use_online=not args.offline,
+                                         company_tickers_file=args.tickers_file,
+                                         company_tickers_exchange_file=args.exchange_file,
+                                         alias_file=cli_alias_file(args.alias_file)):
+            print(f"{name}\t{result['ticker'] if result else ''}\t{result['source'] if result else 'not_found'}")
+        return 0
+
+    if args.command == 'refresh':
+        # 本地文件缺失时视为全部新增，不需要先检查
+        converter = EnhancedTest3TickerConverter(args.tickers_file, args.exchange_file,
+                                                 alias_file=cli_alias_file(args.alias_file))
+        state = converter.load_checkpoint(cache_file) if cache_file else None
+        try:
+            summary = converter.refresh(base_url=args.base_url, state_file=args.state_file, timeout=args.timeout)
+        except Exception as e:
+            logger.error("❌ 刷新SEC文件失败: %s", e)
+            return 1
+        if cache_file and summary['changed']:
+            converter.save_checkpoint(cache_file, state)
+        print(json.dumps(summary, ensure_ascii=False))
+        return 0
 
     # 检查必需文件
-    if not check_required_files():
-        return
+    if not check_required_files([args.tickers_file, args.exchange_file]):
+        return 1
+
+    if args.command == 'convert':
+        try:
+            require_format(args.format)
+        except ImportError as e:
+            logger.error("❌ %s", e)
+            return 1
 
     # 初始化转换器
-    converter = EnhancedTest3TickerConverter()
+    converter = EnhancedTest3TickerConverter(args.tickers_file, args.exchange_file,
+                                             alias_file=cli_alias_file(args.alias_file))
+    if args.ann:
+        converter.enable_ann()
+
+    if args.command == 'serve':
+        serve(host=args.host, port=args.port, converter=converter, verbose=args.verbose,
+              use_online=not args.offline)
+        return 0
+
+    if args.command == 'stream' or args.inputs == ['-']:
+        # 流式模式：使用并更新缓存文件中的已解析名称（stream --no-result-cache时不使用）
+        if args.command == 'stream' and args.no_result_cache:
+            cache_file = None
+        state = converter.load_checkpoint(cache_file) if cache_file else None
+        try:
+            if args.command == 'stream':
+                return run_stream(converter, args)
+            return run_convert_stdin(converter, args)
+        finally:
+            if cache_file:
+                converter.save_checkpoint(cache_file, state)
 
-    # 转换CSV文件
-    converter.convert_csv_files()
+    logger.info("🔍 Enhanced Company Name to Ticker Tool (FIXED - 完全匹配test3.py逻辑)")
+    logger.info("=" * 60)
 
-    print("\n" + "=" * 60)
-    print("🎉 转换完成!")
-    print("\n📋 修复完成的特性:")
-    print("✅ 完全使用test3.py的数据加载逻辑")
-    print("✅ 完全使用test3.py的相似度计算算法")
-    print("✅ 完全使用test3.py的搜索和验证逻辑")
-    print("✅ 相同的阈值和过滤标准")
-    print("✅ 输出格式: nameOfIssuer, Symbol, Source")
-    print("✅ 数据源: local/yahoo_historical/sec_edgar_enhanced/web_search_enhanced/not_found")
-    print("\n🎯 现在应该能够找到 'E M C CORP MASS' → 'EMC' 了!")
+    # 转换CSV文件
+    failed_files = converter.convert_csv_files(args.pattern, checkpoint_file=cache_file, resume=args.resume,
+                                incremental=args.incremental, stats_file=args.stats_file,
+                                metrics_file=args.metrics_file, use_online=not args.offline,
+                                profile_dir=args.profile_dir, profile_sample=args.profile_sample,
+                                profile_threshold=args.profile_threshold, csv_files=args.inputs or None,
+                                name_column=args.column, output_format=args.format,
+                                output_dir=args.output_dir, workers=args.workers,
+                                cusip_file=args.cusip_file, cusip_column=args.cusip_column)
+
+    if failed_files:
+        logger.error("❌ %s 个文件处理失败: %s", len(failed_files), ', '.join(failed_files))
+        return 1
+
+    logger.info("=" * 60)
+    logger.info("🎉 转换完成!")
+    logger.info("📋 修复完成的特性:")
+    logger.info("✅ 完全使用test3.py的数据加载逻辑")
+    logger.info("✅ 完全使用test3.py的相似度计算算法")
+    logger.info("✅ 完全使用test3.py的搜索和验证逻辑")
+    logger.info("✅ 相同的阈值和过滤标准")
+    logger.info("✅ 输出格式: nameOfIssuer, Symbol, Source")
+    logger.info("✅ 数据源: local/yahoo_historical/sec_edgar_enhanced/web_search_enhanced/not_found")
+    logger.info("🎯 现在应该能够找到 'E M C CORP MASS' → 'EMC' 了!")
+    return 0
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
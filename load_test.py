@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+查询服务压力测试脚本
+对 `python company_name_to_ticker.py serve` 启动的服务并发发送请求，
+统计吞吐量(requests/sec)与延迟分位数(p50/p99)
+
+用法:
+    python load_test.py --requests 2000 --concurrency 16
+    python load_test.py --batch-size 100 --requests 50
+"""
+
+import argparse
+import json
+import random
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from company_name_to_ticker import percentile
+
+
+def load_names(names_file: str, limit: int = 2000) -> list:
+    """从company_tickers.json中取公司名称作为测试输入"""
+    with open(names_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    names = [company['title'] for company in data.values() if isinstance(company, dict) and 'title' in company]
+    random.shuffle(names)
+    return names[:limit]
+
+
+def lookup_once(base_url: str, name: str, online: bool, timeout: float) -> float:
+    """发送一次GET /lookup，返回耗时（秒）"""
+    query = urllib.parse.urlencode({'name': name, 'online': '1' if online else '0'})
+    started = time.perf_counter()
+    with urllib.request.urlopen(f"{base_url}/lookup?{query}", timeout=timeout) as response:
+        response.read()
+    return time.perf_counter() - started
+
+
+def batch_once(base_url: str, names: list, online: bool, timeout: float) -> float:
+    """发送一次POST /batch，返回耗时（秒）"""
+    body = json.dumps({'names': names, 'use_online': online}).encode('utf-8')
+    request = urllib.request.Request(f"{base_url}/batch", data=body,
+                                     headers={'Content-Type': 'application/json'})
+    started = time.perf_counter()
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        response.read()
+    return time.perf_counter() - started
+
+
+def run(base_url: str, names: list, total_requests: int, concurrency: int,
+        batch_size: int, online: bool, timeout: float) -> dict:
+    """执行压力测试并返回统计结果"""
+    latencies = []
+    errors = 0
+
+    def task(i: int):
+        if batch_size > 1:
+            start = (i * batch_size) % len(names)
+            chunk = (names[start:] + names[:start])[:batch_size]
+            return batch_once(base_url, chunk, online, timeout)
+        return lookup_once(base_url, names[i % len(names)], online, timeout)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(task, i) for i in range(total_requests)]
+        for future in futures:
+            try:
+                latencies.append(future.result())
+            except Exception:
+                errors += 1
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': total_requests,
+        'errors': errors,
+        'concurrency': concurrency,
+        'batch_size': batch_size,
+        'elapsed_sec': round(elapsed, 3),
+        'requests_per_sec': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'names_per_sec': round(len(latencies) * batch_size / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'max_ms': round(latencies[-1] * 1000, 2) if latencies else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="查询服务压力测试")
+    parser.add_argument('--url', default='http://127.0.0.1:8765', help="服务地址")
+    parser.add_argument('--requests', type=int, default=1000, help="请求总数")
+    parser.add_argument('--concurrency', type=int, default=8, help="并发客户端数")
+    parser.add_argument('--batch-size', type=int, default=1, help="大于1时使用POST /batch，每个请求的名称数")
+    parser.add_argument('--names-file', default='company_tickers.json', help="测试名称来源")
+    parser.add_argument('--online', action='store_true', help="允许在线搜索（默认只查本地）")
+    parser.add_argument('--timeout', type=float, default=60, help="单个请求超时（秒）")
+    parser.add_argument('--json', action='store_true', help="以JSON格式输出结果")
+    args = parser.parse_args()
+
+    names = load_names(args.names_file)
+    stats = run(args.url.rstrip('/'), names, args.requests, args.concurrency,
+                args.batch_size, args.online, args.timeout)
+
+    if args.json:
+        print(json.dumps(stats))
+        return
+
+    print(f"请求数: {stats['requests']}  错误: {stats['errors']}  并发: {stats['concurrency']}")
+    print(f"耗时: {stats['elapsed_sec']}s")
+    print(f"吞吐量: {stats['requests_per_sec']} requests/sec ({stats['names_per_sec']} names/sec)")
+    print(f"延迟: p50={stats['p50_ms']}ms  p99={stats['p99_ms']}ms  max={stats['max_ms']}ms")
+
+
+if __name__ == "__main__":
+    main()
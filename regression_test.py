@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+准确率与延迟回归测试：把golden_names.csv中整理好的13F名称（如 "E M C CORP MASS"）
+分别交给参考实现（冻结在本脚本中的test3.py原始search_local）和优化后的查找引擎，
+报告两者结果不一致的名称、各自的准确率以及每个名称的延迟提升。只使用本地数据，不访问网络。
+golden_names.csv中known_miss=1的名称是本地数据目前答不对的（缩写的13F名称、已退市的公司）。
+
+用法:
+    python regression_test.py
+    python regression_test.py --golden golden_names.csv --engine optimized --json
+退出码: 0 表示准确率没有下降，1 表示优化引擎答错了参考实现答对的名称、答错了不在known_miss中的名称、
+或准确率低于--min-accuracy（默认为基线准确率）
+"""
+
+import argparse
+import csv
+import json
+import statistics
+import sys
+import time
+
+from company_name_to_ticker import EnhancedTest3TickerConverter, configure_logging
+
+# 优化前（test3.py的逻辑）在golden_names.csv上的准确率，优化引擎不能低于它
+BASELINE_ACCURACY = 0.8061
+
+
+def reference_search(converter: EnhancedTest3TickerConverter, name: str, threshold: float = 0.75) -> list:
+    """
+    test3.py原始search_local的冻结副本：逐个公司调用calculate_company_similarity，只按相似度排序，
+    再对最佳匹配做同样的关键词/长度/相似度验证。不调用converter.search_local，
+    这样被测的查找代码变化时参考结果保持不变
+    """
+    results = []
+    for company in converter.companies_data:
+        similarity = converter.calculate_company_similarity(name, company['name'])
+        if similarity >= threshold:
+            results.append((company, similarity))
+
+    results.sort(key=lambda x: x[1], reverse=True)
+
+    if results:
+        best_company, best_similarity = results[0]
+        user_keywords = set(converter.extract_core_keywords(name))
+        match_keywords = set(converter.extract_core_keywords(best_company['name']))
+        intersection = user_keywords.intersection(match_keywords)
+
+        # 没有关键词重叠但相似度很高：可疑匹配
+        if len(intersection) == 0 and best_similarity > 0.8:
+            return []
+
+        # 没有关键词重叠且长度差异过大：可疑匹配
+        if len(intersection) == 0:
+            norm1 = converter.normalize_company_name(name)
+            norm2 = converter.normalize_company_name(best_company['name'])
+            max_len = max(len(norm1), len(norm2))
+            len_similarity = 1 - (abs(len(norm1) - len(norm2)) / max_len) if max_len > 0 else 0
+            if len_similarity < 0.5 and best_similarity > 0.7:
+                return []
+
+    # 最佳匹配相似度过低
+    if results and results[0][1] < 0.80:
+        return []
+
+    return results
+
+
+def reference_lookup(converter: EnhancedTest3TickerConverter, name: str):
+    """参考实现：取冻结的原始search_local的最佳匹配"""
+    results = reference_search(converter, name)
+    return results[0][0]['ticker'] if results else None
+
+
+def optimized_lookup(converter: EnhancedTest3TickerConverter, name: str):
+    """优化引擎：与convert_csv_files相同的离线查找路径"""
+    result = converter.find_ticker(name, use_online=False)
+    return result['ticker'] if result else None
+
+
+def ann_lookup(converter: EnhancedTest3TickerConverter, name: str):
+    """近似匹配引擎：MinHash-LSH候选 + 精确重排（首次调用时建立索引）"""
+    if converter.ann_index is None:
+        converter.enable_ann()
+    return optimized_lookup(converter, name)
+
+
+# 可对比的查找引擎，新的匹配实现在这里登记
+ENGINES = {
+    'optimized': optimized_lookup,
+    'ann': ann_lookup,
+}
+
+
+def load_golden(golden_file: str) -> list:
+    """
+    读取 (name, expected_ticker, known_miss)，expected_ticker为空表示本地数据中不应匹配到任何代码，
+    known_miss为1表示这是已知的本地未命中（可选列）
+    """
+    with open(golden_file, 'r', encoding='utf-8', newline='') as f:
+        return [(row['name'], row['expected_ticker'].strip() or None, (row.get('known_miss') or '').strip() == '1')
+                for row in csv.DictReader(f)]
+
+
+def timed(func, repeat: int):
+    """重复执行func，返回(返回值, 最短耗时秒数)"""
+    best = None
+    value = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        value = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return value, best
+
+
+def run(converter: EnhancedTest3TickerConverter, golden: list, engine, repeat: int) -> dict:
+    """逐个名称运行参考实现与优化引擎"""
+    rows = []
+    for name, expected, known_miss in golden:
+        reference, reference_sec = timed(lambda: reference_lookup(converter, name), repeat)
+        optimized, optimized_sec = timed(lambda: engine(converter, name), repeat)
+        rows.append({
+            'name': name,
+            'expected': expected,
+            'known_miss': known_miss,
+            'reference': reference,
+            'optimized': optimized,
+            'reference_ms': round(reference_sec * 1000, 3),
+            'optimized_ms': round(optimized_sec * 1000, 3),
+            'speedup': round(reference_sec / optimized_sec, 2) if optimized_sec else None,
+        })
+
+    total = len(rows)
+    reference_correct = sum(row['reference'] == row['expected'] for row in rows)
+    optimized_correct = sum(row['optimized'] == row['expected'] for row in rows)
+    reference_total = sum(row['reference_ms'] for row in rows)
+    optimized_total = sum(row['optimized_ms'] for row in rows)
+    return {
+        'names': total,
+        'reference_accuracy': round(reference_correct / total, 4) if total else 0.0,
+        'optimized_accuracy': round(optimized_correct / total, 4) if total else 0.0,
+        'disagreements': [row for row in rows if row['reference'] != row['optimized']],
+        # 参考实现答对、优化引擎答错的名称
+        'regressions': [row['name'] for row in rows
+                        if row['reference'] == row['expected'] and row['optimized'] != row['expected']],
+        # 不在known_miss中却答错的名称，以及已经答对、可以从known_miss中移除的名称
+        'unexpected_misses': [row['name'] for row in rows
+                              if not row['known_miss'] and row['optimized'] != row['expected']],
+        'fixed_known_misses': [row['name'] for row in rows
+                               if row['known_miss'] and row['optimized'] == row['expected']],
+        'median_speedup': round(statistics.median(row['speedup'] for row in rows if row['speedup']), 2)
+        if rows else None,
+        'total_speedup': round(reference_total / optimized_total, 2) if optimized_total else None,
+        'rows': rows,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="golden名称集上的准确率与延迟回归测试")
+    parser.add_argument('--golden', default='golden_names.csv', help="golden名称文件")
+    parser.add_argument('--engine', default='optimized', choices=sorted(ENGINES), help="与参考实现对比的引擎")
+    parser.add_argument('--repeat', type=int, default=1, help="每个名称计时重复次数，取最短")
+    parser.add_argument('--min-accuracy', type=float, default=BASELINE_ACCURACY,
+                        help=f"优化引擎准确率下限（默认为基线准确率 {BASELINE_ACCURACY:.2%}）")
+    parser.add_argument('--json', action='store_true', help="以JSON格式输出结果")
+    args = parser.parse_args()
+
+    configure_logging(quiet=True)
+    golden = load_golden(args.golden)
+    converter = EnhancedTest3TickerConverter()
+    report = run(converter, golden, ENGINES[args.engine], args.repeat)
+    failed = (bool(report['regressions']) or bool(report['unexpected_misses'])
+              or report['optimized_accuracy'] < args.min_accuracy)
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print(f"名称数: {report['names']}  引擎: {args.engine}")
+        print(f"准确率: 参考={report['reference_accuracy']:.2%}  优化={report['optimized_accuracy']:.2%}  "
+              f"下限={args.min_accuracy:.2%}")
+        print(f"延迟提升: 中位数×{report['median_speedup']}  总耗时×{report['total_speedup']}")
+        print(f"结果不一致: {len(report['disagreements'])}")
+        for row in report['disagreements']:
+            marker = '❌' if row['name'] in report['regressions'] else '  '
+            print(f"  {marker} '{row['name']}' 期望={row['expected']} 参考={row['reference']} "
+                  f"优化={row['optimized']} ({row['reference_ms']}ms → {row['optimized_ms']}ms)")
+        for name in report['unexpected_misses']:
+            print(f"  ❌ 不在known_miss中的错误: '{name}'")
+        for name in report['fixed_known_misses']:
+            print(f"  ✨ 已答对，可从known_miss中移除: '{name}'")
+        print("❌ 准确率下降" if failed else "✅ 准确率没有下降")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+并发压力测试：多个线程共享同一个EnhancedTest3TickerConverter实例，
+混合调用lookup_cached / find_tickers / iter_tickers，同时另一个线程不断序列化结果缓存，
+检查所有结果与串行执行完全一致。
+第二阶段对本地找不到的名称开启在线搜索，在线搜索替换为带延迟的假实现（不访问网络），
+检查同一名称的并发在线搜索经SingleFlight合并（同一时刻最多执行一次）且各线程结果一致。
+
+用法:
+    python stress_test.py --names 300 --threads 16 --repeat 5 --online-names 20
+退出码: 0 表示一致，1 表示发现不一致或异常
+"""
+
+import argparse
+import json
+import random
+import string
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from company_name_to_ticker import EnhancedTest3TickerConverter
+
+
+def make_noisy_names(converter: EnhancedTest3TickerConverter, count: int, seed: int) -> list:
+    """从SEC名称生成带噪声的测试名称，每个标准化名称只保留一个写法"""
+    rng = random.Random(seed)
+    names = {}
+    companies = list(converter.companies_data)
+    while len(names) < count:
+        name = rng.choice(companies)['name']
+        variant = rng.randrange(4)
+        if variant == 1:
+            name = name.upper().replace(',', '').replace('.', '')
+        elif variant == 2:
+            name = name.lower() + ' inc'
+        elif variant == 3:
+            words = name.split()
+            name = ' '.join(words[:-1]) if len(words) > 1 else name + ' CORP'
+        names.setdefault(converter.normalize_company_name(name), name)
+    return list(names.values())
+
+
+def make_offline_names(converter: EnhancedTest3TickerConverter, count: int, seed: int) -> list:
+    """生成本地（SEC数据和别名表）找不到的名称，用于在线搜索阶段"""
+    rng = random.Random(seed)
+    names = {}
+    while len(names) < count:
+        # 随机字母组成的名称彼此不相似，在线阶段学到的别名不会匹配到其他名称
+        name = ''.join(rng.choices(string.ascii_lowercase, k=12)).title() + ' ' + rng.choice(['Corp', 'Trust', 'Ltd'])
+        norm = converter.normalize_company_name(name)
+        if norm not in names and converter.find_ticker_local(name) is None:
+            names[norm] = name
+    return list(names.values())
+
+
+class FakeOnlineSearch:
+    """
+    代替search_delisted_stocks_online：按标准化名称返回固定的代码，每次调用等待delay秒，
+    记录每个名称的调用次数，以及同一名称的调用在时间上重叠（未被合并）的次数
+    """
+
+    def __init__(self, converter: EnhancedTest3TickerConverter, names: list, delay: float):
+        self.converter = converter
+        self.delay = delay
+        self.tickers = {converter.normalize_company_name(name): f'ZQ{i:03d}' for i, name in enumerate(names)}
+        self.lock = threading.Lock()
+        self.calls = Counter()
+        self.active = Counter()
+        self.overlaps = 0
+
+    def __call__(self, company_name: str):
+        norm = self.converter.normalize_company_name(company_name)
+        with self.lock:
+            self.calls[norm] += 1
+            self.active[norm] += 1
+            if self.active[norm] > 1:
+                self.overlaps += 1
+        try:
+            time.sleep(self.delay)
+        finally:
+            with self.lock:
+                self.active[norm] -= 1
+        return {'ticker': self.tickers[norm], 'source': 'web_search_enhanced', 'status': 'delisted'}
+
+
+def run_concurrently(converter: EnhancedTest3TickerConverter, workload: list, threads: int,
+                     use_online: bool, chunk_size: int = 25):
+    """把workload分块，多个线程混合三种调用方式执行，返回 (结果, 异常, 耗时)"""
+    chunks = [workload[i:i + chunk_size] for i in range(0, len(workload), chunk_size)]
+
+    observed = []
+    observed_lock = threading.Lock()
+    errors = []
+
+    def record(pairs):
+        with observed_lock:
+            observed.extend(pairs)
+
+    def run_chunk(index: int, chunk: list):
+        mode = index % 3
+        if mode == 0:
+            record((name, (converter.lookup_cached(name, use_online=use_online) or {}).get('ticker'))
+                   for name in chunk)
+        elif mode == 1:
+            df = converter.find_tickers(chunk, use_online=use_online)
+            record(zip(df['name'], df['ticker']))
+        else:
+            record((row['name'], row['ticker'])
+                   for row in converter.iter_tickers(chunk, use_online=use_online))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        futures = [executor.submit(run_chunk, i, chunk) for i, chunk in enumerate(chunks)]
+        for future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                errors.append(repr(e))
+    return observed, errors, time.perf_counter() - started
+
+
+def report(label: str, expected: dict, requests: int, observed: list, errors: list) -> bool:
+    """打印一个阶段的不一致和异常，返回是否全部一致"""
+    mismatches = [(name, expected[name], ticker) for name, ticker in observed
+                  if (ticker if isinstance(ticker, str) else None) != expected[name]]
+    print(f"{label} 返回结果: {len(observed)}/{requests}  异常: {len(errors)}  不一致: {len(mismatches)}")
+    for name, want, got in mismatches[:10]:
+        print(f"  不一致: '{name}' 期望={want} 并发={got}")
+    for error in errors[:10]:
+        print(f"  异常: {error}")
+    return not errors and not mismatches and len(observed) == requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description="共享转换器的并发一致性测试")
+    parser.add_argument('--names', type=int, default=200, help="不同名称的数量")
+    parser.add_argument('--threads', type=int, default=16, help="并发线程数")
+    parser.add_argument('--repeat', type=int, default=4, help="每个名称重复请求的次数")
+    parser.add_argument('--seed', type=int, default=7, help="随机种子")
+    parser.add_argument('--online-names', type=int, default=20,
+                        help="在线搜索阶段的名称数（本地找不到的名称），0表示跳过")
+    parser.add_argument('--online-delay', type=float, default=0.5, help="假在线搜索每次调用的耗时（秒）")
+    args = parser.parse_args()
+
+    # 不读写本地别名表：在线阶段新增的别名只保存在内存中
+    converter = EnhancedTest3TickerConverter(alias_file=None)
+    names = make_noisy_names(converter, args.names, args.seed)
+
+    # 串行基准：不使用缓存
+    started = time.perf_counter()
+    expected = {}
+    for name in names:
+        result = converter.find_ticker(name, use_online=False)
+        expected[name] = result['ticker'] if result else None
+    serial_elapsed = time.perf_counter() - started
+
+    stop = threading.Event()
+
+    def snapshot_loop():
+        # 模拟检查点：在其他线程写缓存的同时不断序列化
+        while not stop.is_set():
+            json.dumps(converter.cache_snapshot())
+
+    snapshotter = threading.Thread(target=snapshot_loop, daemon=True)
+    snapshotter.start()
+    try:
+        workload = names * args.repeat
+        random.Random(args.seed).shuffle(workload)
+        observed, errors, concurrent_elapsed = run_concurrently(converter, workload, args.threads, use_online=False)
+        print(f"名称数: {len(names)}  请求数: {len(workload)}  线程数: {args.threads}")
+        print(f"串行耗时: {serial_elapsed:.2f}s  并发耗时: {concurrent_elapsed:.2f}s")
+        ok = report("本地:", expected, len(workload), observed, errors)
+
+        if args.online_names > 0:
+            online_names = make_offline_names(converter, args.online_names, args.seed)
+            fake = FakeOnlineSearch(converter, online_names, args.online_delay)
+            converter.search_delisted_stocks_online = fake
+            online_expected = {name: fake.tickers[converter.normalize_company_name(name)] for name in online_names}
+
+            # 同一名称的repeat个请求相邻且各成一块，同时落在不同线程中，在线搜索期间互相等待
+            workload = [name for name in online_names for _ in range(args.repeat)]
+            observed, errors, online_elapsed = run_concurrently(
+                converter, workload, args.threads, use_online=True, chunk_size=1)
+            calls = sum(fake.calls.values())
+            print(f"在线名称数: {len(online_names)}  请求数: {len(workload)}  耗时: {online_elapsed:.2f}s")
+            print(f"在线搜索调用: {calls}（每个名称最多 {max(fake.calls.values(), default=0)} 次）  "
+                  f"同一名称并发执行: {fake.overlaps}  未调用的名称: {len(online_names) - len(fake.calls)}")
+            ok = report("在线:", online_expected, len(workload), observed, errors) and ok
+            # 同一名称的在线搜索必须合并为一次执行（SingleFlight），每个名称至少搜索过一次
+            ok = ok and fake.overlaps == 0 and len(fake.calls) == len(online_names)
+    finally:
+        stop.set()
+        snapshotter.join()
+
+    print("✅ 并发结果与串行一致" if ok else "❌ 并发结果与串行不一致")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
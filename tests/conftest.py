@@ -0,0 +1,56 @@
+"""
+测试共用的fixture：在临时目录中写入一份很小的SEC数据（两个JSON文件），
+用它创建转换器，测试不依赖仓库中的完整数据，也不访问网络
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from company_name_to_ticker import EnhancedTest3TickerConverter  # noqa: E402
+
+# (cik, 名称, 代码, 交易所)，交易所为None表示SEC文件中没有交易所信息
+COMPANIES = [
+    (320193, 'Apple Inc.', 'AAPL', 'Nasdaq'),
+    (789019, 'MICROSOFT CORP', 'MSFT', 'Nasdaq'),
+    (1652044, 'Alphabet Inc.', 'GOOGL', 'Nasdaq'),
+    (1018724, 'AMAZON COM INC', 'AMZN', 'Nasdaq'),
+    (70858, 'BANK OF AMERICA CORP /DE/', 'BAC', 'NYSE'),
+    (66740, '3M CO', 'MMM', 'NYSE'),
+    (2040381, 'Pioneer Acquisition I Corp', 'PACH', None),
+    (2040381, 'Pioneer Acquisition I Corp', 'PACHU', 'Nasdaq'),
+    (1001, 'GREEN MOUNTAIN HOLDINGS INC', 'GMH', 'NYSE'),
+    (1002, 'BLUE RIVER ENERGY CORP', 'BRE', 'NYSE'),
+]
+
+
+@pytest.fixture
+def sec_files(tmp_path):
+    """写入 (company_tickers.json, company_tickers_exchange.json)，返回两个路径"""
+    tickers_file = tmp_path / 'company_tickers.json'
+    exchange_file = tmp_path / 'company_tickers_exchange.json'
+    exchange_file.write_text(json.dumps({
+        'fields': ['cik', 'name', 'ticker', 'exchange'],
+        'data': [list(company) for company in COMPANIES]
+    }), encoding='utf-8')
+    tickers_file.write_text(json.dumps({
+        str(i): {'cik_str': cik, 'ticker': ticker, 'title': name}
+        for i, (cik, name, ticker, _) in enumerate(COMPANIES)
+    }), encoding='utf-8')
+    return tickers_file, exchange_file
+
+
+@pytest.fixture
+def make_converter(sec_files):
+    """返回创建转换器的函数，默认不使用别名表"""
+    tickers_file, exchange_file = sec_files
+
+    def make(**kwargs):
+        kwargs.setdefault('alias_file', None)
+        return EnhancedTest3TickerConverter(str(tickers_file), str(exchange_file), **kwargs)
+
+    return make
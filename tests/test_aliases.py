@@ -0,0 +1,69 @@
+"""别名表：加载、追加时保持文件的列、默认位置"""
+
+import csv
+
+from company_name_to_ticker import ALIAS_COLUMNS, ALIAS_FILE_NAME, DEFAULT_ALIAS_FILE
+
+
+def read_rows(path):
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        return list(csv.reader(f))
+
+
+def test_default_alias_file_is_next_to_data_files(sec_files, make_converter, monkeypatch, tmp_path):
+    tickers_file, _ = sec_files
+    monkeypatch.chdir(tmp_path.parent)
+    converter = make_converter(alias_file=DEFAULT_ALIAS_FILE)
+    assert converter.alias_file == str(tickers_file.parent / ALIAS_FILE_NAME)
+
+
+def test_alias_found_after_local_miss(make_converter, tmp_path):
+    alias_file = tmp_path / 'aliases.csv'
+    alias_file.write_text('alias,ticker\nE M C CORP MASS,EMC\n', encoding='utf-8')
+    converter = make_converter(alias_file=str(alias_file))
+    result = converter.find_ticker_local('E M C CORP MASS')
+    assert result['ticker'] == 'EMC'
+    assert result['source'] == 'alias'
+
+
+def test_add_alias_creates_file_with_full_header(make_converter, tmp_path):
+    alias_file = tmp_path / 'aliases.csv'
+    converter = make_converter(alias_file=str(alias_file))
+    assert converter.add_alias('Zzqx Holdings', {'ticker': 'ZZQ', 'status': 'active', 'cik': 123})
+    assert read_rows(alias_file) == [ALIAS_COLUMNS, ['Zzqx Holdings', 'ZZQ', 'online', 'active', '123']]
+
+
+def test_add_alias_rewrites_file_missing_columns(make_converter, tmp_path):
+    alias_file = tmp_path / 'aliases.csv'
+    alias_file.write_text('alias,ticker\nE M C CORP MASS,EMC\n', encoding='utf-8')
+    converter = make_converter(alias_file=str(alias_file))
+    converter.add_alias('Zzqx Holdings', {'ticker': 'ZZQ', 'status': None, 'cik': None})
+
+    rows = read_rows(alias_file)
+    assert rows[0] == ALIAS_COLUMNS
+    assert all(len(row) == len(ALIAS_COLUMNS) for row in rows)
+    assert make_converter(alias_file=str(alias_file)).load_aliases(str(alias_file)) == 2
+
+
+def test_add_alias_appends_in_file_column_order(make_converter, tmp_path):
+    alias_file = tmp_path / 'aliases.csv'
+    alias_file.write_text('ticker,alias,cik,status,kind,note\nEMC,E M C CORP MASS,,delisted,merger,dell\n',
+                          encoding='utf-8')
+    converter = make_converter(alias_file=str(alias_file))
+    converter.add_alias('Zzqx Holdings', {'ticker': 'ZZQ', 'status': 'active', 'cik': 123})
+
+    rows = read_rows(alias_file)
+    assert rows[0] == ['ticker', 'alias', 'cik', 'status', 'kind', 'note']
+    assert rows[1] == ['EMC', 'E M C CORP MASS', '', 'delisted', 'merger', 'dell']
+    assert rows[2] == ['ZZQ', 'Zzqx Holdings', '123', 'active', 'online', '']
+
+    reloaded = make_converter(alias_file=str(alias_file))
+    assert reloaded.find_ticker_local('Zzqx Holdings')['ticker'] == 'ZZQ'
+
+
+def test_add_alias_skips_duplicates(make_converter, tmp_path):
+    alias_file = tmp_path / 'aliases.csv'
+    converter = make_converter(alias_file=str(alias_file))
+    assert converter.add_alias('Zzqx Holdings', {'ticker': 'ZZQ'})
+    assert not converter.add_alias('ZZQX HOLDINGS INC', {'ticker': 'ZZQ'})
+    assert len(read_rows(alias_file)) == 2
@@ -0,0 +1,74 @@
+"""近似匹配（MinHashLSH）：候选包含同名公司、结果与逐个比较一致、固定种子时结果确定、更新公司表后重建索引"""
+
+from company_name_to_ticker import MinHashLSH
+
+from conftest import COMPANIES
+
+QUERIES = [
+    'Apple Inc.',
+    'APPLE INC',
+    'Microsoft Corporation',
+    'Alphabet Inc',
+    'AMAZON.COM, INC.',
+    'Bank of America Corp',
+    '3M Company',
+    'PIONEER ACQUISITION I CORP',
+    'Green Mountain Holdings',
+    'BLUE RIVER ENERGY',
+    'Zzqx Unrelated Widgets',
+]
+
+
+def test_candidates_include_exact_name(make_converter):
+    converter = make_converter()
+    converter.enable_ann()
+    for _, name, ticker, _ in COMPANIES:
+        tickers = {company['ticker'] for company in converter.ann_candidates(name)}
+        assert ticker in tickers, name
+
+
+def test_ann_results_match_brute_force(make_converter):
+    brute = make_converter()
+    ann = make_converter()
+    ann.enable_ann()
+    for name in QUERIES:
+        expected = brute.find_ticker_local(name)
+        result = ann.find_ticker_local(name)
+        assert (result or {}).get('ticker') == (expected or {}).get('ticker'), name
+        assert ann.candidates(name) == brute.candidates(name), name
+
+
+def test_candidates_are_deterministic_for_a_seed(make_converter):
+    records = make_converter().companies_data
+    first = MinHashLSH(records, seed=5)
+    second = MinHashLSH(records, seed=5)
+    for name in QUERIES:
+        norm = make_converter().normalize_company_name(name)
+        assert [id(r) for r in first.query(norm)] == [id(r) for r in second.query(norm)], name
+
+    # 候选按原数据顺序返回
+    positions = {id(record): i for i, record in enumerate(records)}
+    result = first.query('APPLE')
+    assert [positions[id(r)] for r in result] == sorted(positions[id(r)] for r in result)
+
+
+def test_empty_index():
+    index = MinHashLSH([])
+    assert index.query('APPLE') == []
+    assert index.nbytes() == 0
+
+
+def test_update_companies_rebuilds_index(make_converter):
+    converter = make_converter()
+    converter.enable_ann(seed=3)
+    old_index = converter.ann_index
+    assert converter.find_ticker_local('Purple Lantern Robotics Inc') is None
+
+    companies = list(converter.companies_data) + [{
+        'name': 'PURPLE LANTERN ROBOTICS INC', 'ticker': 'PLRB', 'source': 'file2', 'cik': 1003, 'exchange': 'NYSE'}]
+    converter.update_companies(companies)
+
+    assert converter.ann_index is not old_index
+    assert converter.ann_options == {'bands': 24, 'rows': 3, 'seed': 3}
+    assert 'PLRB' in {company['ticker'] for company in converter.ann_candidates('Purple Lantern Robotics')}
+    assert converter.find_ticker_local('Purple Lantern Robotics Inc')['ticker'] == 'PLRB'
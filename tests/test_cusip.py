@@ -0,0 +1,92 @@
+"""CUSIP查找：8位前缀索引、按文本读取CUSIP列、只学习本地解析的结果"""
+
+import csv
+
+import pytest
+
+from company_name_to_ticker import normalize_cusip
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('037833100', '037833100'),
+    ('03783310', '03783310'),
+    (' 037833100 ', '037833100'),
+    ('g5960l103', 'G5960L103'),
+    ('3783310', None),
+    ('0378331000', None),
+    ('03783310-', None),
+    ('', None),
+    (None, None),
+    (float('nan'), None),
+])
+def test_normalize_cusip(value, expected):
+    assert normalize_cusip(value) == expected
+
+
+def write_csv(path, header, rows):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def test_lookup_uses_eight_character_prefix(make_converter, tmp_path):
+    cusip_file = tmp_path / 'cusips.csv'
+    write_csv(cusip_file, ['cusip', 'ticker', 'name'], [['037833100', 'AAPL', 'Apple Inc.']])
+    converter = make_converter()
+    assert converter.load_cusip_index(str(cusip_file)) == 1
+
+    # 9位（含校验位）和8位的写法都命中同一条目
+    for cusip in ('037833100', '03783310', '037833109'):
+        result = converter.lookup_cusip(cusip)
+        assert result['ticker'] == 'AAPL'
+        assert result['source'] == 'cusip'
+    assert converter.lookup_cusip('037833200') is None
+
+
+def test_load_drops_entries_learned_from_online_search(make_converter, tmp_path):
+    cusip_file = tmp_path / 'cusips.csv'
+    write_csv(cusip_file, ['cusip', 'ticker', 'source'],
+              [['111111111', 'FOO', 'web_search_enhanced'], ['222222222', 'BAR', 'local'], ['333333333', 'BAZ', '']])
+    converter = make_converter()
+    assert converter.load_cusip_index(str(cusip_file)) == 2
+    assert converter.lookup_cusip('111111111') is None
+    assert converter.cusip_index['33333333']['source'] == 'cusip_map'
+
+
+def test_learn_only_local_and_alias_results(make_converter):
+    converter = make_converter()
+    online = {'ticker': 'FOO', 'source': 'web_search_enhanced', 'company_name': 'Foo'}
+    local = {'ticker': 'AAPL', 'source': 'local', 'company_name': 'Apple Inc.', 'cik': 320193}
+
+    assert not converter.learn_cusip('111111111', online)
+    assert not converter.learn_cusip('222222222', None)
+    assert converter.learn_cusip('037833100', local)
+    # 已有的条目不覆盖
+    assert not converter.learn_cusip('037833100', dict(local, ticker='OTHER'))
+    assert converter.lookup_cusip('037833100')['ticker'] == 'AAPL'
+
+
+def test_convert_reads_cusip_column_as_text(make_converter, tmp_path):
+    input_file = tmp_path / 'filings.csv'
+    write_csv(input_file, ['nameOfIssuer', 'CUSIP'],
+              [['SOME ISSUER NAME NOT IN SEC DATA', '03783310'], ['MICROSOFT CORP', '594918104']])
+    cusip_file = tmp_path / 'cusips.csv'
+    write_csv(cusip_file, ['cusip', 'ticker'], [['037833100', 'AAPL']])
+
+    converter = make_converter()
+    failed = converter.convert_csv_files(csv_files=[input_file], checkpoint_file=None, use_online=False,
+                                         output_dir=str(tmp_path / 'out'), cusip_file=str(cusip_file))
+    assert failed == []
+
+    with open(tmp_path / 'out' / 'filings_with_tickers.csv', encoding='utf-8', newline='') as f:
+        rows = list(csv.DictReader(f))
+    # 纯数字的8位CUSIP保留前导零，按CUSIP命中
+    assert (rows[0]['Symbol'], rows[0]['Source']) == ('AAPL', 'cusip')
+    assert (rows[1]['Symbol'], rows[1]['Source']) == ('MSFT', 'local')
+
+    # 按名称在本地解析的CUSIP写回映射文件
+    with open(cusip_file, encoding='utf-8', newline='') as f:
+        learned = {row['cusip']: (row['ticker'], row['source']) for row in csv.DictReader(f)}
+    assert learned['594918104'] == ('MSFT', 'local')
+    assert learned['037833100'][0] == 'AAPL'
@@ -0,0 +1,94 @@
+"""JsonStream与基于它的SEC文件流式读取：块边界上被截断的值、fields出现在data之后"""
+
+import io
+import json
+
+import pytest
+
+from company_name_to_ticker import JsonStream, iter_exchange_rows, iter_ticker_rows
+
+
+class ShortReads(io.StringIO):
+    """每次read最多返回limit个字符，模拟任意的块边界"""
+
+    def __init__(self, text, limit):
+        super().__init__(text)
+        self.limit = limit
+
+    def read(self, size=-1):
+        return super().read(self.limit if size is None or size < 0 else min(size, self.limit))
+
+
+ARRAY = [123456789, -1.5e10, 0, 3.25, True, False, None, 'a,b]"c', {'k': [1, 22, 333]}, [], {}, '中文', 98765]
+
+EXCHANGE = {
+    'fields': ['cik', 'name', 'ticker', 'exchange'],
+    'data': [[320193, 'Apple Inc.', 'AAPL', 'Nasdaq'],
+             [1234567890, 'Long Cik Corp', 'LONG', None],
+             [66740, '3M CO', 'MMM', 'NYSE']],
+}
+
+
+@pytest.mark.parametrize('chunk_size', range(1, 12))
+def test_elements_across_chunk_boundaries(chunk_size):
+    text = json.dumps(ARRAY, ensure_ascii=False)
+    stream = JsonStream(io.StringIO(text), chunk_size=chunk_size)
+    assert list(stream.elements()) == ARRAY
+
+
+def test_number_split_across_chunks():
+    # 每个数字都会被块边界截断，截断处恰好也是缓冲区末尾
+    for chunk_size in range(1, 10):
+        stream = JsonStream(io.StringIO('[123456789,987654321]'), chunk_size=chunk_size)
+        assert list(stream.elements()) == [123456789, 987654321]
+
+
+def test_float_split_at_decimal_point_or_exponent():
+    # "3." / "25" 和 "-1.5e" / "10"：截断处之前已经是一个合法的数字前缀
+    assert list(JsonStream(io.StringIO('[3.25]'), chunk_size=3).elements()) == [3.25]
+    assert list(JsonStream(io.StringIO('[-1.5e10]'), chunk_size=6).elements()) == [-1.5e10]
+
+
+def test_top_level_number_at_end_of_file():
+    assert JsonStream(io.StringIO('  1234567 '), chunk_size=2).value() == 1234567
+
+
+def test_empty_containers():
+    assert list(JsonStream(io.StringIO('{ }')).keys()) == []
+    assert list(JsonStream(io.StringIO(' [ ] ')).elements()) == []
+
+
+def test_malformed_input_raises():
+    with pytest.raises(ValueError):
+        list(JsonStream(io.StringIO('[1, 2'), chunk_size=2).elements())
+    with pytest.raises(ValueError):
+        list(JsonStream(io.StringIO('[1 2]')).elements())
+
+
+@pytest.mark.parametrize('limit', [1, 3, 7, 64])
+def test_exchange_rows_fields_before_data(limit):
+    text = json.dumps(EXCHANGE)
+    rows = list(iter_exchange_rows(ShortReads(text, limit)))
+    assert rows == [tuple(row) for row in EXCHANGE['data']]
+
+
+@pytest.mark.parametrize('limit', [1, 3, 7, 64])
+def test_exchange_rows_fields_after_data(limit):
+    text = json.dumps({'data': EXCHANGE['data'], 'extra': {'ignored': [1, 2]}, 'fields': EXCHANGE['fields']})
+    rows = list(iter_exchange_rows(ShortReads(text, limit), wanted=('name', 'ticker')))
+    assert rows == [(row[1], row[2]) for row in EXCHANGE['data']]
+
+
+def test_exchange_rows_reordered_fields():
+    data = {'fields': ['ticker', 'exchange', 'name', 'cik'],
+            'data': [['AAPL', 'Nasdaq', 'Apple Inc.', 320193]]}
+    assert list(iter_exchange_rows(io.StringIO(json.dumps(data)))) == [(320193, 'Apple Inc.', 'AAPL', 'Nasdaq')]
+
+
+@pytest.mark.parametrize('limit', [1, 5, 64])
+def test_ticker_rows(limit):
+    data = {'0': {'cik_str': 320193, 'ticker': 'AAPL', 'title': 'Apple Inc.'},
+            '1': {'ticker': 'NOTITLE'},
+            '2': {'cik_str': 66740, 'ticker': 'MMM', 'title': '3M CO'}}
+    rows = list(iter_ticker_rows(ShortReads(json.dumps(data), limit)))
+    assert rows == [('Apple Inc.', 'AAPL', 320193), ('3M CO', 'MMM', 66740)]
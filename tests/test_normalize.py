@@ -0,0 +1,77 @@
+"""normalize_series（向量化）与逐个调用normalize_company_name的结果必须一致"""
+
+import math
+import random
+
+import pandas as pd
+import pytest
+
+from company_name_to_ticker import COMPANY_SUFFIXES
+
+EDGE_CASE_NAMES = [
+    'Apple Inc.',
+    'APPLE INC',
+    '  apple   inc  ',
+    'INC',
+    'INC INC CORP',
+    'CORP OF AMERICA',
+    'E M C CORP MASS',
+    'AT&T INC',
+    'A&B-C/D.E,F',
+    'CO-OP CO',
+    'LILLY ELI & CO',
+    'BERKSHIRE HATHAWAY INC DEL CL B',
+    'Straße AG',
+    'ınc turkish dotless',
+    'Société Générale SA',
+    'TAB\tSEPARATED\nCORP',
+    'NBSP\xa0CORP　LTD',
+    '...',
+    '-',
+    '',
+    '   ',
+    'INCORPORATED',
+    'XINC CORPX',
+    '3M CO',
+    '株式会社 トヨタ',
+]
+
+
+def scalar(converter, value):
+    return converter.normalize_company_name(value) if isinstance(value, str) else None
+
+
+def assert_matches_scalar(converter, values):
+    series = converter.normalize_series(pd.Series(values, dtype=object))
+    for value, normalized in zip(values, series):
+        expected = scalar(converter, value)
+        if expected is None:
+            assert normalized is None or (isinstance(normalized, float) and math.isnan(normalized)), value
+        else:
+            assert normalized == expected, value
+
+
+def test_edge_case_names_match_scalar(make_converter):
+    assert_matches_scalar(make_converter(), EDGE_CASE_NAMES)
+
+
+@pytest.mark.parametrize('value', [None, float('nan'), 42, 3.5, b'APPLE INC'])
+def test_non_string_values_are_missing(make_converter, value):
+    assert_matches_scalar(make_converter(), ['APPLE INC', value])
+
+
+def test_all_missing_series(make_converter):
+    result = make_converter().normalize_series(pd.Series([None, float('nan')], dtype=object))
+    assert result.isna().all()
+
+
+def test_random_names_match_scalar(make_converter):
+    rng = random.Random(7)
+    alphabet = ['A', 'b', 'Z', '3', ' ', '  ', '.', ',', '&', '-', '/', '\t', 'é', 'ß', '\xa0']
+    words = list(COMPANY_SUFFIXES) + ['APPLE', 'inc', 'Corp.', 'HOLDINGS', 'L.P.', 'S.A.', 'N.V.']
+    names = []
+    for _ in range(2000):
+        parts = [rng.choice(words) if rng.random() < 0.5 else ''.join(rng.choices(alphabet, k=rng.randint(0, 6)))
+                 for _ in range(rng.randint(0, 6))]
+        names.append(rng.choice([' ', '', '-', '.']).join(parts))
+    assert_matches_scalar(make_converter(), names)